@@ -6,7 +6,13 @@ from .models import Organization, User
 
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
-    list_display = ["name", "api_key", "is_active"]
+    list_display = [
+        "name",
+        "api_key",
+        "is_active",
+        "raw_retention_days",
+        "aggregate_retention_days",
+    ]
     search_fields = ["name"]
     list_filter = ["is_active"]
     ordering = ["name"]
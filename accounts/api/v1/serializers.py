@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 from accounts.models import Organization
+from tracking.models.event_schema import PROPERTY_TYPES, EventSchema
 from tracking.models.website import Website
 
 User = get_user_model()
@@ -12,8 +14,21 @@ User = get_user_model()
 class OrganizationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Organization
-        fields = ["id", "name", "api_key", "created_at", "is_active"]
-        read_only_fields = ["api_key", "created_at"]
+        fields = [
+            "id",
+            "name",
+            "api_key",
+            "created_at",
+            "is_active",
+            "raw_retention_days",
+            "aggregate_retention_days",
+        ]
+        read_only_fields = [
+            "api_key",
+            "created_at",
+            "raw_retention_days",
+            "aggregate_retention_days",
+        ]
 
     def to_representation(self, instance):
         """
@@ -42,6 +57,69 @@ class WebsiteSerializer(serializers.ModelSerializer):
         return value
 
 
+class EventSchemaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EventSchema
+        fields = [
+            "id",
+            "event_name",
+            "properties",
+            "strict",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = ["id", "created_at", "updated_at"]
+
+    def validate_properties(self, value):
+        """
+        Normalize ``{name: {"type", "required", "promoted"}}``. Unless set,
+        the first ``EVENT_SCHEMA_MAX_PROMOTED`` declared properties are
+        promoted.
+        """
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of properties.")
+
+        limit = settings.EVENT_SCHEMA_MAX_PROMOTED
+        properties = {}
+        for position, (name, spec) in enumerate(value.items()):
+            if not name or len(name) > 100:
+                raise serializers.ValidationError(
+                    "Property names must be 1 to 100 characters."
+                )
+            if isinstance(spec, str):
+                spec = {"type": spec}
+            if not isinstance(spec, dict) or spec.get("type") not in PROPERTY_TYPES:
+                raise serializers.ValidationError(
+                    f"{name}: type must be one of {', '.join(PROPERTY_TYPES)}."
+                )
+            properties[name] = {
+                "type": spec["type"],
+                "required": bool(spec.get("required", False)),
+                "promoted": bool(spec.get("promoted", position < limit)),
+            }
+
+        if sum(spec["promoted"] for spec in properties.values()) > limit:
+            raise serializers.ValidationError(
+                f"At most {limit} properties can be promoted."
+            )
+        return properties
+
+    def validate_event_name(self, value):
+        """
+        Ensure the event name has a single schema per website.
+        """
+        schemas = EventSchema.objects.filter(
+            website=self.context["website"], event_name=value
+        )
+        if self.instance is not None:
+            schemas = schemas.exclude(pk=self.instance.pk)
+        if schemas.exists():
+            raise serializers.ValidationError(
+                "This event already has a schema on this website."
+            )
+        return value
+
+
 class UserSerializer(serializers.ModelSerializer):
     organization = serializers.PrimaryKeyRelatedField(read_only=True)
 
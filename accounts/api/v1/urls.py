@@ -30,4 +30,15 @@ urlpatterns = [
     # Website Management
     path("websites/", views.WebsiteListCreateAPI.as_view(), name="website-list-create"),
     path("websites/<int:id>/", views.WebsiteDetailAPI.as_view(), name="website-detail"),
+    # Event schemas
+    path(
+        "websites/<int:website_id>/event-schemas/",
+        views.EventSchemaListCreateAPI.as_view(),
+        name="event-schema-list-create",
+    ),
+    path(
+        "websites/<int:website_id>/event-schemas/<int:id>/",
+        views.EventSchemaDetailAPI.as_view(),
+        name="event-schema-detail",
+    ),
 ]
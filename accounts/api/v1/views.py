@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
@@ -9,12 +10,14 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from accounts.api.v1.permissions import HasOrganizationAccess, IsOrganizationAdmin
 from accounts.api.v1.serializers import (
     CustomTokenObtainPairSerializer,
+    EventSchemaSerializer,
     OrganizationSerializer,
     RegisterSerializer,
     UserSerializer,
     WebsiteSerializer,
 )
 from accounts.models import Organization
+from tracking.models.event_schema import EventSchema
 from tracking.models.website import Website
 
 User = get_user_model()
@@ -141,3 +144,36 @@ class WebsiteDetailAPI(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         return Website.objects.filter(organization=self.request.user.organization)
+
+
+class EventSchemaMixin:
+    """
+    Scope event schemas to a website of the user's organization
+    """
+
+    permission_classes = [IsAuthenticated, HasOrganizationAccess]
+    serializer_class = EventSchemaSerializer
+
+    def get_website(self):
+        if not hasattr(self, "_website"):
+            self._website = get_object_or_404(
+                Website,
+                id=self.kwargs["website_id"],
+                organization=self.request.user.organization,
+            )
+        return self._website
+
+    def get_queryset(self):
+        return EventSchema.objects.filter(website=self.get_website())
+
+    def get_serializer_context(self):
+        return dict(super().get_serializer_context(), website=self.get_website())
+
+
+class EventSchemaListCreateAPI(EventSchemaMixin, generics.ListCreateAPIView):
+    def perform_create(self, serializer):
+        serializer.save(website=serializer.context["website"])
+
+
+class EventSchemaDetailAPI(EventSchemaMixin, generics.RetrieveUpdateDestroyAPIView):
+    lookup_field = "id"
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0004_alter_user_options_alter_user_role_alter_user_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organization",
+            name="aggregate_retention_days",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Days of daily aggregates to keep.", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="organization",
+            name="raw_retention_days",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Days of raw sessions, page views and events to keep.",
+                null=True,
+            ),
+        ),
+    ]
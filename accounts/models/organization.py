@@ -7,6 +7,18 @@ class Organization(models.Model):
     api_key = models.CharField(max_length=32, unique=True, blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Retention windows; empty uses TRACKING_RAW_RETENTION_DAYS and
+    # TRACKING_AGGREGATE_RETENTION_DAYS (tracking/retention.py)
+    raw_retention_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Days of raw sessions, page views and events to keep.",
+    )
+    aggregate_retention_days = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Days of daily aggregates to keep.",
+    )
 
     def save(self, *args, **kwargs):
         if not self.api_key:
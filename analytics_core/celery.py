@@ -15,14 +15,42 @@ app.conf.beat_schedule = {
         "task": "tracking.tasks.aggregate_daily_stats",
         "schedule": crontab(hour=1, minute=0),  # 1 AM daily
     },
-    "cleanup-old-sessions": {
-        "task": "tracking.tasks.cleanup_old_sessions",
+    "apply-retention": {
+        "task": "tracking.tasks.apply_retention",
         "schedule": crontab(hour=2, minute=0),  # 2 AM daily
     },
+    "archive-cold-days": {
+        "task": "tracking.tasks.archive_cold_days",
+        "schedule": crontab(hour=3, minute=0),  # 3 AM daily
+    },
+    "maintain-partitions": {
+        "task": "tracking.tasks.maintain_partitions",
+        "schedule": crontab(hour=0, minute=30),  # 12:30 AM daily
+    },
+    "rollup-hourly-stats": {
+        "task": "tracking.tasks.rollup_hourly_stats",
+        "schedule": 300.0,  # Every 5 minutes
+    },
     "update-realtime-cache": {
         "task": "tracking.tasks.update_realtime_cache",
         "schedule": 60.0,  # Every 60 seconds
     },
+    "flush-session-activity": {
+        "task": "tracking.tasks.flush_session_activity",
+        "schedule": 10.0,  # Every 10 seconds
+    },
+    "flush-bot-counters": {
+        "task": "tracking.tasks.flush_bot_counters",
+        "schedule": 60.0,  # Every 60 seconds
+    },
+    "close-idle-sessions": {
+        "task": "tracking.tasks.close_idle_sessions",
+        "schedule": 60.0,  # Every 60 seconds
+    },
+    "drain-ingestion-buffer": {
+        "task": "tracking.tasks.drain_ingestion_buffer",
+        "schedule": 5.0,  # Every 5 seconds
+    },
 }
 
 app.conf.timezone = "UTC"
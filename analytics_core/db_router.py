@@ -0,0 +1,164 @@
+"""
+Database router sending reporting reads to read replicas.
+
+Every query uses the primary (``default``) unless it runs inside
+``replica_reads()``, a context manager and decorator wrapped around
+reporting code: ``AnalyticsService``, the source scans of
+``aggregate_daily_stats`` and admin list views. Writes always go to the
+primary, even inside ``replica_reads()``, so ingestion and read-after-write
+paths never see replication lag.
+
+A ``replica_reads()`` block reads from one alias of ``DATABASE_REPLICAS``,
+chosen round-robin when its first query runs, so a report is consistent
+with itself. Replicas are probed at most every ``DB_REPLICA_CHECK_INTERVAL``
+seconds; one that cannot be reached or lags more than ``DB_REPLICA_MAX_LAG``
+seconds is skipped, and with none healthy the block reads from the primary.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind; 0 on a primary or a replica that has
+# replayed everything it received (an idle primary writes no new WAL)
+REPLICATION_LAG_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(
+        extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0
+    )
+END
+"""
+
+# {"alias": ...} of the current replica_reads() block; the alias is None
+# until the block's first read
+_block = ContextVar("replica_reads", default=None)
+
+_lock = threading.Lock()
+_turns = itertools.count()
+# alias -> (healthy, monotonic time of the check)
+_health = {}
+
+
+class replica_reads(ContextDecorator):
+    """
+    Route the reads of the block to a replica; nested blocks share one
+    """
+
+    def __enter__(self):
+        self._token = _block.set(_block.get() or {"alias": None})
+        return self
+
+    def __exit__(self, *exc):
+        _block.reset(self._token)
+        return False
+
+    def _recreate_cm(self):
+        # A decorated function may run concurrently; each call needs its
+        # own token
+        return type(self)()
+
+
+def replication_lag(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(REPLICATION_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_healthy(alias):
+    """
+    Return whether ``alias`` is reachable and close enough to the primary,
+    probing it if the last check is older than DB_REPLICA_CHECK_INTERVAL
+    """
+    now = time.monotonic()
+    with _lock:
+        checked = _health.get(alias)
+    if checked and now - checked[1] < settings.DB_REPLICA_CHECK_INTERVAL:
+        return checked[0]
+
+    try:
+        lag = replication_lag(alias)
+    except DatabaseError as e:
+        connections[alias].close()
+        logger.warning(f"Replica {alias} is unavailable: {e}")
+        healthy = False
+    else:
+        max_lag = settings.DB_REPLICA_MAX_LAG
+        healthy = not max_lag or lag <= max_lag
+        if not healthy:
+            logger.warning(f"Replica {alias} is {lag:.1f}s behind the primary")
+    with _lock:
+        _health[alias] = (healthy, now)
+    return healthy
+
+
+def choose_replica():
+    """
+    Return the next healthy replica alias, or the primary if there is none
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    with _lock:
+        turn = next(_turns)
+    for offset in range(len(replicas)):
+        alias = replicas[(turn + offset) % len(replicas)]
+        if is_healthy(alias):
+            return alias
+    logger.warning("No healthy replica, reading from the primary")
+    return DEFAULT_DB_ALIAS
+
+
+def reset():
+    """
+    Forget replica health and restart the rotation
+    """
+    global _turns
+    with _lock:
+        _health.clear()
+        _turns = itertools.count()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        block = _block.get()
+        if block is None:
+            return DEFAULT_DB_ALIAS
+        if block["alias"] is None:
+            block["alias"] = choose_replica()
+        return block["alias"]
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the primary's data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaChangeListMixin:
+    """
+    ModelAdmin mixin reading change lists from a replica; actions posted to
+    the change list still read from the primary
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with replica_reads():
+            response = super().changelist_view(request, extra_context)
+            # The page of results is only fetched when the template renders
+            if hasattr(response, "render"):
+                response.render()
+        return response
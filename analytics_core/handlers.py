@@ -0,0 +1,157 @@
+"""
+WSGI/ASGI entry points with a lean fast path for tracking hits.
+
+Requests to ``TRACKING_FAST_PATHS`` (the hit, pixel and beacon URLs, which
+need no user, session or CSRF token) are served by a second Django handler
+whose middleware chain is ``TRACKING_MIDDLEWARE`` instead of ``MIDDLEWARE``
+(no silk, sessions, CSRF, messages or auth) and whose URLconf is
+``TRACKING_URLCONF``, which maps the ingestion routes to lean views.
+Every other request goes through the regular handler unchanged.
+
+Both entry points run once per worker process and warm the website
+registry there, so the first hits do not wait for its bulk load.
+"""
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+
+class TrackingHandlerMixin:
+    def load_middleware(self, is_async=False):
+        """
+        Build the chain from TRACKING_MIDDLEWARE the way
+        ``BaseHandler.load_middleware`` builds it from MIDDLEWARE
+        """
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(settings.TRACKING_MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            can_sync = getattr(middleware, "sync_capable", True)
+            can_async = getattr(middleware, "async_capable", False)
+            if not can_sync and not can_async:
+                raise RuntimeError(
+                    f"Middleware {middleware_path} must have at least one of "
+                    "sync_capable/async_capable set to True."
+                )
+            middleware_is_async = can_async and (handler_is_async or not can_sync)
+            adapted_handler = self.adapt_method_mode(
+                middleware_is_async,
+                handler,
+                handler_is_async,
+                debug=settings.DEBUG,
+                name=f"middleware {middleware_path}",
+            )
+            try:
+                instance = middleware(adapted_handler)
+            except MiddlewareNotUsed:
+                continue
+            if instance is None:
+                raise ImproperlyConfigured(
+                    f"Middleware factory {middleware_path} returned None."
+                )
+
+            if hasattr(instance, "process_view"):
+                self._view_middleware.insert(
+                    0, self.adapt_method_mode(is_async, instance.process_view)
+                )
+            if hasattr(instance, "process_template_response"):
+                self._template_response_middleware.append(
+                    self.adapt_method_mode(is_async, instance.process_template_response)
+                )
+            if hasattr(instance, "process_exception"):
+                # Exception middleware always runs synchronously
+                self._exception_middleware.append(
+                    self.adapt_method_mode(False, instance.process_exception)
+                )
+
+            handler = convert_exception_to_response(instance)
+            handler_is_async = middleware_is_async
+
+        # Assigned last: Django treats it as the "initialized" flag
+        self._middleware_chain = self.adapt_method_mode(
+            is_async, handler, handler_is_async
+        )
+
+    def get_response(self, request):
+        request.urlconf = settings.TRACKING_URLCONF
+        return super().get_response(request)
+
+    async def get_response_async(self, request):
+        request.urlconf = settings.TRACKING_URLCONF
+        return await super().get_response_async(request)
+
+
+class TrackingWSGIHandler(TrackingHandlerMixin, WSGIHandler):
+    pass
+
+
+class TrackingASGIHandler(TrackingHandlerMixin, ASGIHandler):
+    pass
+
+
+class WSGIDispatcher:
+    """
+    Route tracking hits to the lean handler and everything else to the
+    regular one
+    """
+
+    def __init__(self, default, tracking, paths):
+        self.default = default
+        self.tracking = tracking
+        self.paths = frozenset(paths)
+
+    def __call__(self, environ, start_response):
+        if environ.get("PATH_INFO", "") in self.paths:
+            return self.tracking(environ, start_response)
+        return self.default(environ, start_response)
+
+
+class ASGIDispatcher:
+    """
+    ASGI counterpart of ``WSGIDispatcher``
+    """
+
+    def __init__(self, default, tracking, paths):
+        self.default = default
+        self.tracking = tracking
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.paths:
+            return await self.tracking(scope, receive, send)
+        return await self.default(scope, receive, send)
+
+
+def setup():
+    django.setup(set_prefix=False)
+    if settings.WEBSITE_REGISTRY_WARM:
+        from tracking.registry import website_registry
+
+        website_registry.warm()
+
+
+def get_wsgi_application():
+    setup()
+    if not settings.TRACKING_FAST_PATH:
+        return WSGIHandler()
+    return WSGIDispatcher(
+        WSGIHandler(), TrackingWSGIHandler(), settings.TRACKING_FAST_PATHS
+    )
+
+
+def get_asgi_application():
+    setup()
+    if not settings.TRACKING_FAST_PATH:
+        return ASGIHandler()
+    return ASGIDispatcher(
+        ASGIHandler(), TrackingASGIHandler(), settings.TRACKING_FAST_PATHS
+    )
@@ -80,6 +80,31 @@ DATABASES = {
     }
 }
 
+# Read replicas for reporting reads (analytics_core/db_router.py): each
+# "host[:port]" of DB_REPLICA_HOSTS becomes an alias "replica_<n>" with the
+# primary's credentials. Listing the primary's own host gives a second alias
+# on the same server, enough to exercise the routing locally. Under tests the
+# aliases mirror the test database.
+DATABASE_REPLICAS = []
+for number, replica_host in enumerate(
+    config("DB_REPLICA_HOSTS", default="", cast=Csv()), 1
+):
+    replica_host, _, replica_port = replica_host.partition(":")
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{number}")
+
+DATABASE_ROUTERS = ["analytics_core.db_router.ReplicaRouter"]
+
+# Replicas are probed at most every CHECK_INTERVAL seconds and skipped while
+# unreachable or more than MAX_LAG seconds behind (0 = any lag is accepted)
+DB_REPLICA_CHECK_INTERVAL = config("DB_REPLICA_CHECK_INTERVAL", default=10, cast=int)
+DB_REPLICA_MAX_LAG = config("DB_REPLICA_MAX_LAG", default=30, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -159,6 +184,186 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
+# Tracking ingestion
+# "sync" writes every hit inside the request, "buffered" appends hits to a
+# stream that the drain_ingestion_buffer task writes with bulk inserts.
+TRACKING_INGESTION_MODE = config("TRACKING_INGESTION_MODE", default="sync")
+TRACKING_BUFFER_BACKEND = config("TRACKING_BUFFER_BACKEND", default="redis")
+TRACKING_BUFFER_REDIS_URL = config(
+    "TRACKING_BUFFER_REDIS_URL",
+    default=config("REDIS_URL", default="redis://redis:6379/1"),
+)
+TRACKING_BUFFER_STREAM = config("TRACKING_BUFFER_STREAM", default="tracking:hits")
+TRACKING_BUFFER_MAXLEN = config("TRACKING_BUFFER_MAXLEN", default=5_000_000, cast=int)
+TRACKING_BUFFER_BATCH_SIZE = config(
+    "TRACKING_BUFFER_BATCH_SIZE", default=5000, cast=int
+)
+TRACKING_BUFFER_MAX_BATCHES = config(
+    "TRACKING_BUFFER_MAX_BATCHES", default=20, cast=int
+)
+# "orm" drains with bulk_create, "copy" streams batches through COPY FROM STDIN
+TRACKING_BULK_LOADER = config("TRACKING_BULK_LOADER", default="orm")
+
+# Sessions idle this long are closed by the close_idle_sessions task
+TRACKING_SESSION_IDLE_MINUTES = config(
+    "TRACKING_SESSION_IDLE_MINUTES", default=30, cast=int
+)
+TRACKING_SESSION_SWEEP_BATCH_SIZE = config(
+    "TRACKING_SESSION_SWEEP_BATCH_SIZE", default=5000, cast=int
+)
+TRACKING_SESSION_SWEEP_MAX_BATCHES = config(
+    "TRACKING_SESSION_SWEEP_MAX_BATCHES", default=100, cast=int
+)
+# Session last-seen times and page view counts are kept in Redis and written
+# back by the flush_session_activity task in batches of this many sessions
+TRACKING_ACTIVITY_REDIS_URL = config(
+    "TRACKING_ACTIVITY_REDIS_URL", default=TRACKING_BUFFER_REDIS_URL
+)
+TRACKING_ACTIVITY_FLUSH_BATCH_SIZE = config(
+    "TRACKING_ACTIVITY_FLUSH_BATCH_SIZE", default=5000, cast=int
+)
+
+# NDJSON batch uploads are validated and written in chunks of this many lines
+TRACKING_NDJSON_CHUNK_SIZE = config(
+    "TRACKING_NDJSON_CHUNK_SIZE", default=1000, cast=int
+)
+TRACKING_NDJSON_MAX_LINE_BYTES = config(
+    "TRACKING_NDJSON_MAX_LINE_BYTES", default=64 * 1024, cast=int
+)
+TRACKING_NDJSON_MAX_ERRORS = config("TRACKING_NDJSON_MAX_ERRORS", default=100, cast=int)
+
+# Idempotency keys (event_id) are remembered for one to two TTL windows
+TRACKING_DEDUP_REDIS_URL = config(
+    "TRACKING_DEDUP_REDIS_URL", default=TRACKING_BUFFER_REDIS_URL
+)
+TRACKING_DEDUP_TTL = config("TRACKING_DEDUP_TTL", default=60 * 60 * 24, cast=int)
+
+# Fast path: the hit, pixel and beacon URLs below are served by a separate
+# handler with this middleware chain (no auth, sessions or CSRF) and URLconf
+# (see analytics_core/handlers.py); other tracking routes keep MIDDLEWARE
+TRACKING_FAST_PATH = config("TRACKING_FAST_PATH", default=True, cast=bool)
+TRACKING_FAST_PATHS = [
+    f"/api/tracking/v1/{route}"
+    for route in (
+        "pageview/",
+        "event/",
+        "batch/",
+        "p.gif",
+        "beacon/",
+        "async/pageview/",
+        "async/event/",
+        "async/batch/",
+    )
+]
+TRACKING_URLCONF = "tracking.fast_urls"
+TRACKING_MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+]
+
+# Load shedding on the ingest path (per process, see tracking/services/backpressure.py)
+TRACKING_BACKPRESSURE = config("TRACKING_BACKPRESSURE", default=True, cast=bool)
+TRACKING_MAX_INFLIGHT = config("TRACKING_MAX_INFLIGHT", default=64, cast=int)
+TRACKING_MAX_INFLIGHT_PER_WEBSITE = config(
+    "TRACKING_MAX_INFLIGHT_PER_WEBSITE", default=16, cast=int
+)
+TRACKING_FAIR_SHARE_AT = config("TRACKING_FAIR_SHARE_AT", default=0.75, cast=float)
+TRACKING_MAX_BUFFER_DEPTH = config(
+    "TRACKING_MAX_BUFFER_DEPTH", default=1_000_000, cast=int
+)
+TRACKING_RETRY_AFTER = config("TRACKING_RETRY_AFTER", default=5, cast=int)
+TRACKING_METRICS_TOKEN = config("TRACKING_METRICS_TOKEN", default="")
+
+# Distinct user-agent strings memoized by tracking.utils.user_agent
+USER_AGENT_CACHE_SIZE = config("USER_AGENT_CACHE_SIZE", default=10_000, cast=int)
+
+# Local MaxMind-format (.mmdb) country database, memory-mapped per process;
+# empty disables GeoIP enrichment (tracking/utils/geoip.py)
+GEOIP_DATABASE_PATH = config("GEOIP_DATABASE_PATH", default="")
+GEOIP_CACHE_SIZE = config("GEOIP_CACHE_SIZE", default=50_000, cast=int)
+
+# Bot hits are dropped before persistence ("drop"), and also counted per
+# website/day/reason in bot_hit_counters ("count"); "off" disables filtering.
+# Sessions over TRACKING_BOT_MAX_HITS_PER_MINUTE (0 = no limit) count as bots.
+TRACKING_BOT_FILTER = config("TRACKING_BOT_FILTER", default="count")
+TRACKING_BOT_REDIS_URL = config(
+    "TRACKING_BOT_REDIS_URL", default=TRACKING_BUFFER_REDIS_URL
+)
+TRACKING_BOT_MAX_HITS_PER_MINUTE = config(
+    "TRACKING_BOT_MAX_HITS_PER_MINUTE", default=120, cast=int
+)
+TRACKING_DATACENTER_RANGES_PATH = config("TRACKING_DATACENTER_RANGES_PATH", default="")
+TRACKING_BOT_CACHE_SIZE = config("TRACKING_BOT_CACHE_SIZE", default=50_000, cast=int)
+
+# page_views and events are range-partitioned by "month" or "day"
+# (tracking/partitions.py); maintain_partitions keeps PREMAKE partitions
+# ahead and detaches partitions older than DETACH_AFTER_DAYS (0 = never)
+TRACKING_PARTITION_INTERVAL = config("TRACKING_PARTITION_INTERVAL", default="month")
+TRACKING_PARTITION_PREMAKE = config("TRACKING_PARTITION_PREMAKE", default=3, cast=int)
+TRACKING_PARTITION_DETACH_AFTER_DAYS = config(
+    "TRACKING_PARTITION_DETACH_AFTER_DAYS", default=0, cast=int
+)
+
+# Default retention of raw hits and of daily aggregates, overridable per
+# organization; 0 keeps data forever (tracking/retention.py). Deletes run
+# in chunks of BATCH_SIZE rows, PAUSE seconds apart, for at most
+# MAX_SECONDS per run.
+TRACKING_RAW_RETENTION_DAYS = config(
+    "TRACKING_RAW_RETENTION_DAYS", default=90, cast=int
+)
+TRACKING_AGGREGATE_RETENTION_DAYS = config(
+    "TRACKING_AGGREGATE_RETENTION_DAYS", default=0, cast=int
+)
+TRACKING_RETENTION_BATCH_SIZE = config(
+    "TRACKING_RETENTION_BATCH_SIZE", default=5000, cast=int
+)
+TRACKING_RETENTION_PAUSE = config("TRACKING_RETENTION_PAUSE", default=0.05, cast=float)
+TRACKING_RETENTION_MAX_SECONDS = config(
+    "TRACKING_RETENTION_MAX_SECONDS", default=1800, cast=int
+)
+
+# Hourly rollups fold at most ROLLUP_MAX_ROWS new rows per table per run
+# (tracking/rollups.py)
+TRACKING_ROLLUP_MAX_ROWS = config(
+    "TRACKING_ROLLUP_MAX_ROWS", default=1_000_000, cast=int
+)
+
+# Page views and events older than ARCHIVE_AFTER_DAYS (0 = never) move to
+# columnar files under ARCHIVE_ROOT, BATCH_SIZE rows per file set
+# (tracking/archive.py); reports read them from there
+TRACKING_ARCHIVE_ROOT = config(
+    "TRACKING_ARCHIVE_ROOT", default=str(BASE_DIR / "archive")
+)
+TRACKING_ARCHIVE_AFTER_DAYS = config("TRACKING_ARCHIVE_AFTER_DAYS", default=0, cast=int)
+TRACKING_ARCHIVE_BATCH_SIZE = config(
+    "TRACKING_ARCHIVE_BATCH_SIZE", default=100_000, cast=int
+)
+# Archived days are kept for ARCHIVE_RETENTION_DAYS; 0 follows each
+# organization's aggregate retention window (tracking/retention.py)
+TRACKING_ARCHIVE_RETENTION_DAYS = config(
+    "TRACKING_ARCHIVE_RETENTION_DAYS", default=0, cast=int
+)
+
+# Event schemas are cached per process for EVENT_SCHEMA_REGISTRY_TTL seconds;
+# at most EVENT_SCHEMA_MAX_PROMOTED properties per schema get typed rows
+EVENT_SCHEMA_REGISTRY_TTL = config("EVENT_SCHEMA_REGISTRY_TTL", default=60, cast=int)
+EVENT_SCHEMA_MAX_PROMOTED = config("EVENT_SCHEMA_MAX_PROMOTED", default=8, cast=int)
+
+# Interned page view dimension ids remembered per process (tracking/dimensions.py)
+DIMENSION_CACHE_SIZE = config("DIMENSION_CACHE_SIZE", default=100_000, cast=int)
+
+# Per-process domain -> website registry used on the ingest path
+WEBSITE_REGISTRY_MAX_SIZE = config(
+    "WEBSITE_REGISTRY_MAX_SIZE", default=100_000, cast=int
+)
+WEBSITE_REGISTRY_TTL = config("WEBSITE_REGISTRY_TTL", default=300, cast=int)
+# Bulk-load the registry when a web worker starts instead of on its first hit
+WEBSITE_REGISTRY_WARM = config("WEBSITE_REGISTRY_WARM", default=True, cast=bool)
+WEBSITE_REGISTRY_PUBSUB = config("WEBSITE_REGISTRY_PUBSUB", default=True, cast=bool)
+WEBSITE_REGISTRY_REDIS_URL = config(
+    "WEBSITE_REGISTRY_REDIS_URL", default=TRACKING_BUFFER_REDIS_URL
+)
+
 # Redis cache
 CACHE_TTL = 60 * 15  # 15 minutes
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
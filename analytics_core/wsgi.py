@@ -1,7 +1,7 @@
 
 import os
 
-from django.core.wsgi import get_wsgi_application
+from analytics_core.handlers import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "analytics_core.settings")
 
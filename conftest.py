@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def primary_reads(settings):
+    """Replica connections cannot see the uncommitted rows of a test"""
+    settings.DATABASE_REPLICAS = []
@@ -0,0 +1,171 @@
+"""
+Throughput benchmark for the tracking endpoints (standard library only).
+
+Compares the sync DRF views served over WSGI with the native async views
+served over ASGI. Start one server per run, e.g.:
+
+    gunicorn analytics_core.wsgi -w 1 --threads 32 -b 0.0.0.0:8000
+    uvicorn analytics_core.asgi:application --workers 1 --port 8001
+
+then:
+
+    python load_testing/benchmark_tracking.py --domain example.com \\
+        --url http://localhost:8000 --route sync
+    python load_testing/benchmark_tracking.py --domain example.com \\
+        --url http://localhost:8001 --route async
+
+Each connection keeps its HTTP/1.1 socket alive and sends requests back to
+back; the script reports requests/sec, latency percentiles and status codes.
+Note that any sync-only middleware still forces a thread hop per request
+under ASGI.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+ROUTES = {
+    "sync": {
+        "pageview": "/api/tracking/v1/pageview/",
+        "event": "/api/tracking/v1/event/",
+        "batch": "/api/tracking/v1/batch/",
+    },
+    "async": {
+        "pageview": "/api/tracking/v1/async/pageview/",
+        "event": "/api/tracking/v1/async/event/",
+        "batch": "/api/tracking/v1/async/batch/",
+    },
+}
+
+
+def build_payload(kind, domain, n):
+    session_id = f"bench-{uuid.uuid4().hex[:12]}"
+    if kind == "event":
+        return {"domain": domain, "session_id": session_id, "event_name": "click"}
+    if kind == "batch":
+        return [
+            {
+                "type": "pageview",
+                "domain": domain,
+                "session_id": session_id,
+                "page_url": f"/page/{i}",
+            }
+            for i in range(n)
+        ]
+    return {"domain": domain, "session_id": session_id, "page_url": "/bench"}
+
+
+async def send(reader, writer, host, path, body):
+    writer.write(
+        (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Content-Type: application/json\r\n"
+            "User-Agent: tracking-benchmark\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode()
+        + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("server closed the connection")
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "transfer-encoding":
+            chunked = "chunked" in value.lower()
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip() or b"0", 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def worker(args, path, deadline, latencies, statuses):
+    url = urlsplit(args.url)
+    reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+    try:
+        while time.monotonic() < deadline:
+            body = json.dumps(
+                build_payload(args.kind, args.domain, args.batch_size)
+            ).encode()
+            started = time.perf_counter()
+            try:
+                status = await send(reader, writer, url.netloc, path, body)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                statuses["connection error"] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(
+                    url.hostname, url.port or 80
+                )
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(args):
+    path = ROUTES[args.route][args.kind]
+    latencies = []
+    statuses = Counter()
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(
+        *(
+            worker(args, path, deadline, latencies, statuses)
+            for _ in range(args.concurrency)
+        )
+    )
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    hits = len(latencies) * (args.batch_size if args.kind == "batch" else 1)
+    print(f"{args.route} {args.kind} {args.url}{path}")
+    print(f"  concurrency      {args.concurrency}")
+    print(f"  requests         {len(latencies)} in {elapsed:.1f}s")
+    print(f"  requests/sec     {len(latencies) / elapsed:.0f}")
+    print(f"  hits/sec         {hits / elapsed:.0f}")
+    for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        print(f"  {label} latency      {percentile(latencies, fraction) * 1000:.1f} ms")
+    print(f"  statuses         {dict(statuses)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--route", choices=ROUTES, default="sync")
+    parser.add_argument(
+        "--kind", choices=["pageview", "event", "batch"], default="pageview"
+    )
+    parser.add_argument("--domain", required=True, help="domain of an active website")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--batch-size", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
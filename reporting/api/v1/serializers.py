@@ -11,6 +11,7 @@ class AnalyticsOverviewSerializer(serializers.Serializer):
     avg_session_duration = serializers.FloatField()
     bounce_rate = serializers.FloatField()
     period = serializers.CharField()
+    sampled = serializers.BooleanField(required=False)
     cached = serializers.BooleanField(required=False)
 
 
@@ -19,6 +20,16 @@ class TimeSeriesSerializer(serializers.Serializer):
     pageviews = serializers.IntegerField()
     visitors = serializers.IntegerField()
     sessions = serializers.IntegerField()
+    sampled = serializers.BooleanField(required=False)
+
+
+class IntradaySerializer(serializers.Serializer):
+    hour = serializers.DateTimeField()
+    pageviews = serializers.IntegerField()
+    visitors = serializers.IntegerField()
+    sessions = serializers.IntegerField()
+    events = serializers.IntegerField()
+    sampled = serializers.BooleanField(required=False)
 
 
 class PageStatsSerializer(serializers.ModelSerializer):
@@ -47,7 +58,14 @@ class EventSummarySerializer(serializers.Serializer):
     unique_users = serializers.IntegerField()
 
 
+class EventPropertyBreakdownSerializer(serializers.Serializer):
+    value = serializers.JSONField()
+    count = serializers.IntegerField()
+    sampled = serializers.BooleanField(required=False)
+
+
 class RealTimeStatsSerializer(serializers.Serializer):
     active_visitors = serializers.IntegerField()
     pageviews_today = serializers.IntegerField()
     popular_pages = serializers.ListField(child=serializers.DictField())
+    sampled = serializers.BooleanField(required=False)
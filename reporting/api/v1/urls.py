@@ -7,10 +7,17 @@ urlpatterns = [
     path("overview/", views.AnalyticsOverviewAPI.as_view(), name="analytics-overview"),
     # Time Series Data
     path("timeseries/", views.TimeSeriesAPI.as_view(), name="analytics-timeseries"),
+    # Hourly series of one day
+    path("intraday/", views.IntradayAPI.as_view(), name="analytics-intraday"),
     # Top Pages
     path("top-pages/", views.TopPagesAPI.as_view(), name="analytics-top-pages"),
     # Event Summary
     path("events/", views.EventSummaryAPI.as_view(), name="analytics-events"),
+    path(
+        "events/properties/",
+        views.EventPropertyBreakdownAPI.as_view(),
+        name="analytics-event-properties",
+    ),
     # Real-time Stats
     path("realtime/", views.RealTimeStatsAPI.as_view(), name="analytics-realtime"),
     # Websites
@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -9,7 +10,9 @@ from rest_framework.views import APIView
 from accounts.api.v1.permissions import HasOrganizationAccess
 from reporting.api.v1.serializers import (
     AnalyticsOverviewSerializer,
+    EventPropertyBreakdownSerializer,
     EventSummarySerializer,
+    IntradaySerializer,
     RealTimeStatsSerializer,
     TimeSeriesSerializer,
     TopPagesSerializer,
@@ -27,10 +30,9 @@ class BaseAnalyticsView(APIView):
 
     def get_website_filters(self, website_id=None):
         """Get website filters for queries"""
-        filters = {"website__organization": self.request.user.organization}
-        if website_id:
-            filters["website_id"] = website_id
-        return filters
+        return AnalyticsService.website_filters(
+            self.request.user.organization, website_id
+        )
 
     def get_date_range(self, request):
         """Get date range from request parameters"""
@@ -93,6 +95,26 @@ class EventSummaryAPI(BaseAnalyticsView):
         return Response(serializer.data)
 
 
+class EventPropertyBreakdownAPI(BaseAnalyticsView):
+    def get(self, request):
+        website_id = request.GET.get("website_id")
+        event_name = request.GET.get("event_name")
+        property_name = request.GET.get("property")
+        if not (website_id and event_name and property_name):
+            return Response(
+                {"error": "website_id, event_name and property are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        days = int(request.GET.get("days", 7))
+
+        data = AnalyticsService.get_event_property_breakdown(
+            request.user.organization, website_id, event_name, property_name, days
+        )
+
+        serializer = EventPropertyBreakdownSerializer(data, many=True)
+        return Response(serializer.data)
+
+
 class RealTimeStatsAPI(BaseAnalyticsView):
     def get(self, request):
         website_id = request.GET.get("website_id")
@@ -105,6 +127,26 @@ class RealTimeStatsAPI(BaseAnalyticsView):
         return Response(serializer.data)
 
 
+class IntradayAPI(BaseAnalyticsView):
+    def get(self, request):
+        website_id = request.GET.get("website_id")
+        date = request.GET.get("date")
+        if date is not None:
+            date = parse_date(date)
+            if date is None:
+                return Response(
+                    {"error": "date must be YYYY-MM-DD"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        data = AnalyticsService.get_intraday_series(
+            request.user.organization, website_id, date
+        )
+
+        serializer = IntradaySerializer(data, many=True)
+        return Response(serializer.data)
+
+
 class WebsiteListAPI(BaseAnalyticsView):
     def get(self, request):
         data = AnalyticsService.get_websites(request.user.organization)
@@ -0,0 +1,157 @@
+import json
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from accounts.models.organization import Organization
+from reporting.services.analytics_service import AnalyticsService
+from reporting.utils.cache_utils import AnalyticsCache
+from tracking.tasks import aggregate_daily_stats
+
+RELTUPLES_SQL = "SELECT relname, reltuples FROM pg_class WHERE relname = ANY(%s)"
+
+
+def seq_scans(plan):
+    """
+    Yield the relation names of the Seq Scan nodes of an EXPLAIN JSON plan
+    """
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run each reporting query under EXPLAIN (ANALYZE, BUFFERS) and flag "
+        "sequential scans of large tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--organization",
+            type=int,
+            help="Organization id (default: the first organization).",
+        )
+        parser.add_argument("--website", type=int, help="Restrict to a website id.")
+        parser.add_argument("--days", type=int, default=7, help="Report period.")
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Only flag seq scans of relations with at least this many rows.",
+        )
+        parser.add_argument(
+            "--fail-on-seq-scan",
+            action="store_true",
+            help="Exit with an error if any seq scan is flagged.",
+        )
+
+    def get_reports(self, organization, website_id, days):
+        return [
+            (
+                "overview",
+                lambda: AnalyticsService.get_analytics_overview(
+                    organization, website_id, days
+                ),
+            ),
+            (
+                "time_series",
+                lambda: AnalyticsService.get_time_series(
+                    organization, website_id, days
+                ),
+            ),
+            (
+                "top_pages",
+                lambda: AnalyticsService.get_top_pages(organization, website_id, days),
+            ),
+            (
+                "event_summary",
+                lambda: AnalyticsService.get_event_summary(
+                    organization, website_id, days
+                ),
+            ),
+            (
+                "real_time_stats",
+                lambda: AnalyticsService.get_real_time_stats(organization, website_id),
+            ),
+            (
+                "intraday",
+                lambda: AnalyticsService.get_intraday_series(organization, website_id),
+            ),
+            ("aggregate_daily_stats", aggregate_daily_stats),
+        ]
+
+    def capture(self, report):
+        """
+        Run ``report`` and return ``(alias, sql, params)`` of the read
+        queries it executed, on the primary or a replica. The cache is
+        cleared first and writes are rolled back.
+        """
+        queries = []
+
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+                queries.append((context["connection"].alias, sql, params))
+            return execute(sql, params, many, context)
+
+        with transaction.atomic(), ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            report()
+            transaction.set_rollback(True)
+        return queries
+
+    def explain(self, alias, sql, params):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
+    def row_estimates(self, relations):
+        with connection.cursor() as cursor:
+            cursor.execute(RELTUPLES_SQL, [list(relations)])
+            return dict(cursor.fetchall())
+
+    def handle(self, *args, **options):
+        organizations = Organization.objects.order_by("id")
+        if options["organization"]:
+            organizations = organizations.filter(id=options["organization"])
+        organization = organizations.first()
+        if organization is None:
+            raise CommandError("No organization to report on")
+
+        flagged = 0
+        for name, report in self.get_reports(
+            organization, options["website"], options["days"]
+        ):
+            AnalyticsCache.invalidate_organization_cache(organization.id)
+            plans = [
+                (sql, self.explain(alias, sql, params))
+                for alias, sql, params in self.capture(report)
+            ]
+            total_ms = sum(plan["Execution Time"] for _, plan in plans)
+            self.stdout.write(f"{name}: {len(plans)} queries, {total_ms:.2f} ms")
+
+            for sql, plan in plans:
+                relations = set(seq_scans(plan["Plan"]))
+                if not relations:
+                    continue
+                rows = self.row_estimates(relations)
+                for relation in sorted(relations):
+                    if rows.get(relation, 0) < options["min_rows"]:
+                        continue
+                    flagged += 1
+                    self.stdout.write(
+                        self.style.WARNING(
+                            f"  Seq Scan on {relation} "
+                            f"(~{int(rows[relation])} rows): {sql[:200]}"
+                        )
+                    )
+
+        if flagged and options["fail_on_seq_scan"]:
+            raise CommandError(f"{flagged} sequential scans of large tables")
+        self.stdout.write(self.style.SUCCESS(f"{flagged} sequential scans flagged"))
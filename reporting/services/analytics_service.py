@@ -1,26 +1,51 @@
 from datetime import timedelta
 
+from django.contrib.postgres.aggregates import BoolOr
 from django.db.models import Avg, Count, Sum
 from django.utils import timezone
 
+from analytics_core.db_router import replica_reads
 from reporting.utils.cache_utils import AnalyticsCache
+from tracking import archive_query, rollups
+from tracking.dimensions import resolve
 from tracking.models import (
     DailyWebsiteStats,
     Event,
+    EventProperty,
     PageStats,
+    PageTitle,
+    PageUrl,
     PageView,
     Session,
     Website,
 )
+from tracking.utils.common import day_bounds
+from tracking.utils.sampling import scale_rows, scaled_count, weighted_count
 
 
 class AnalyticsService:
     """
     Service class for analytics and reporting operations.
     Provides methods to fetch overview stats, time series, top pages, event summaries, and real-time data.
+    Counts from sampled websites are scaled by ``1 / sample_rate`` and flagged
+    with ``sampled``. Queries read from a replica when one is configured.
     """
 
     @staticmethod
+    @replica_reads()
+    def website_filters(organization, website_id=None):
+        """
+        Filter on the organization's website ids (or on ``website_id`` if
+        it is one of them) rather than joining ``websites``, so the
+        ``(website, timestamp)`` indexes drive the report queries.
+        """
+        websites = Website.objects.filter(organization=organization)
+        if website_id:
+            websites = websites.filter(id=website_id)
+        return {"website_id__in": list(websites.values_list("id", flat=True))}
+
+    @staticmethod
+    @replica_reads()
     def get_analytics_overview(organization, website_id=None, days=7):
         """
         Returns aggregated analytics overview for a given organization and optional website.
@@ -35,9 +60,7 @@ class AnalyticsService:
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days - 1)  # today is not aggregated yet
 
-        base_filters = {"website__organization": organization}
-        if website_id:
-            base_filters["website_id"] = website_id
+        base_filters = AnalyticsService.website_filters(organization, website_id)
 
         # Aggregate historical stats from daily records
         stats = DailyWebsiteStats.objects.filter(
@@ -47,12 +70,25 @@ class AnalyticsService:
             total_visitors=Sum("unique_visitors"),
             total_sessions=Sum("sessions"),
             avg_session_duration=Avg("avg_session_duration"),
+            sampled=BoolOr("sampled"),
         )
 
-        # Count total events in the same period
-        event_count = Event.objects.filter(
-            **base_filters, timestamp__date__range=[start_date, end_date]
-        ).count()
+        # Count total events in the same period, archived days included
+        period_start, period_end = day_bounds(start_date, end_date)
+        event_count, events_sampled = scaled_count(
+            Event.objects.filter(
+                **base_filters, timestamp__gte=period_start, timestamp__lt=period_end
+            )
+        )
+        archived = scale_rows(
+            archive_query.cold_rows(
+                "events", base_filters["website_id__in"], period_start, period_end
+            ),
+            [],
+            ["count"],
+        ).get((), {})
+        event_count += round(archived.get("count", 0))
+        events_sampled = events_sampled or archived.get("sampled", False)
 
         # Fetch real-time stats (last 30 minutes + today)
         real_time_stats = AnalyticsService.get_real_time_stats(organization, website_id)
@@ -69,6 +105,9 @@ class AnalyticsService:
             "avg_session_duration": stats.get("avg_session_duration") or 0,
             "bounce_rate": 0,  # TODO: implement bounce rate calculation
             "period": f"{start_date} to {end_date}",
+            "sampled": bool(stats.get("sampled"))
+            or events_sampled
+            or real_time_stats["sampled"],
             "cached": False,
         }
 
@@ -79,6 +118,7 @@ class AnalyticsService:
         return data
 
     @staticmethod
+    @replica_reads()
     def get_time_series(organization, website_id=None, days=7):
         """
         Returns time series data for pageviews, visitors, and sessions over the last N days.
@@ -91,16 +131,14 @@ class AnalyticsService:
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
 
-        base_filters = {"website__organization": organization}
-        if website_id:
-            base_filters["website_id"] = website_id
+        base_filters = AnalyticsService.website_filters(organization, website_id)
 
         # Fetch daily stats
         time_series_data = (
             DailyWebsiteStats.objects.filter(
                 **base_filters, date__range=[start_date, end_date]
             )
-            .values("date", "pageviews", "unique_visitors", "sessions")
+            .values("date", "pageviews", "unique_visitors", "sessions", "sampled")
             .order_by("date")
         )
 
@@ -113,6 +151,7 @@ class AnalyticsService:
                 "pageviews": 0,
                 "visitors": 0,
                 "sessions": 0,
+                "sampled": False,
             }
             current_date += timedelta(days=1)
 
@@ -120,6 +159,7 @@ class AnalyticsService:
             date_map[item["date"]]["pageviews"] = item["pageviews"]
             date_map[item["date"]]["visitors"] = item["unique_visitors"]
             date_map[item["date"]]["sessions"] = item["sessions"]
+            date_map[item["date"]]["sampled"] = item["sampled"]
 
         result = list(date_map.values())
 
@@ -129,6 +169,7 @@ class AnalyticsService:
         return result
 
     @staticmethod
+    @replica_reads()
     def get_top_pages(organization, website_id=None, days=7, limit=10):
         """
         Returns top N pages based on views and average time on page.
@@ -142,19 +183,25 @@ class AnalyticsService:
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
 
-        base_filters = {"website__organization": organization}
-        if website_id:
-            base_filters["website_id"] = website_id
+        base_filters = AnalyticsService.website_filters(organization, website_id)
 
-        # Aggregate page stats
-        top_pages = (
+        # Aggregate page stats by interned URL id, then resolve the top N
+        top_pages = list(
             PageStats.objects.filter(**base_filters, date__range=[start_date, end_date])
-            .values("page_url")
+            .values("page_url_ref")
             .annotate(views=Sum("views"), avg_time_on_page=Avg("avg_time_on_page"))
             .order_by("-views")[:limit]
         )
+        urls = resolve(PageUrl, [page["page_url_ref"] for page in top_pages])
 
-        top_pages_list = list(top_pages)
+        top_pages_list = [
+            {
+                "page_url": urls.get(page["page_url_ref"]),
+                "views": page["views"],
+                "avg_time_on_page": page["avg_time_on_page"],
+            }
+            for page in top_pages
+        ]
 
         # Cache the result
         AnalyticsCache.set_top_pages(
@@ -164,6 +211,7 @@ class AnalyticsService:
         return top_pages_list
 
     @staticmethod
+    @replica_reads()
     def get_event_summary(organization, website_id=None, days=7):
         """
         Returns summary of events including count and unique users per event.
@@ -171,62 +219,176 @@ class AnalyticsService:
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
 
-        base_filters = {"website__organization": organization}
-        if website_id:
-            base_filters["website_id"] = website_id
+        base_filters = AnalyticsService.website_filters(organization, website_id)
 
-        date_filters = {"timestamp__date__range": [start_date, end_date]}
+        period_start, period_end = day_bounds(start_date, end_date)
+        date_filters = {"timestamp__gte": period_start, "timestamp__lt": period_end}
 
-        # Aggregate event data
-        event_summary = (
+        # Aggregate event data per sample rate, then scale each group up
+        event_rows = (
             Event.objects.filter(**base_filters, **date_filters)
-            .values("event_name")
-            .annotate(
-                count=Count("id"), unique_users=Count("session_id", distinct=True)
+            .values("event_name", "sample_rate")
+            .annotate(count=Count("*"), unique_users=Count("session_id", distinct=True))
+        )
+        # Days past the hot window are read from the archive
+        archived_rows = archive_query.cold_rows(
+            "events",
+            base_filters["website_id__in"],
+            period_start,
+            period_end,
+            ["event_name"],
+            unique_users="session_id",
+        )
+        event_summary = [
+            {
+                "event_name": event_name,
+                "count": round(totals["count"]),
+                "unique_users": round(totals["unique_users"]),
+            }
+            for (event_name,), totals in scale_rows(
+                [*event_rows, *archived_rows],
+                ["event_name"],
+                ["count", "unique_users"],
+            ).items()
+        ]
+
+        return sorted(event_summary, key=lambda event: -event["count"])
+
+    @staticmethod
+    @replica_reads()
+    def get_event_property_breakdown(
+        organization, website_id, event_name, property_name, days=7, limit=20
+    ):
+        """
+        Returns event counts per value of a promoted event property.
+        Reads only the typed ``event_properties`` index, and the archive
+        for days past the hot window.
+        """
+        since = timezone.now() - timedelta(days=days)
+        base_filters = AnalyticsService.website_filters(organization, website_id)
+        rows = (
+            EventProperty.objects.filter(
+                **base_filters,
+                event_name=event_name,
+                name=property_name,
+                timestamp__gte=since,
             )
-            .order_by("-count")
+            .values("string_value", "number_value", "sample_rate")
+            .annotate(count=Count("*"))
         )
 
-        return list(event_summary)
+        # Archived events keep their event_data; read the property from it
+        field = f"event_data.{property_name}"
+        archived_rows = []
+        for row in archive_query.cold_rows(
+            "events",
+            base_filters["website_id__in"],
+            since,
+            timezone.now(),
+            [field],
+            {"event_name": event_name},
+        ):
+            value = row.pop(field)
+            if isinstance(value, bool):
+                row["string_value"], row["number_value"] = str(value).lower(), None
+            elif isinstance(value, (int, float)):
+                row["string_value"], row["number_value"] = None, float(value)
+            elif isinstance(value, str):
+                row["string_value"], row["number_value"] = value, None
+            else:
+                continue
+            archived_rows.append(row)
+        breakdown = [
+            {
+                "value": string_value if string_value is not None else number_value,
+                "count": round(totals["count"]),
+                "sampled": totals["sampled"],
+            }
+            for (string_value, number_value), totals in scale_rows(
+                [*rows, *archived_rows], ["string_value", "number_value"], ["count"]
+            ).items()
+        ]
+
+        return sorted(breakdown, key=lambda row: -row["count"])[:limit]
 
     @staticmethod
+    @replica_reads()
     def get_real_time_stats(organization, website_id=None):
         """
         Returns real-time stats including active visitors, today's pageviews, and popular pages.
         """
-        base_filters = {"website__organization": organization}
-        if website_id:
-            base_filters["website_id"] = website_id
+        base_filters = AnalyticsService.website_filters(organization, website_id)
 
-        # Active sessions in last 30 minutes
-        active_visitors = Session.objects.filter(
-            **base_filters, started_at__gte=timezone.now() - timedelta(minutes=30)
-        ).count()
+        # Sessions with a hit in the last 30 minutes (as of the last flush)
+        active_visitors, active_sampled = scaled_count(
+            Session.objects.filter(
+                **base_filters,
+                last_seen_at__gte=timezone.now() - timedelta(minutes=30),
+            )
+        )
 
-        # Pageviews since start of today
+        # Pageviews and sessions since start of today, from the hourly
+        # rollup plus the raw rows it has not folded in yet
         today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        pageviews_today = PageView.objects.filter(
-            **base_filters, timestamp__gte=today_start
-        ).count()
+        today = rollups.hourly_totals(base_filters["website_id__in"], today_start)
 
         # Top 5 popular pages today
-        popular_pages = (
+        popular_pages = list(
             PageView.objects.filter(**base_filters, timestamp__gte=today_start)
-            .values("page_url", "page_title")
-            .annotate(views=Count("id"))
+            .values("page_url_ref", "page_title_ref")
+            .annotate(views=weighted_count())
             .order_by("-views")[:5]
         )
+        urls = resolve(PageUrl, [page["page_url_ref"] for page in popular_pages])
+        titles = resolve(PageTitle, [page["page_title_ref"] for page in popular_pages])
 
         return {
             "active_visitors": active_visitors,
-            "pageviews_today": pageviews_today,
-            "sessions_today": Session.objects.filter(
-                **base_filters, started_at__gte=today_start
-            ).count(),
-            "popular_pages": list(popular_pages),
+            "pageviews_today": round(today["pageviews"]),
+            "sessions_today": round(today["sessions"]),
+            "popular_pages": [
+                {
+                    "page_url": urls.get(page["page_url_ref"]),
+                    "page_title": titles.get(page["page_title_ref"]),
+                    "views": round(page["views"]),
+                }
+                for page in popular_pages
+            ],
+            "sampled": active_sampled or today["sampled"],
         }
 
     @staticmethod
+    @replica_reads()
+    def get_intraday_series(organization, website_id=None, date=None):
+        """
+        Returns hourly pageviews, visitors, sessions and events for one day
+        (default today), read from the hourly rollup.
+        """
+        day_start, day_end = day_bounds(date or timezone.now().date())
+        base_filters = AnalyticsService.website_filters(organization, website_id)
+        hours = rollups.hourly_totals(
+            base_filters["website_id__in"], day_start, day_end, group_by="hour"
+        )
+
+        series = []
+        hour = day_start
+        while hour < min(day_end, timezone.now()):
+            totals = hours.get(hour)
+            series.append(
+                {
+                    "hour": hour,
+                    "pageviews": round(totals["pageviews"]) if totals else 0,
+                    "visitors": round(totals["visitors"]) if totals else 0,
+                    "sessions": round(totals["sessions"]) if totals else 0,
+                    "events": round(totals["events"]) if totals else 0,
+                    "sampled": totals["sampled"] if totals else False,
+                }
+            )
+            hour += timedelta(hours=1)
+        return series
+
+    @staticmethod
+    @replica_reads()
     def get_websites(organization):
         """
         Returns list of active websites for the given organization.
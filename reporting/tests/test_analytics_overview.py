@@ -3,6 +3,7 @@ from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APIClient
 from accounts.models.organization import Organization
+from reporting.services.analytics_service import AnalyticsService
 from tracking.models import Event, PageView, Session, Website
 
 @pytest.mark.django_db
@@ -23,4 +24,24 @@ def test_analytics_overview_authenticated(django_user_model):
 
     assert response.status_code == 200
     for field in ["total_pageviews", "total_visitors", "total_sessions", "total_events", "avg_session_duration", "bounce_rate"]:
-        assert field in response.data
\ No newline at end of file
+        assert field in response.data
+
+
+@pytest.mark.django_db
+def test_real_time_stats_scale_sampled_rows():
+    org = Organization.objects.create(name="SampledOrg")
+    website = Website.objects.create(
+        name="Busy", domain="busy.com", organization=org, sample_rate=0.5
+    )
+    session = Session.objects.create(website=website, session_id="s1", sample_rate=0.5)
+    for _ in range(3):
+        PageView.objects.create(
+            website=website, session=session, page_url="/home", sample_rate=0.5
+        )
+
+    data = AnalyticsService.get_real_time_stats(org, website.id)
+
+    assert data["pageviews_today"] == 6
+    assert data["sessions_today"] == 2
+    assert data["popular_pages"][0]["views"] == 6
+    assert data["sampled"] is True
@@ -0,0 +1,56 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from reporting.management.commands.explain_reports import seq_scans
+from reporting.services.analytics_service import AnalyticsService
+from tracking.models import PageView
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+@pytest.mark.django_db
+def test_website_filters_stay_inside_the_organization():
+    website = WebsiteFactory()
+    other = WebsiteFactory()
+    organization = website.organization
+
+    assert AnalyticsService.website_filters(organization) == {
+        "website_id__in": [website.id]
+    }
+    assert AnalyticsService.website_filters(organization, other.id) == {
+        "website_id__in": []
+    }
+
+
+@pytest.mark.django_db
+def test_explain_reports_runs_every_report_without_writing():
+    session = SessionFactory()
+    PageView.objects.create(website=session.website, session=session, page_url="/")
+    out = StringIO()
+
+    call_command(
+        "explain_reports", organization=session.website.organization_id, stdout=out
+    )
+
+    output = out.getvalue()
+    for report in ["overview", "time_series", "top_pages", "event_summary"]:
+        assert f"{report}: " in output
+    assert "aggregate_daily_stats: " in output
+    assert "0 sequential scans flagged" in output
+    assert not session.website.daily_stats.exists()
+
+
+def test_seq_scans_walks_nested_plans():
+    plan = {
+        "Node Type": "Hash Join",
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "sessions"},
+            {
+                "Node Type": "Hash",
+                "Plans": [{"Node Type": "Index Scan", "Relation Name": "websites"}],
+            },
+        ],
+    }
+
+    assert list(seq_scans(plan)) == ["sessions"]
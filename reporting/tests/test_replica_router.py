@@ -0,0 +1,66 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from analytics_core import db_router
+from analytics_core.db_router import ReplicaRouter, replica_reads
+from reporting.services.analytics_service import AnalyticsService
+from tracking.models import PageView
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.fixture
+def replicas(settings):
+    """A healthy replica alias on the test database and one that is down"""
+    # Connections created at runtime are allowed in any test; a separate
+    # connection only sees committed rows, hence transaction=True below
+    default = connections["default"]
+    connections["replica"] = type(default)({**default.settings_dict}, "replica")
+    connections["broken"] = type(default)(
+        {**default.settings_dict, "PORT": "1"}, "broken"
+    )
+    settings.DATABASE_REPLICAS = ["broken", "replica"]
+    db_router.reset()
+    yield
+    for alias in ("replica", "broken"):
+        connections[alias].close()
+        del connections[alias]
+    db_router.reset()
+
+
+def test_blocks_rotate_over_healthy_replicas(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = ["a", "b", "c"]
+    down = {"b"}
+    monkeypatch.setattr(db_router, "is_healthy", lambda alias: alias not in down)
+    db_router.reset()
+    router = ReplicaRouter()
+
+    assert router.db_for_read(PageView) == "default"
+    chosen = []
+    for _ in range(4):
+        with replica_reads():
+            chosen.append(router.db_for_read(PageView))
+            # The block keeps its replica, nested blocks included; writes
+            # go to the primary
+            with replica_reads():
+                assert router.db_for_read(PageView) == chosen[-1]
+            assert router.db_for_write(PageView) == "default"
+    assert chosen == ["a", "c", "c", "a"]
+
+    down.update({"a", "c"})
+    with replica_reads():
+        assert router.db_for_read(PageView) == "default"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reports_read_from_a_healthy_replica(replicas):
+    website = WebsiteFactory()
+
+    with CaptureQueriesContext(connections["replica"]) as replica_queries:
+        filters = AnalyticsService.website_filters(website.organization)
+
+    assert filters == {"website_id__in": [website.id]}
+    assert any("websites" in query["sql"] for query in replica_queries)
+    assert db_router._health["broken"][0] is False
+    # Outside reporting code reads stay on the primary
+    assert ReplicaRouter().db_for_read(PageView) == "default"
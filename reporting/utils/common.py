@@ -7,6 +7,8 @@ from typing import Any, Dict, Tuple
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from tracking.models import Website
+
 
 def validate_date_range(start_date: str, end_date: str) -> Tuple[datetime, datetime]:
     """
@@ -83,7 +85,7 @@ def get_default_filters(organization, website_id: int = None) -> Dict[str, Any]:
     """
     Get default filters for analytics queries
     """
-    filters = {"website__organization": organization}
+    websites = Website.objects.filter(organization=organization)
     if website_id:
-        filters["website_id"] = website_id
-    return filters
+        websites = websites.filter(id=website_id)
+    return {"website_id__in": list(websites.values_list("id", flat=True))}
@@ -1,43 +1,86 @@
 from django.contrib import admin
 
-from .models import DailyWebsiteStats, Event, PageStats, PageView, Session, Website
+from analytics_core.db_router import ReplicaChangeListMixin
+
+from .models import (
+    BotHitCounter,
+    DailyWebsiteStats,
+    Event,
+    EventSchema,
+    HourlyWebsiteStats,
+    PageStats,
+    PageView,
+    Session,
+    Website,
+)
 
 
 @admin.register(Website)
 class WebsiteAdmin(admin.ModelAdmin):
-    list_display = ["name", "domain", "organization", "created_at", "is_active"]
+    list_display = [
+        "name",
+        "domain",
+        "organization",
+        "created_at",
+        "is_active",
+        "sample_rate",
+    ]
     list_filter = ["organization", "is_active"]
     search_fields = ["name", "domain"]
 
 
 @admin.register(Session)
-class SessionAdmin(admin.ModelAdmin):
+class SessionAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ["session_id", "website", "started_at", "device_type", "country"]
     list_filter = ["website", "device_type", "started_at"]
     search_fields = ["session_id"]
 
 
 @admin.register(PageView)
-class PageViewAdmin(admin.ModelAdmin):
+class PageViewAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ["website", "session", "page_url", "timestamp"]
     list_filter = ["website", "timestamp"]
-    search_fields = ["page_url"]
+    list_select_related = ["website", "session", "page_url_ref"]
+    search_fields = ["page_url_ref__value"]
 
 
 @admin.register(Event)
-class EventAdmin(admin.ModelAdmin):
+class EventAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ["website", "session", "event_name", "timestamp"]
     list_filter = ["website", "event_name", "timestamp"]
     search_fields = ["event_name"]
 
 
 @admin.register(DailyWebsiteStats)
-class DailyWebsiteStatsAdmin(admin.ModelAdmin):
+class DailyWebsiteStatsAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ["website", "date", "pageviews", "unique_visitors", "sessions"]
     list_filter = ["website", "date"]
 
 
+@admin.register(HourlyWebsiteStats)
+class HourlyWebsiteStatsAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ["website", "hour", "pageviews", "sessions", "events"]
+    list_filter = ["website", "hour"]
+    exclude = ["visitors_sketch"]
+
+
 @admin.register(PageStats)
-class PageStatsAdmin(admin.ModelAdmin):
+class PageStatsAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     list_display = ["website", "page_url", "date", "views", "unique_visitors"]
     list_filter = ["website", "date"]
+    list_select_related = ["website", "page_url_ref"]
+
+
+@admin.register(BotHitCounter)
+class BotHitCounterAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ["website", "date", "reason", "hits"]
+    list_filter = ["reason", "date"]
+    list_select_related = ["website"]
+
+
+@admin.register(EventSchema)
+class EventSchemaAdmin(admin.ModelAdmin):
+    list_display = ["website", "event_name", "strict", "updated_at"]
+    list_filter = ["strict"]
+    list_select_related = ["website"]
+    search_fields = ["event_name"]
@@ -0,0 +1,133 @@
+"""
+Native async variants of the tracking endpoints.
+
+DRF's APIView is synchronous, so under ASGI every call to the regular views
+is pushed through a thread-pool adapter. These views are plain Django
+coroutines: they share validation with the fast-path views, resolve domains
+from the in-process website registry, and write through the async ORM or,
+in buffered mode, ``redis.asyncio``. Responses mirror the sync endpoints.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from ...registry import website_registry
+from ...services.backpressure import admission_controller, rejection_response
+from ...services.ingestion_service import IngestionService
+from ...services.tracking_service import TrackingService
+from ...utils.common import detect_browser, detect_device_type, get_client_info
+from .fast_views import (
+    NDJSON_ADMISSION_KEY,
+    batch_items,
+    batch_response,
+    event_data,
+    ingestion_response,
+    invalid_json,
+    is_ndjson,
+    is_server_batch,
+    ndjson_batch,
+    pageview_data,
+    parse_body,
+)
+from .serializers import SessionEndSerializer, SessionStartSerializer
+
+
+@csrf_exempt
+@require_POST
+async def pageview(request):
+    data = parse_body(request)
+    if data is None:
+        return invalid_json()
+    domain, session_id, validated, errors = pageview_data(request, data)
+    if errors:
+        return JsonResponse(errors, status=400)
+    with admission_controller.admission(domain) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = await IngestionService.asubmit(
+            "pageview", domain, session_id, validated
+        )
+    return ingestion_response(result)
+
+
+@csrf_exempt
+@require_POST
+async def event(request):
+    data = parse_body(request)
+    if data is None:
+        return invalid_json()
+    domain, session_id, validated, errors = event_data(data)
+    if errors:
+        return JsonResponse(errors, status=400)
+    with admission_controller.admission(domain) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = await IngestionService.asubmit("event", domain, session_id, validated)
+    return ingestion_response(result)
+
+
+@csrf_exempt
+@require_POST
+async def session_start(request):
+    data = parse_body(request)
+    if not isinstance(data, dict):
+        return invalid_json()
+
+    # Warm the registry so validate_domain does not query from the event loop
+    await website_registry.aget_many([data.get("domain")])
+    serializer = SessionStartSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    validated = dict(serializer.validated_data)
+    domain = validated.pop("domain")
+    client_info = get_client_info(request)
+    for field in ("user_agent", "ip_address", "country"):
+        validated.setdefault(field, client_info[field])
+    user_agent = validated.get("user_agent", "")
+    validated.setdefault("device_type", detect_device_type(user_agent))
+    validated.setdefault("browser", detect_browser(user_agent))
+
+    _, result = await TrackingService.astart_session(domain, validated)
+    return JsonResponse(result, status=400 if "error" in result else 201)
+
+
+@csrf_exempt
+@require_POST
+async def session_end(request):
+    data = parse_body(request)
+    if not isinstance(data, dict):
+        return invalid_json()
+    serializer = SessionEndSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    result = await TrackingService.aend_session(
+        serializer.validated_data["domain"], serializer.validated_data["session_id"]
+    )
+    return JsonResponse(result, status=400 if "error" in result else 200)
+
+
+@csrf_exempt
+@require_POST
+async def batch(request):
+    if is_ndjson(request):
+        with admission_controller.admission(NDJSON_ADMISSION_KEY) as rejection:
+            if rejection:
+                return rejection_response(rejection)
+            body, status = await sync_to_async(ndjson_batch)(request)
+        return JsonResponse(body, status=status)
+
+    data = parse_body(request)
+    if data is None:
+        return invalid_json()
+    trusted = await sync_to_async(is_server_batch)(request)
+    items, errors = batch_items(request, data, trusted)
+    if not items:
+        return batch_response({"status": "ok", "successful_count": 0}, errors)
+    with admission_controller.admission(items[0]["domain"]) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = await IngestionService.asubmit_batch(items)
+    return batch_response(result, errors)
@@ -0,0 +1,472 @@
+"""
+Lean tracking views served by the fast-path handler.
+
+Plain Django views with the same request/response contract as the DRF
+views: JSON bodies are validated with precompiled validators and passed
+straight to the ingestion service, skipping DRF's request wrapping,
+content negotiation and per-request serializer construction.
+"""
+import base64
+import json
+import logging
+import zlib
+from itertools import islice
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, QueryDict
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from accounts.services.auth_services import validate_api_key
+
+from ...services.backpressure import admission_controller, rejection_response
+from ...services.ingestion_service import IngestionService
+from ...utils.common import anonymous_session_id, get_client_info
+from ...utils.geoip import enrich_countries
+from ...utils.ndjson import (
+    NDJSON_CONTENT_TYPE,
+    NDJSONError,
+    iter_ndjson,
+    open_stream,
+)
+from ...utils.user_agent import classify_many
+from .serializers import (
+    BatchEventSerializer,
+    BatchPageViewSerializer,
+    EventSerializer,
+    PageViewSerializer,
+)
+from .validation import CompiledValidator
+
+logger = logging.getLogger(__name__)
+
+PAGEVIEW_VALIDATOR = CompiledValidator(PageViewSerializer)
+EVENT_VALIDATOR = CompiledValidator(EventSerializer)
+VALIDATORS = {"pageview": PAGEVIEW_VALIDATOR, "event": EVENT_VALIDATOR}
+BATCH_VALIDATORS = {
+    "pageview": CompiledValidator(BatchPageViewSerializer),
+    "event": CompiledValidator(BatchEventSerializer),
+}
+
+# Transparent 1x1 GIF served by the tracking pixel
+PIXEL_GIF = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+# Compact query-string keys used by pixels and beacons
+BEACON_FIELDS = {
+    "d": "domain",
+    "s": "session_id",
+    "u": "page_url",
+    "ti": "page_title",
+    "r": "referrer",
+    "lt": "load_time",
+    "n": "event_name",
+    "e": "event_data",
+    "i": "event_id",
+}
+BEACON_TYPES = {"pv": "pageview", "ev": "event"}
+
+# Bulk NDJSON uploads share one fairness bucket so they cannot starve
+# per-website beacon traffic
+NDJSON_ADMISSION_KEY = "ndjson"
+
+
+def parse_body(request):
+    """
+    Return the decoded JSON body, or None if it is not valid JSON
+    """
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+def invalid_json():
+    return JsonResponse({"error": "Invalid JSON body"}, status=400)
+
+
+def ingestion_response(result):
+    """
+    Map an ingestion result to a response: 201 when stored, 202 when queued,
+    sampled or filtered out and 200 when the hit is a retry of one already
+    accepted
+    """
+    if "error" in result:
+        return JsonResponse(result, status=400)
+    if result.get("status") in ("queued", "sampled", "filtered"):
+        return JsonResponse(result, status=202)
+    if result.get("status") == "duplicate":
+        return JsonResponse(result, status=200)
+    return JsonResponse(result, status=201)
+
+
+def pageview_data(request, data):
+    """
+    Validate a pageview body and fill in client info.
+    Returns ``(domain, session_id, data, errors)``.
+    """
+    validated, errors = PAGEVIEW_VALIDATOR.validate(data)
+    if errors:
+        return None, None, None, errors
+    domain = validated.pop("domain")
+    session_id = validated.pop("session_id")
+    # Page views store no country, so skip the GeoIP lookup
+    client_info = get_client_info(request, geoip=False)
+    validated.setdefault("user_agent", client_info["user_agent"])
+    validated.setdefault("ip_address", client_info["ip_address"])
+    return domain, session_id, validated, None
+
+
+def event_data(data):
+    """
+    Validate an event body. Returns ``(domain, session_id, data, errors)``.
+    """
+    validated, errors = EVENT_VALIDATOR.validate(data)
+    if errors:
+        return None, None, None, errors
+    domain = validated.pop("domain")
+    session_id = validated.pop("session_id")
+    validated.pop("user_agent", None)
+    validated.pop("ip_address", None)
+    return domain, session_id, validated, None
+
+
+def is_server_batch(request):
+    """
+    True if the batch carries a valid API key, i.e. it is relayed by a
+    customer's backend rather than sent from a browser
+    """
+    try:
+        return validate_api_key(request.headers.get("X-API-Key")) is not None
+    except ValueError:
+        return False
+
+
+def bot_check(validated, trusted):
+    """
+    Bot check input of a batch item: only the user agent and IP the item
+    supplies, since the request may come from a server relaying the hit.
+    Items of trusted (authenticated) batches are not checked.
+    """
+    if trusted:
+        return None
+    return validated.get("user_agent"), validated.get("ip_address")
+
+
+def batch_items(request, data, trusted=False):
+    """
+    Validate batch items and add client info, device type, browser and
+    country.
+    Returns ``(items, errors)``; invalid items are reported, not raised.
+    """
+    # Countries are resolved per item IP below, in one pass
+    client_info = get_client_info(request, geoip=False)
+    items = []
+    errors = []
+    for item in data if isinstance(data, list) else [data]:
+        event_type = item.get("type", "pageview") if isinstance(item, dict) else None
+        validator = BATCH_VALIDATORS.get(event_type)
+        if validator is None:
+            errors.append({"error": "Invalid event type", "item": item})
+            continue
+
+        validated, item_errors = validator.validate(item)
+        if item_errors:
+            errors.append({"error": item_errors, "item": item})
+            continue
+
+        validated["type"] = event_type
+        validated["bot_check"] = bot_check(validated, trusted)
+        user_agent = validated.get("user_agent") or client_info["user_agent"]
+        validated["user_agent"] = user_agent
+        validated.setdefault("ip_address", client_info["ip_address"])
+        validated["country"] = validated.get("country") or client_info["country"]
+        validated["device_type"] = validated.get("device_type")
+        validated["browser"] = validated.get("browser")
+        items.append(validated)
+
+    # Items of one batch nearly always share a user agent
+    agents = classify_many([item["user_agent"] for item in items])
+    for item, agent in zip(items, agents):
+        item["device_type"] = item["device_type"] or agent.device_type
+        item["browser"] = item["browser"] or agent.browser
+    enrich_countries(items)
+    return items, errors
+
+
+def batch_response(result, errors):
+    """
+    Same status mapping as ``BatchTrackingAPI``
+    """
+    if "error" in result:
+        return JsonResponse(result, status=503)
+
+    errors.extend(result.pop("errors", []))
+    if errors:
+        result.update(status="partial", errors=errors)
+        result.setdefault("successful_count", 0)
+        return JsonResponse(result, status=207)
+    if result["status"] in ("queued", "filtered"):
+        return JsonResponse(result, status=202)
+    return JsonResponse(result, status=201)
+
+
+# Per-chunk batch result counts summed into the NDJSON response
+COUNT_KEYS = (
+    "successful_count",
+    "queued_count",
+    "duplicate_count",
+    "sampled_count",
+    "filtered_count",
+)
+
+
+def is_ndjson(request):
+    return request.content_type == NDJSON_CONTENT_TYPE
+
+
+def ndjson_batch(request):
+    """
+    Ingest an NDJSON (optionally gzip-encoded) batch body in chunks of
+    ``TRACKING_NDJSON_CHUNK_SIZE`` lines, so arbitrarily large exports are
+    validated and written with bounded memory. Returns ``(body, status)``;
+    errors reference line numbers and are capped at
+    ``TRACKING_NDJSON_MAX_ERRORS``.
+    """
+    counts = {"line_count": 0}
+    errors = []
+    error_count = 0
+    trusted = is_server_batch(request)
+
+    def add_error(line, error):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < settings.TRACKING_NDJSON_MAX_ERRORS:
+            errors.append({"line": line, "error": error})
+
+    try:
+        stream = open_stream(request, request.META.get("HTTP_CONTENT_ENCODING"))
+    except NDJSONError as e:
+        return {"error": str(e)}, 415
+
+    lines = iter_ndjson(stream, settings.TRACKING_NDJSON_MAX_LINE_BYTES)
+    try:
+        while True:
+            chunk = list(islice(lines, settings.TRACKING_NDJSON_CHUNK_SIZE))
+            if not chunk:
+                break
+            counts["line_count"] += len(chunk)
+
+            objs = []
+            line_of = {}
+            for line, obj, error in chunk:
+                if error:
+                    add_error(line, error)
+                else:
+                    objs.append(obj)
+                    line_of[id(obj)] = line
+
+            items, item_errors = batch_items(request, objs, trusted)
+            failed = {id(error["item"]) for error in item_errors}
+            valid_lines = [line_of[id(obj)] for obj in objs if id(obj) not in failed]
+            line_of.update((id(item), line) for item, line in zip(items, valid_lines))
+            for error in item_errors:
+                add_error(line_of[id(error["item"])], error["error"])
+            if not items:
+                continue
+
+            result = IngestionService.submit_batch(items, imported=True)
+            if "error" in result:
+                body = dict(counts, error=result["error"], error_count=error_count)
+                return body, 503
+            for error in result.get("errors", []):
+                add_error(line_of.get(id(error["item"])), error["error"])
+            for key in COUNT_KEYS:
+                if key in result:
+                    counts[key] = counts.get(key, 0) + result[key]
+    except (OSError, EOFError, zlib.error) as e:
+        # Corrupt gzip data; chunks before this point are already stored
+        logger.warning(f"Aborted NDJSON batch: {e}")
+        add_error(None, f"Invalid request body: {e}")
+
+    if error_count:
+        counts.update(status="partial", errors=errors, error_count=error_count)
+        return counts, 207
+    if "queued_count" in counts:
+        return dict(counts, status="queued"), 202
+    counts.setdefault("successful_count", 0)
+    return dict(counts, status="ok"), 201
+
+
+def beacon_data(request, params):
+    """
+    Decode and validate a compact beacon payload.
+    Returns ``(hit_type, domain, session_id, data, errors)``.
+    """
+    hit_type = BEACON_TYPES.get(params.get("t", "pv"))
+    if hit_type is None:
+        return None, None, None, None, {"t": ["Invalid event type"]}
+
+    data = {
+        BEACON_FIELDS[key]: value
+        for key, value in params.items()
+        if key in BEACON_FIELDS
+    }
+    if "event_data" in data:
+        try:
+            data["event_data"] = json.loads(data["event_data"])
+        except ValueError:
+            return None, None, None, None, {"event_data": ["Value must be valid JSON."]}
+
+    # Zero-JS pixels only know the page from the Referer header
+    if "page_url" not in data and request.META.get("HTTP_REFERER"):
+        data["page_url"] = request.META["HTTP_REFERER"]
+    if not data.get("session_id") and data.get("domain"):
+        client_info = get_client_info(request, geoip=False)
+        data["session_id"] = anonymous_session_id(
+            data["domain"], client_info["ip_address"], client_info["user_agent"]
+        )
+
+    if hit_type == "pageview":
+        return (hit_type, *pageview_data(request, data))
+    return (hit_type, *event_data(data))
+
+
+@require_GET
+def pixel(request):
+    """
+    ``<img>`` tracking pixel: hit fields come from the compact query string
+    and the response is always the 1x1 GIF
+    """
+    hit_type, domain, session_id, data, errors = beacon_data(request, request.GET)
+    response = HttpResponse(PIXEL_GIF, content_type="image/gif")
+    response["Cache-Control"] = "no-cache, no-store, must-revalidate"
+    if errors:
+        response.status_code = 400
+        return response
+
+    with admission_controller.admission(domain) as rejection:
+        if rejection:
+            response.status_code = rejection.status
+            response["Retry-After"] = str(rejection.retry_after)
+            return response
+        result = IngestionService.submit(hit_type, domain, session_id, data)
+    if "error" in result:
+        response.status_code = 400
+    return response
+
+
+@csrf_exempt
+@require_POST
+def beacon(request):
+    """
+    ``navigator.sendBeacon`` endpoint. The body is sent as text/plain and
+    holds either the compact query-string encoding or a JSON object with
+    the same keys. Returns 204 on success.
+    """
+    body = request.body.decode("utf-8", errors="replace").strip()
+    if body.startswith("{"):
+        params = parse_body(request)
+        if not isinstance(params, dict):
+            return invalid_json()
+        params = {key: value for key, value in params.items() if value is not None}
+        if isinstance(params.get("e"), (dict, list)):
+            params["e"] = json.dumps(params["e"])
+    else:
+        params = QueryDict(body)
+
+    hit_type, domain, session_id, data, errors = beacon_data(request, params)
+    if errors:
+        return JsonResponse(errors, status=400)
+
+    with admission_controller.admission(domain) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = IngestionService.submit(hit_type, domain, session_id, data)
+    if "error" in result:
+        return JsonResponse(result, status=400)
+    return HttpResponse(status=204)
+
+
+@csrf_exempt
+@require_POST
+def pageview(request):
+    data = parse_body(request)
+    if data is None:
+        return invalid_json()
+    domain, session_id, validated, errors = pageview_data(request, data)
+    if errors:
+        return JsonResponse(errors, status=400)
+    with admission_controller.admission(domain) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = IngestionService.submit("pageview", domain, session_id, validated)
+    return ingestion_response(result)
+
+
+@csrf_exempt
+@require_POST
+def event(request):
+    data = parse_body(request)
+    if data is None:
+        return invalid_json()
+    domain, session_id, validated, errors = event_data(data)
+    if errors:
+        return JsonResponse(errors, status=400)
+    with admission_controller.admission(domain) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = IngestionService.submit("event", domain, session_id, validated)
+    return ingestion_response(result)
+
+
+@csrf_exempt
+@require_POST
+def batch(request):
+    if is_ndjson(request):
+        with admission_controller.admission(NDJSON_ADMISSION_KEY) as rejection:
+            if rejection:
+                return rejection_response(rejection)
+            body, status = ndjson_batch(request)
+        return JsonResponse(body, status=status)
+
+    data = parse_body(request)
+    if data is None:
+        return invalid_json()
+    items, errors = batch_items(request, data, is_server_batch(request))
+    if not items:
+        return batch_response({"status": "ok", "successful_count": 0}, errors)
+    with admission_controller.admission(items[0]["domain"]) as rejection:
+        if rejection:
+            return rejection_response(rejection)
+        result = IngestionService.submit_batch(items)
+    return batch_response(result, errors)
+
+
+@require_GET
+def metrics(request):
+    """
+    Ingestion backpressure metrics in the Prometheus text format. Shed
+    counters are cluster-wide; admitted and inflight are per process.
+    """
+    token = settings.TRACKING_METRICS_TOKEN
+    if token and request.META.get("HTTP_AUTHORIZATION") != f"Bearer {token}":
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    controller = admission_controller
+    shed = controller.shed_totals()
+    lines = ["# TYPE tracking_shed_total counter"]
+    lines += [
+        f'tracking_shed_total{{reason="{reason}"}} {count}'
+        for reason, count in sorted(shed.items())
+    ]
+    lines += [
+        "# TYPE tracking_admitted_total counter",
+        f"tracking_admitted_total {controller.admitted}",
+        "# TYPE tracking_inflight gauge",
+        f"tracking_inflight {controller.inflight}",
+        "# TYPE tracking_buffer_depth gauge",
+        f"tracking_buffer_depth {controller.buffer_depth()}",
+    ]
+    return HttpResponse(
+        "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4"
+    )
@@ -1,13 +1,21 @@
 from rest_framework import serializers
 
-from ...models import Event, PageView, Session, Website
+from ...models import Event, PageView, Session
+from ...registry import website_registry
 
 
 class PageViewSerializer(serializers.ModelSerializer):
     domain = serializers.CharField(write_only=True)
     session_id = serializers.CharField(max_length=100)
+    # Interned on the model, so declared here rather than introspected
+    page_url = serializers.CharField()
+    page_title = serializers.CharField(
+        max_length=500, required=False, allow_blank=True, allow_null=True
+    )
+    referrer = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     user_agent = serializers.CharField(write_only=True, required=False)
-    ip_address = serializers.CharField(write_only=True, required=False)
+    ip_address = serializers.IPAddressField(write_only=True, required=False)
+    event_id = serializers.CharField(max_length=64, write_only=True, required=False)
 
     class Meta:
         model = PageView
@@ -20,6 +28,7 @@ class PageViewSerializer(serializers.ModelSerializer):
             "load_time",
             "user_agent",
             "ip_address",
+            "event_id",
         ]
         read_only_fields = ["website", "session"]
 
@@ -28,7 +37,8 @@ class EventSerializer(serializers.ModelSerializer):
     domain = serializers.CharField(write_only=True)
     session_id = serializers.CharField(max_length=100)
     user_agent = serializers.CharField(write_only=True, required=False)
-    ip_address = serializers.CharField(write_only=True, required=False)
+    ip_address = serializers.IPAddressField(write_only=True, required=False)
+    event_id = serializers.CharField(max_length=64, write_only=True, required=False)
 
     class Meta:
         model = Event
@@ -40,10 +50,37 @@ class EventSerializer(serializers.ModelSerializer):
             "page_url",
             "user_agent",
             "ip_address",
+            "event_id",
         ]
         read_only_fields = ["website", "session"]
 
 
+class BatchItemSerializer(serializers.Serializer):
+    """
+    Session attributes a batch item may carry, bounded like ``Session``
+    """
+
+    country = serializers.CharField(
+        max_length=2, required=False, allow_blank=True, allow_null=True
+    )
+    browser = serializers.CharField(
+        max_length=50, required=False, allow_blank=True, allow_null=True
+    )
+    device_type = serializers.CharField(
+        max_length=20, required=False, allow_blank=True, allow_null=True
+    )
+
+
+class BatchPageViewSerializer(BatchItemSerializer, PageViewSerializer):
+    class Meta(PageViewSerializer.Meta):
+        fields = PageViewSerializer.Meta.fields + ["country", "browser", "device_type"]
+
+
+class BatchEventSerializer(BatchItemSerializer, EventSerializer):
+    class Meta(EventSerializer.Meta):
+        fields = EventSerializer.Meta.fields + ["country", "browser", "device_type"]
+
+
 class SessionStartSerializer(serializers.ModelSerializer):
     domain = serializers.CharField(write_only=True, required=True)
 
@@ -60,7 +97,7 @@ class SessionStartSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["website"]
     def validate_domain(self, value):
-        if not Website.objects.filter(domain=value, is_active=True).exists():
+        if website_registry.get_active(value) is None:
             raise serializers.ValidationError("Website with this domain does not exist or is inactive.")
         return value
 
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import async_views, fast_views, views
 app_name = "api-v1"
 urlpatterns = [
     path("pageview/", views.PageViewAPI.as_view(), name="track-pageview"),
@@ -8,4 +8,14 @@ urlpatterns = [
     path("session/start/", views.SessionStartAPI.as_view(), name="session-start"),
     path("session/end/", views.SessionEndAPI.as_view(), name="session-end"),
     path("batch/", views.BatchTrackingAPI.as_view(), name="batch-tracking"),
+    # Pixel and sendBeacon endpoints with compact query-string payloads
+    path("p.gif", fast_views.pixel, name="track-pixel"),
+    path("beacon/", fast_views.beacon, name="track-beacon"),
+    path("metrics/", fast_views.metrics, name="ingestion-metrics"),
+    # Native async variants for ASGI deployments
+    path("async/pageview/", async_views.pageview, name="track-pageview-async"),
+    path("async/event/", async_views.event, name="track-event-async"),
+    path("async/session/start/", async_views.session_start, name="session-start-async"),
+    path("async/session/end/", async_views.session_end, name="session-end-async"),
+    path("async/batch/", async_views.batch, name="batch-tracking-async"),
 ]
@@ -0,0 +1,150 @@
+"""
+Precompiled validators for the tracking fast path.
+
+A validator is compiled once per serializer class from the serializer's own
+field definitions (required, allow_null, allow_blank, max_length and error
+messages), so the fast path accepts exactly the same payloads and reports
+the same errors as the DRF views, without instantiating a serializer and
+its validators for every hit.
+"""
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.utils.ipv6 import clean_ipv6_address
+from rest_framework import serializers
+
+
+class Invalid(Exception):
+    pass
+
+
+def _char_converter(field):
+    allow_blank = field.allow_blank
+    trim = field.trim_whitespace
+    max_length = field.max_length
+    messages = field.error_messages
+
+    def convert(value):
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise Invalid(str(messages["invalid"]))
+        value = str(value)
+        if trim:
+            value = value.strip()
+        if value == "":
+            if not allow_blank:
+                raise Invalid(str(messages["blank"]))
+            return value
+        if max_length is not None and len(value) > max_length:
+            raise Invalid(str(messages["max_length"]).format(max_length=max_length))
+        return value
+
+    return convert
+
+
+def _ip_converter(field):
+    convert_char = _char_converter(field)
+    message = str(field.error_messages["invalid"])
+
+    def convert(value):
+        if not isinstance(value, str):
+            raise Invalid(message)
+        try:
+            if ":" in value:
+                value = clean_ipv6_address(value, field.unpack_ipv4)
+            else:
+                value = convert_char(value)
+                if value == "":
+                    return value
+            validate_ipv46_address(value)
+        except ValidationError:
+            raise Invalid(message)
+        return value
+
+    return convert
+
+
+def _float_converter(field):
+    messages = field.error_messages
+
+    def convert(value):
+        if isinstance(value, str) and len(value) > field.MAX_STRING_LENGTH:
+            raise Invalid(str(messages["max_string_length"]))
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise Invalid(str(messages["invalid"]))
+
+    return convert
+
+
+def _json_converter(field):
+    # Payloads come from a JSON body, so they are already serializable
+    return lambda value: value
+
+
+# IPAddressField is a CharField, so it comes first
+CONVERTERS = (
+    (serializers.IPAddressField, _ip_converter),
+    (serializers.CharField, _char_converter),
+    (serializers.FloatField, _float_converter),
+    (serializers.JSONField, _json_converter),
+)
+
+
+def _compile_field(name, field):
+    for field_class, factory in CONVERTERS:
+        if isinstance(field, field_class):
+            convert = factory(field)
+            break
+    else:
+        raise TypeError(f"Cannot compile {type(field).__name__} field '{name}'")
+
+    required = field.required
+    allow_null = field.allow_null
+    messages = field.error_messages
+
+    def check(data, validated, errors):
+        if name not in data:
+            if required:
+                errors[name] = [str(messages["required"])]
+            return
+        value = data[name]
+        if value is None:
+            if allow_null:
+                validated[name] = None
+            else:
+                errors[name] = [str(messages["null"])]
+            return
+        try:
+            validated[name] = convert(value)
+        except Invalid as e:
+            errors[name] = [str(e)]
+
+    return check
+
+
+class CompiledValidator:
+    """
+    Validate hit payloads with checks compiled from a serializer class
+    """
+
+    def __init__(self, serializer_class):
+        self._checks = [
+            _compile_field(name, field)
+            for name, field in serializer_class().fields.items()
+            if not field.read_only
+        ]
+
+    def validate(self, data):
+        """
+        Return ``(validated_data, errors)``; errors mirror ``serializer.errors``
+        """
+        if not isinstance(data, dict):
+            message = str(serializers.Serializer.default_error_messages["invalid"])
+            return {}, {
+                "non_field_errors": [message.format(datatype=type(data).__name__)]
+            }
+        validated = {}
+        errors = {}
+        for check in self._checks:
+            check(data, validated, errors)
+        return validated, errors
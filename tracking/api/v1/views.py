@@ -1,12 +1,24 @@
-from django.db import transaction
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from ...services.backpressure import admission_controller, rejection_response
+from ...services.ingestion_service import IngestionService
 from ...services.tracking_service import TrackingService
 from ...utils.common import detect_browser, detect_device_type, get_client_info
+from ...utils.geoip import enrich_countries
+from ...utils.user_agent import classify_many
+from .fast_views import (
+    NDJSON_ADMISSION_KEY,
+    bot_check,
+    is_ndjson,
+    is_server_batch,
+    ndjson_batch,
+)
 from .serializers import (
+    BatchEventSerializer,
+    BatchPageViewSerializer,
     EventSerializer,
     PageViewSerializer,
     SessionEndSerializer,
@@ -14,6 +26,21 @@ from .serializers import (
 )
 
 
+def ingestion_response(result):
+    """
+    Map an ingestion result to a response: 201 when stored, 202 when queued,
+    sampled or filtered out and 200 when the hit is a retry of one already
+    accepted
+    """
+    if "error" in result:
+        return Response(result, status=status.HTTP_400_BAD_REQUEST)
+    if result.get("status") in ("queued", "sampled", "filtered"):
+        return Response(result, status=status.HTTP_202_ACCEPTED)
+    if result.get("status") == "duplicate":
+        return Response(result, status=status.HTTP_200_OK)
+    return Response(result, status=status.HTTP_201_CREATED)
+
+
 class SessionStartAPI(APIView):
     """
     Register a new user session when tracking begins
@@ -71,21 +98,21 @@ class PageViewAPI(APIView):
             domain = serializer.validated_data.pop("domain")
             session_id = serializer.validated_data.pop("session_id")
 
-            # Add client info if not provided
-            client_info = get_client_info(request)
+            # Add client info if not provided; page views store no country
+            client_info = get_client_info(request, geoip=False)
             if "user_agent" not in serializer.validated_data:
                 serializer.validated_data["user_agent"] = client_info["user_agent"]
             if "ip_address" not in serializer.validated_data:
                 serializer.validated_data["ip_address"] = client_info["ip_address"]
 
-            # Record the page view via the service layer
-            result = TrackingService.record_pageview(
-                domain, session_id, serializer.validated_data
-            )
-
-            if "error" in result:
-                return Response(result, status=status.HTTP_400_BAD_REQUEST)
-            return Response(result, status=status.HTTP_201_CREATED)
+            # Record (or buffer) the page view via the service layer
+            with admission_controller.admission(domain) as rejection:
+                if rejection:
+                    return rejection_response(rejection)
+                result = IngestionService.submit(
+                    "pageview", domain, session_id, serializer.validated_data
+                )
+            return ingestion_response(result)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -99,13 +126,13 @@ class EventAPI(APIView):
             session_id = serializer.validated_data.pop("session_id")
             serializer.validated_data.pop("user_agent", None)
             serializer.validated_data.pop("ip_address", None)
-            result = TrackingService.record_event(
-                domain, session_id, serializer.validated_data
-            )
-
-            if "error" in result:
-                return Response(result, status=status.HTTP_400_BAD_REQUEST)
-            return Response(result, status=status.HTTP_201_CREATED)
+            with admission_controller.admission(domain) as rejection:
+                if rejection:
+                    return rejection_response(rejection)
+                result = IngestionService.submit(
+                    "event", domain, session_id, serializer.validated_data
+                )
+            return ingestion_response(result)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -127,32 +154,81 @@ class SessionEndAPI(APIView):
 
 
 class BatchTrackingAPI(APIView):
+    """
+    Track many pageviews and events in one request.
+    Items are validated individually; invalid items are reported in the
+    207 response without failing the rest of the batch. Besides a JSON
+    array, accepts ``application/x-ndjson`` bodies, optionally gzip-encoded.
+    """
+
     permission_classes = [AllowAny]
+    serializer_classes = {
+        "pageview": BatchPageViewSerializer,
+        "event": BatchEventSerializer,
+    }
 
-    @transaction.atomic
     def post(self, request):
+        # NDJSON bodies are streamed instead of going through DRF parsers
+        if is_ndjson(request._request):
+            with admission_controller.admission(NDJSON_ADMISSION_KEY) as rejection:
+                if rejection:
+                    return rejection_response(rejection)
+                body, status_code = ndjson_batch(request._request)
+            return Response(body, status=status_code)
+
         data = request.data if isinstance(
             request.data, list) else [request.data]
 
-        # Add client info to all items
-        client_info = get_client_info(request)
+        # Countries are resolved per item IP below, in one pass
+        client_info = get_client_info(request, geoip=False)
+        trusted = is_server_batch(request)
+        items = []
+        errors = []
         for item in data:
-            if "user_agent" not in item:
-                item["user_agent"] = client_info["user_agent"]
-            if "ip_address" not in item:
-                item["ip_address"] = client_info["ip_address"]
-            if "country" not in item:
-                item["country"] = client_info["country"]
-
-            # Detect device type and browser
-            user_agent = item.get("user_agent", "")
-            if "device_type" not in item:
-                item["device_type"] = detect_device_type(user_agent)
-            if "browser" not in item:
-                item["browser"] = detect_browser(user_agent)
-
-        result = TrackingService.batch_track_events(data)
-
-        if result["status"] == "partial":
+            event_type = item.get("type", "pageview")
+            serializer_class = self.serializer_classes.get(event_type)
+            if serializer_class is None:
+                errors.append({"error": "Invalid event type", "item": item})
+                continue
+
+            serializer = serializer_class(data=item)
+            if not serializer.is_valid():
+                errors.append({"error": serializer.errors, "item": item})
+                continue
+
+            # Add client info to the item
+            validated = dict(serializer.validated_data, type=event_type)
+            validated["bot_check"] = bot_check(validated, trusted)
+            user_agent = validated.get("user_agent") or client_info["user_agent"]
+            validated["user_agent"] = user_agent
+            validated.setdefault("ip_address", client_info["ip_address"])
+            validated["country"] = validated.get("country") or client_info["country"]
+            validated["device_type"] = validated.get("device_type")
+            validated["browser"] = validated.get("browser")
+            items.append(validated)
+
+        # Detect device type and browser, once per distinct user agent
+        agents = classify_many([item["user_agent"] for item in items])
+        for item, agent in zip(items, agents):
+            item["device_type"] = item["device_type"] or agent.device_type
+            item["browser"] = item["browser"] or agent.browser
+        enrich_countries(items)
+
+        result = {"status": "ok", "successful_count": 0}
+        if items:
+            with admission_controller.admission(items[0]["domain"]) as rejection:
+                if rejection:
+                    return rejection_response(rejection)
+                result = IngestionService.submit_batch(items)
+
+        if "error" in result:
+            return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        errors.extend(result.pop("errors", []))
+        if errors:
+            result.update(status="partial", errors=errors)
+            result.setdefault("successful_count", 0)
             return Response(result, status=status.HTTP_207_MULTI_STATUS)
+        if result["status"] in ("queued", "filtered"):
+            return Response(result, status=status.HTTP_202_ACCEPTED)
         return Response(result, status=status.HTTP_201_CREATED)
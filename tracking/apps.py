@@ -5,3 +5,6 @@ class TrackingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "tracking"
     verbose_name = "Data Tracking"
+
+    def ready(self):
+        from tracking import signals  # noqa: F401
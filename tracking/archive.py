@@ -0,0 +1,285 @@
+"""
+Cold archive of raw page views and events in columnar files.
+
+Days older than ``TRACKING_ARCHIVE_AFTER_DAYS`` are moved out of the hot
+tables per website into ``TRACKING_ARCHIVE_ROOT``::
+
+    <root>/<table>/<website_id>/<YYYY-MM-DD>/<first id>/
+        meta.json           row count, column kinds, dictionaries
+        <column>.npy        one NumPy array per column, memory-mappable
+        <column>.bin        UTF-8 JSON values of variable-length columns
+        <column>.offsets.npy
+
+Each archiving pass over a day writes segments of at most
+``TRACKING_ARCHIVE_BATCH_SIZE`` rows; hits arriving late for an archived
+day become further segments. The rows of a segment are deleted from the
+hot table in the transaction that writes it, so a row is always either
+hot or archived. Sessions stay in Postgres; their country, device type
+and browser are copied onto the archived hits. ``tracking.archive_query``
+answers aggregate questions over the segments.
+"""
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracking.models import Website
+from tracking.utils.common import day_bounds
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Stands in for NULL in integer columns
+NULL_ID = np.iinfo(np.int64).min
+
+# Column kinds: "int64" (NULL as NULL_ID), "float" (NULL as NaN), "time"
+# (microseconds since the epoch), "dict" (int32 codes into a per-segment
+# dictionary, -1 for NULL) and "json" (variable-length JSON text)
+COLUMNS = {
+    "page_views": {
+        "id": "int64",
+        "session_id": "int64",
+        "timestamp": "time",
+        "page_url_ref_id": "int64",
+        "page_title_ref_id": "int64",
+        "referrer_ref_id": "int64",
+        "user_agent_ref_id": "int64",
+        "load_time": "float",
+        "ip_address": "json",
+        "sample_rate": "float",
+        "country": "dict",
+        "device_type": "dict",
+        "browser": "dict",
+    },
+    "events": {
+        "id": "int64",
+        "session_id": "int64",
+        "timestamp": "time",
+        "event_name": "dict",
+        "event_data": "json",
+        "page_url": "json",
+        "sample_rate": "float",
+        "country": "dict",
+        "device_type": "dict",
+        "browser": "dict",
+    },
+}
+TABLES = tuple(COLUMNS)
+
+# Deletes one chunk of a website's rows of one day, returning them with
+# the attributes of their session; "json" columns are selected as JSON text
+ARCHIVE_SQL = """
+WITH batch AS (
+    SELECT id, "timestamp" FROM {table}
+    WHERE website_id = %(website_id)s
+      AND "timestamp" >= %(start)s AND "timestamp" < %(end)s
+    ORDER BY id
+    LIMIT %(limit)s
+), gone AS (
+    DELETE FROM {table} t USING batch b
+    WHERE t.id = b.id AND t."timestamp" = b."timestamp"
+    RETURNING t.*
+){cascade}
+SELECT {columns}, s.country, s.device_type, s.browser
+FROM gone g LEFT JOIN sessions s ON s.id = g.session_id
+ORDER BY g.id
+"""
+
+EVENT_PROPERTIES_CASCADE = """, properties AS (
+    DELETE FROM event_properties p USING gone g WHERE p.event_id = g.id
+)"""
+
+SELECTED = {
+    "page_views": (
+        'g.id, g.session_id, g."timestamp", g.page_url_ref_id, '
+        "g.page_title_ref_id, g.referrer_ref_id, g.user_agent_ref_id, "
+        "g.load_time, to_json(host(g.ip_address))::text, g.sample_rate"
+    ),
+    "events": (
+        'g.id, g.session_id, g."timestamp", g.event_name, g.event_data::text, '
+        "to_json(g.page_url)::text, g.sample_rate"
+    ),
+}
+
+
+def archive_root():
+    return Path(settings.TRACKING_ARCHIVE_ROOT)
+
+
+def hot_start(now=None):
+    """
+    Return the start of the hot window, or None if archiving is disabled
+    """
+    if not settings.TRACKING_ARCHIVE_AFTER_DAYS:
+        return None
+    today = timezone.localdate(now or timezone.now())
+    return day_bounds(today - timedelta(days=settings.TRACKING_ARCHIVE_AFTER_DAYS))[0]
+
+
+def to_micros(moment):
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def from_micros(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def encode(kind, values):
+    """
+    Return ``({file suffix: array or bytes}, dictionary)`` for a column
+    """
+    if kind == "int64":
+        array = np.array([NULL_ID if v is None else v for v in values], np.int64)
+        return {".npy": array}, None
+    if kind == "float":
+        array = np.array([np.nan if v is None else v for v in values], np.float64)
+        return {".npy": array}, None
+    if kind == "time":
+        return {".npy": np.array([to_micros(v) for v in values], np.int64)}, None
+    if kind == "dict":
+        dictionary = sorted({v for v in values if v is not None})
+        codes = {value: code for code, value in enumerate(dictionary)}
+        array = np.array([codes.get(v, -1) for v in values], np.int32)
+        return {".npy": array}, dictionary
+    encoded = [("null" if v is None else v).encode() for v in values]
+    offsets = np.zeros(len(encoded) + 1, np.int64)
+    np.cumsum([len(v) for v in encoded], out=offsets[1:])
+    return {".bin": b"".join(encoded), ".offsets.npy": offsets}, None
+
+
+def write_segment(table, website_id, day, rows):
+    """
+    Write ``rows`` (tuples in ``COLUMNS[table]`` order) as a segment of
+    the day and return its directory
+    """
+    columns = COLUMNS[table]
+    directory = archive_root() / table / str(website_id) / day.isoformat()
+    path = directory / str(rows[0][0])
+    staging = directory / f".{rows[0][0]}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    meta = {"rows": len(rows), "columns": columns, "dictionaries": {}}
+    for index, (name, kind) in enumerate(columns.items()):
+        values = [row[index] for row in rows]
+        files, dictionary = encode(kind, values)
+        for suffix, content in files.items():
+            if suffix.endswith(".npy"):
+                np.save(staging / f"{name}{suffix}", content)
+            else:
+                (staging / f"{name}{suffix}").write_bytes(content)
+        if dictionary is not None:
+            meta["dictionaries"][name] = dictionary
+    (staging / "meta.json").write_text(json.dumps(meta))
+    os.replace(staging, path)
+    return path
+
+
+def archive_day(table, website_id, day):
+    """
+    Move a website's rows of ``table`` for ``day`` into the archive.
+    Returns the number of rows moved.
+    """
+    start, end = day_bounds(day)
+    cascade = EVENT_PROPERTIES_CASCADE if table == "events" else ""
+    sql = ARCHIVE_SQL.format(table=table, columns=SELECTED[table], cascade=cascade)
+    moved = 0
+    while True:
+        path = None
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    sql,
+                    {
+                        "website_id": website_id,
+                        "start": start,
+                        "end": end,
+                        "limit": settings.TRACKING_ARCHIVE_BATCH_SIZE,
+                    },
+                )
+                rows = cursor.fetchall()
+                if rows:
+                    path = write_segment(table, website_id, day, rows)
+        except Exception:
+            # The rows stay hot, so the segment must go
+            if path is not None:
+                shutil.rmtree(path, ignore_errors=True)
+            raise
+        if not rows:
+            return moved
+        moved += len(rows)
+
+
+def oldest_day(table, website_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT min("timestamp") FROM {table} WHERE website_id = %s',
+            [website_id],
+        )
+        oldest = cursor.fetchone()[0]
+    return timezone.localdate(oldest) if oldest else None
+
+
+def archive_closed_days(now=None):
+    """
+    Archive every website's page views and events older than the hot
+    window. Returns ``{table: rows moved}``.
+    """
+    moved = {table: 0 for table in TABLES}
+    start = hot_start(now)
+    if start is None:
+        return moved
+    first_hot_day = timezone.localdate(start)
+    for website_id in Website.objects.values_list("id", flat=True):
+        for table in TABLES:
+            day = oldest_day(table, website_id)
+            while day is not None and day < first_hot_day:
+                moved[table] += archive_day(table, website_id, day)
+                day += timedelta(days=1)
+    return moved
+
+
+def day_directories(table, website_id, first=None, last=None):
+    """
+    Return ``[(day, directory)]`` of a website's archived days within
+    ``[first, last]``, ordered by day
+    """
+    root = archive_root() / table / str(website_id)
+    if not root.is_dir():
+        return []
+    days = []
+    for entry in root.iterdir():
+        try:
+            day = date.fromisoformat(entry.name)
+        except ValueError:
+            continue
+        if (first is None or day >= first) and (last is None or day <= last):
+            days.append((day, entry))
+    return sorted(days)
+
+
+def purge(website_id, before):
+    """
+    Delete a website's archived days before ``before``. Returns the number
+    of rows removed.
+    """
+    removed = 0
+    for table in TABLES:
+        for day, directory in day_directories(table, website_id):
+            if day >= before:
+                break
+            for segment in directory.iterdir():
+                meta = segment / "meta.json"
+                if meta.exists():
+                    removed += json.loads(meta.read_text())["rows"]
+            shutil.rmtree(directory)
+            logger.info(f"Removed archived {table} of {website_id} on {day}")
+    return removed
@@ -0,0 +1,209 @@
+"""
+Vectorized aggregates over the cold archive (``tracking.archive``).
+
+``aggregate`` answers count / count-distinct questions, grouped by
+columns and optionally filtered, by scanning memory-mapped column files
+segment by segment. Its rows have the shape of
+``queryset.values(*group_by, "sample_rate").annotate(...)`` so they can be
+combined with hot rows through ``scale_rows``. Besides stored columns,
+``day`` and ``hour`` group by the hit's timestamp and ``<column>.<field>``
+by a top-level field of a JSON column, e.g. ``event_data.plan``.
+"""
+import json
+from datetime import timedelta
+
+import numpy as np
+
+from tracking import archive
+
+DAY_MICROS = 86_400_000_000
+HOUR_MICROS = 3_600_000_000
+
+
+class Segment:
+    """
+    One archived segment; columns are loaded lazily and memory-mapped
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = json.loads((path / "meta.json").read_text())
+        self.kinds = self.meta["columns"]
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def column(self, name):
+        """
+        Return the stored array of a fixed-width column
+        """
+        if name not in self._columns:
+            self._columns[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+        return self._columns[name]
+
+    def dictionary(self, name):
+        return self.meta["dictionaries"].get(name, [])
+
+    def texts(self, name):
+        """
+        Return the decoded values of a variable-length JSON column
+        """
+        offsets = np.load(self.path / f"{name}.offsets.npy", mmap_mode="r")
+        data = (self.path / f"{name}.bin").read_bytes()
+        return [
+            json.loads(data[start:end]) for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+    def key(self, name):
+        """
+        Return ``(integer array, decode)`` to group by ``name``
+        """
+        if name in ("day", "hour"):
+            size = DAY_MICROS if name == "day" else HOUR_MICROS
+            keys = self.column("timestamp") // size
+            if name == "day":
+                return keys, lambda key: archive.from_micros(key * size).date()
+            return keys, lambda key: archive.from_micros(key * size)
+
+        column, _, field = name.partition(".")
+        if field and self.kinds.get(column) == "json":
+            return self.json_key(column, field)
+
+        kind = self.kinds.get(name)
+        if kind == "dict":
+            dictionary = self.dictionary(name)
+            return self.column(name), lambda code: (
+                dictionary[code] if code >= 0 else None
+            )
+        if kind in ("int64", "time"):
+            return self.column(name), lambda value: (
+                None if value == archive.NULL_ID else int(value)
+            )
+        if kind == "float":
+            return self.column(name), float
+        raise ValueError(f"Cannot group archived {name} values")
+
+    def json_key(self, column, field):
+        """
+        Group key of a top-level field of a JSON column (``event_data.plan``)
+        """
+        values = [
+            json.dumps(value.get(field) if isinstance(value, dict) else None)
+            for value in self.texts(column)
+        ]
+        uniques = sorted(set(values))
+        codes = {value: code for code, value in enumerate(uniques)}
+        keys = np.array([codes[value] for value in values], np.int64)
+        return keys, lambda code: json.loads(uniques[code])
+
+    def values(self, name):
+        """
+        Return ``name`` as an array comparable across segments
+        """
+        if self.kinds.get(name) == "dict":
+            # Code -1 (NULL) picks the trailing ""
+            dictionary = np.array(self.dictionary(name) + [""], dtype=object)
+            return dictionary[self.column(name)]
+        if self.kinds.get(name) == "json":
+            return np.array([json.dumps(value) for value in self.texts(name)])
+        return self.column(name)
+
+    def matches(self, name, value):
+        """
+        Return the mask of rows whose ``name`` equals ``value`` (or is in it,
+        for a list)
+        """
+        wanted = value if isinstance(value, (list, tuple, set)) else [value]
+        if self.kinds.get(name) == "dict":
+            codes = {item: code for code, item in enumerate(self.dictionary(name))}
+            wanted = [codes[item] for item in wanted if item in codes]
+        return np.isin(self.column(name), list(wanted))
+
+
+def segments(table, website_ids, start, end):
+    """
+    Yield the segments of ``website_ids`` that may hold hits in
+    ``[start, end)``
+    """
+    last = (end - timedelta(microseconds=1)).date()
+    for website_id in website_ids:
+        for _, directory in archive.day_directories(
+            table, website_id, start.date(), last
+        ):
+            for path in sorted(directory.iterdir()):
+                if (path / "meta.json").exists():
+                    yield Segment(path)
+
+
+def group(keys):
+    """
+    Return ``(group index per row, number of groups, first row per group)``
+    for parallel key arrays
+    """
+    codes = np.zeros(len(keys[0]), dtype=np.int64)
+    for key in keys:
+        uniques, inverse = np.unique(key, return_inverse=True)
+        codes = codes * len(uniques) + inverse
+    _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    return inverse, len(first), first
+
+
+def aggregate(table, website_ids, start, end, group_by=(), filters=None, **distinct):
+    """
+    Count the archived hits of ``website_ids`` in ``[start, end)`` matching
+    ``filters`` (``{column: value or list}``), per ``group_by`` and sample
+    rate. Every keyword names a column whose distinct values are counted:
+    ``aggregate("events", ids, start, end, ["event_name"],
+    unique_users="session_id")``.
+    """
+    start_micros, end_micros = archive.to_micros(start), archive.to_micros(end)
+    totals = {}
+    for segment in segments(table, website_ids, start, end):
+        timestamps = segment.column("timestamp")
+        mask = (timestamps >= start_micros) & (timestamps < end_micros)
+        for name, value in (filters or {}).items():
+            mask &= segment.matches(name, value)
+        if not mask.any():
+            continue
+
+        keys = [(key[mask], decode) for key, decode in map(segment.key, group_by)]
+        rates = segment.column("sample_rate")[mask]
+        inverse, count, first = group([key for key, _ in keys] + [rates])
+        counts = np.bincount(inverse, minlength=count)
+        distinct_values = {
+            name: segment.values(column)[mask] for name, column in distinct.items()
+        }
+        for index in range(count):
+            row = first[index]
+            group_key = tuple(decode(key[row]) for key, decode in keys)
+            group_key += (float(rates[row]),)
+            total = totals.setdefault(
+                group_key, {"count": 0, **{name: [] for name in distinct}}
+            )
+            total["count"] += int(counts[index])
+            for name, values in distinct_values.items():
+                total[name].append(np.unique(values[inverse == index]))
+
+    rows = []
+    for group_key, total in totals.items():
+        row = dict(zip(group_by, group_key[:-1]))
+        row["sample_rate"] = group_key[-1]
+        row["count"] = total["count"]
+        for name in distinct:
+            row[name] = len(np.unique(np.concatenate(total[name])))
+        rows.append(row)
+    return rows
+
+
+def cold_rows(table, website_ids, start, end, group_by=(), filters=None, **distinct):
+    """
+    ``aggregate`` over the part of ``[start, end)`` older than the hot
+    window; empty when archiving is disabled or the range is all hot
+    """
+    hot_start = archive.hot_start()
+    if hot_start is None or start >= hot_start:
+        return []
+    return aggregate(
+        table, website_ids, start, min(end, hot_start), group_by, filters, **distinct
+    )
@@ -0,0 +1,186 @@
+"""
+Interning of high-cardinality text values stored with page views.
+
+URLs, titles, referrers and user agents live once in lookup tables whose
+primary key is a 64-bit hash of the text, so ``page_views`` rows carry only
+integer ids and the id of a value is known without a round trip. Each
+process remembers ids it has seen committed in a bounded LRU and upserts the
+rest in one statement per batch, before the rows that reference them are
+written.
+"""
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import connection, transaction
+
+# Rows per upsert statement, across all lookup tables
+UPSERT_CHUNK_SIZE = 1000
+
+
+def dimension_id(value):
+    """
+    Return the signed 64-bit id of a text value, None for None. The empty
+    string is a value like any other.
+    """
+    if value is None:
+        return None
+    digest = blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class DimensionCache:
+    """
+    Per-process LRU of ``(table, id) -> value`` for committed lookup rows
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or settings.DIMENSION_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, table, dimension_id):
+        with self._lock:
+            value = self._entries.get((table, dimension_id))
+            if value is not None:
+                self._entries.move_to_end((table, dimension_id))
+            return value
+
+    def remember(self, table, values):
+        with self._lock:
+            for dimension_id, value in values.items():
+                self._entries[(table, dimension_id)] = value
+                self._entries.move_to_end((table, dimension_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dimension_cache = DimensionCache()
+
+
+def intern_values(pending):
+    """
+    Make sure lookup rows exist for ``{Dimension model: {id: value}}``.
+    Values cached as committed are skipped; the rest are upserted with
+    ``ON CONFLICT DO NOTHING`` in a single statement per chunk and cached
+    once the surrounding transaction commits.
+    """
+    rows = []
+    for model, values in pending.items():
+        table = model._meta.db_table
+        for dimension_id, value in values.items():
+            if dimension_cache.get(table, dimension_id) is None:
+                rows.append((table, dimension_id, value))
+    if not rows:
+        return
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start : start + UPSERT_CHUNK_SIZE]
+        by_table = {}
+        for table, dimension_id, value in chunk:
+            by_table.setdefault(table, []).extend([dimension_id, value])
+
+        statements = [
+            f"i{index} AS (INSERT INTO {table} (id, value) VALUES "
+            + ", ".join(["(%s, %s)"] * (len(params) // 2))
+            + " ON CONFLICT (id) DO NOTHING)"
+            for index, (table, params) in enumerate(by_table.items())
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "WITH " + ", ".join(statements) + " SELECT 1",
+                [param for params in by_table.values() for param in params],
+            )
+
+    interned = {}
+    for table, dimension_id, value in rows:
+        interned.setdefault(table, {})[dimension_id] = value
+    remember_on_commit(interned)
+
+
+def remember_on_commit(interned):
+    """
+    Cache ``{table: {id: value}}`` once the current transaction commits;
+    rows from a rolled-back transaction must not be reported as interned
+    """
+
+    def remember():
+        for table, values in interned.items():
+            dimension_cache.remember(table, values)
+
+    transaction.on_commit(remember)
+
+
+def resolve(model, ids):
+    """
+    Return ``{id: value}`` for lookup ids, from the cache or one query
+    """
+    table = model._meta.db_table
+    found = {}
+    missing = []
+    for dimension_id in set(ids):
+        if dimension_id is None:
+            continue
+        value = dimension_cache.get(table, dimension_id)
+        if value is None:
+            missing.append(dimension_id)
+        else:
+            found[dimension_id] = value
+    if missing:
+        fetched = dict(model.objects.filter(id__in=missing).values_list("id", "value"))
+        dimension_cache.remember(table, fetched)
+        found.update(fetched)
+    return found
+
+
+def dimension_property(name):
+    """
+    Expose the ``<name>_ref`` lookup foreign key as a plain text attribute,
+    so ``PageView(page_url="/")`` and ``pageview.page_url`` keep working
+    """
+    ref = f"{name}_ref"
+
+    def get(self):
+        pending = self.__dict__.get("_dimension_values", {})
+        if name in pending:
+            return pending[name]
+        if getattr(self, f"{ref}_id") is None:
+            return None
+        return getattr(self, ref).value
+
+    def set(self, value):
+        self.__dict__.setdefault("_dimension_values", {})[name] = value
+        setattr(self, f"{ref}_id", dimension_id(value))
+
+    return property(get, set)
+
+
+def intern_instances(instances):
+    """
+    Intern the text values assigned through ``dimension_property`` on
+    unsaved model instances, in one upsert for the whole batch
+    """
+    pending = {}
+    for instance in instances:
+        for name, value in instance.__dict__.get("_dimension_values", {}).items():
+            if value is None:
+                continue
+            model = instance._meta.get_field(f"{name}_ref").related_model
+            pending.setdefault(model, {})[dimension_id(value)] = value
+    if pending:
+        intern_values(pending)
+
+
+class InternedDimensionsMixin:
+    """
+    Model mixin that interns assigned dimension values before saving
+    """
+
+    def save(self, *args, **kwargs):
+        intern_instances([self])
+        super().save(*args, **kwargs)
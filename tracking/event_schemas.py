@@ -0,0 +1,198 @@
+"""
+Per-website event schemas: validation at ingest and property promotion.
+
+Each process caches the compiled schemas of a website for
+``EVENT_SCHEMA_REGISTRY_TTL`` seconds (evicted locally when a schema is
+saved). Events whose name has a schema are checked against it before they
+are recorded or buffered. Promoted properties are written to
+``event_properties`` by the same statement that inserts the events, see
+``PROMOTED_PROPERTIES_CTE``.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# properties: {name: (type, required)}; promoted is only used in SQL
+CompiledSchema = namedtuple("CompiledSchema", ["properties", "strict"])
+
+TYPE_CHECKS = {
+    "string": lambda value: isinstance(value, str),
+    "number": lambda value: isinstance(value, (int, float))
+    and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+# Appended to a statement whose ``inserted`` CTE returns the new events'
+# id, website_id, event_name, event_data, timestamp and sample_rate
+PROMOTED_PROPERTIES_CTE = """
+promoted AS (
+    INSERT INTO event_properties (
+        event_id, website_id, event_name, name, string_value, number_value,
+        timestamp, sample_rate
+    )
+    SELECT e.id, e.website_id, e.event_name, p.key,
+           CASE WHEN p.value ->> 'type' <> 'number'
+                THEN e.event_data ->> p.key END,
+           CASE WHEN jsonb_typeof(e.event_data -> p.key) = 'number'
+                THEN (e.event_data ->> p.key)::double precision END,
+           e.timestamp, e.sample_rate
+    FROM inserted e
+    JOIN event_schemas s
+      ON s.website_id = e.website_id AND s.event_name = e.event_name
+    CROSS JOIN LATERAL jsonb_each(s.properties) p
+    WHERE (p.value ->> 'promoted')::boolean
+      AND jsonb_typeof(e.event_data -> p.key) IN ('string', 'number', 'boolean')
+)
+SELECT count(*) FROM inserted
+"""
+
+
+def compile_schema(properties, strict):
+    return CompiledSchema(
+        {
+            name: (spec.get("type", "string"), bool(spec.get("required")))
+            for name, spec in properties.items()
+        },
+        strict,
+    )
+
+
+def validate_event_data(schema, event_data):
+    """
+    Return a list of error messages for ``event_data`` under ``schema``
+    """
+    if event_data is None:
+        event_data = {}
+    if not isinstance(event_data, dict):
+        return ["event_data must be an object"]
+
+    errors = []
+    for name, (type_name, required) in schema.properties.items():
+        if name not in event_data or event_data[name] is None:
+            if required:
+                errors.append(f"{name} is required")
+        elif not TYPE_CHECKS[type_name](event_data[name]):
+            errors.append(f"{name} must be a {type_name}")
+    if schema.strict:
+        undeclared = sorted(set(event_data) - set(schema.properties))
+        errors.extend(f"{name} is not declared" for name in undeclared)
+    return errors
+
+
+class EventSchemaRegistry:
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._entries = {}  # website_id -> ({event_name: schema}, expires_at)
+        self._lock = threading.Lock()
+
+    def _fetch(self, website_ids):
+        from tracking.models import EventSchema
+
+        fetched = {website_id: {} for website_id in website_ids}
+        rows = EventSchema.objects.filter(website_id__in=website_ids).values_list(
+            "website_id", "event_name", "properties", "strict"
+        )
+        for website_id, event_name, properties, strict in rows:
+            fetched[website_id][event_name] = compile_schema(properties, strict)
+        return fetched
+
+    def _lookup(self, website_ids):
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._lock:
+            for website_id in website_ids:
+                cached = self._entries.get(website_id)
+                if cached is None or cached[1] < now:
+                    missing.append(website_id)
+                else:
+                    found[website_id] = cached[0]
+        return found, missing
+
+    def _remember(self, fetched):
+        expires_at = time.monotonic() + (self.ttl or settings.EVENT_SCHEMA_REGISTRY_TTL)
+        with self._lock:
+            for website_id, schemas in fetched.items():
+                self._entries[website_id] = (schemas, expires_at)
+
+    def get_many(self, website_ids):
+        """
+        Return ``{website_id: {event_name: CompiledSchema}}``, fetching
+        unknown or expired websites in one query
+        """
+        found, missing = self._lookup(set(website_ids))
+        if missing:
+            fetched = self._fetch(missing)
+            self._remember(fetched)
+            found.update(fetched)
+        return found
+
+    async def aget_many(self, website_ids):
+        """
+        Async variant of ``get_many``; cache hits never leave the event loop
+        """
+        found, missing = self._lookup(set(website_ids))
+        if missing:
+            fetched = await sync_to_async(self._fetch)(missing)
+            self._remember(fetched)
+            found.update(fetched)
+        return found
+
+    def invalidate(self, website_id=None):
+        with self._lock:
+            if website_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(website_id, None)
+
+
+event_schema_registry = EventSchemaRegistry()
+
+
+def _schema_errors(entries, schemas, items):
+    kept = []
+    errors = []
+    for item in items:
+        entry = entries.get(item.get("domain"))
+        schema = None
+        if entry is not None and item.get("type") == "event":
+            schema = schemas.get(entry.website_id, {}).get(item.get("event_name"))
+        problems = validate_event_data(schema, item.get("event_data")) if schema else []
+        if problems:
+            errors.append({"error": {"event_data": problems}, "item": item})
+        else:
+            kept.append(item)
+    return kept, errors
+
+
+def split_invalid_events(entries, items):
+    """
+    Return the batch items that pass their event schema and the errors of
+    those that do not
+    """
+    website_ids = {
+        entries[item["domain"]].website_id
+        for item in items
+        if item.get("type") == "event" and item.get("domain") in entries
+    }
+    if not website_ids:
+        return items, []
+    return _schema_errors(entries, event_schema_registry.get_many(website_ids), items)
+
+
+async def asplit_invalid_events(entries, items):
+    """
+    Async variant of ``split_invalid_events``
+    """
+    website_ids = {
+        entries[item["domain"]].website_id
+        for item in items
+        if item.get("type") == "event" and item.get("domain") in entries
+    }
+    if not website_ids:
+        return items, []
+    schemas = await event_schema_registry.aget_many(website_ids)
+    return _schema_errors(entries, schemas, items)
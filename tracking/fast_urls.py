@@ -0,0 +1,17 @@
+"""
+URLconf used by the tracking fast-path handler (see analytics_core.handlers).
+
+Only ``TRACKING_FAST_PATHS`` reach this handler. The JSON hit routes
+resolve to the lean views; pixels, beacons and the async views are served
+from the regular tracking URLs.
+"""
+from django.urls import include, path
+
+from tracking.api.v1 import fast_views
+
+urlpatterns = [
+    path("api/tracking/v1/pageview/", fast_views.pageview),
+    path("api/tracking/v1/event/", fast_views.event),
+    path("api/tracking/v1/batch/", fast_views.batch),
+    path("api/tracking/", include("tracking.urls")),
+]
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from tracking.partitions import maintain_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-create upcoming page_views / events partitions and detach "
+        "partitions older than the configured age."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--premake",
+            type=int,
+            help="Partitions to create ahead (default TRACKING_PARTITION_PREMAKE).",
+        )
+        parser.add_argument(
+            "--detach-after-days",
+            type=int,
+            help="Detach partitions older than this many days, 0 to keep all "
+            "(default TRACKING_PARTITION_DETACH_AFTER_DAYS).",
+        )
+
+    def handle(self, *args, **options):
+        result = maintain_partitions(
+            premake=options["premake"],
+            detach_after_days=options["detach_after_days"],
+        )
+        for name in result["created"]:
+            self.stdout.write(f"Created {name}")
+        for name in result["detached"]:
+            self.stdout.write(f"Detached {name}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(result['created'])} partitions created, "
+                f"{len(result['detached'])} detached"
+            )
+        )
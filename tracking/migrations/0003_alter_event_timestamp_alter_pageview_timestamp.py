@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2025-10-24 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0002_pageview_ip_address_pageview_user_agent"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="event",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name="pageview",
+            name="timestamp",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
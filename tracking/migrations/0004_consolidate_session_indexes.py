@@ -0,0 +1,103 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0003_alter_event_timestamp_alter_pageview_timestamp"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="session",
+            name="sessions_session_0947d2_idx",
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="browser",
+            field=models.CharField(
+                blank=True,
+                help_text="Browser name used during the session.",
+                max_length=50,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="country",
+            field=models.CharField(
+                blank=True,
+                help_text="ISO country code of the user.",
+                max_length=2,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="device_type",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("desktop", "Desktop"),
+                    ("mobile", "Mobile"),
+                    ("tablet", "Tablet"),
+                ],
+                help_text="Type of device used during the session.",
+                max_length=20,
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="ended_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Timestamp when the session ended (if available).",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="ip_address",
+            field=models.GenericIPAddressField(
+                blank=True,
+                help_text="IP address of the user during the session.",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="session_id",
+            field=models.CharField(
+                help_text="Unique identifier for the session within a website.",
+                max_length=100,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="started_at",
+            field=models.DateTimeField(
+                auto_now_add=True, help_text="Timestamp when the session started."
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="user_agent",
+            field=models.TextField(
+                blank=True, help_text="User agent string from the browser.", null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="session",
+            name="website",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="The website to which this session belongs.",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sessions",
+                to="tracking.website",
+            ),
+        ),
+    ]
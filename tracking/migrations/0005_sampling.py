@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:25
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0004_consolidate_session_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dailywebsitestats",
+            name="sampled",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="sample_rate",
+            field=models.FloatField(db_default=1.0, default=1.0),
+        ),
+        migrations.AddField(
+            model_name="pageview",
+            name="sample_rate",
+            field=models.FloatField(db_default=1.0, default=1.0),
+        ),
+        migrations.AddField(
+            model_name="session",
+            name="sample_rate",
+            field=models.FloatField(
+                db_default=1.0,
+                default=1.0,
+                help_text="Website sample rate in effect when the session was recorded.",
+            ),
+        ),
+        migrations.AddField(
+            model_name="website",
+            name="sample_rate",
+            field=models.FloatField(
+                default=1.0,
+                help_text="Fraction of sessions recorded; reports are scaled by 1 / rate.",
+                validators=[
+                    django.core.validators.MinValueValidator(0.0001),
+                    django.core.validators.MaxValueValidator(1.0),
+                ],
+            ),
+        ),
+    ]
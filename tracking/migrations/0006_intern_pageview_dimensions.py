@@ -0,0 +1,203 @@
+from hashlib import blake2b
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+# Interned text columns per model, with their lookup model
+COLUMNS = {
+    "PageView": {
+        "page_url": "PageUrl",
+        "page_title": "PageTitle",
+        "referrer": "Referrer",
+        "user_agent": "UserAgent",
+    },
+    "PageStats": {"page_url": "PageUrl"},
+}
+
+# Sets the ref ids of one id range of page views, joining the lookup
+# tables on the text; only NULL text has no lookup row and stays NULL
+PAGEVIEW_REFS_SQL = """
+UPDATE page_views t
+SET page_url_ref_id = u.id,
+    page_title_ref_id = pt.id,
+    referrer_ref_id = r.id,
+    user_agent_ref_id = ua.id
+FROM page_views s
+LEFT JOIN dim_page_urls u ON u.value = s.page_url
+LEFT JOIN dim_page_titles pt ON pt.value = s.page_title
+LEFT JOIN dim_referrers r ON r.value = s.referrer
+LEFT JOIN dim_user_agents ua ON ua.value = s.user_agent
+WHERE s.id = t.id AND t.id >= %s AND t.id < %s
+"""
+
+PAGESTATS_REFS_SQL = """
+UPDATE page_stats t SET page_url_ref_id = u.id
+FROM dim_page_urls u
+WHERE u.value = t.page_url
+"""
+
+RESTORE_SQL = """
+UPDATE {table} t SET {column} = d.value
+FROM {dimension_table} d
+WHERE d.id = t.{column}_ref_id
+"""
+
+
+def dimension_id(value):
+    # Frozen copy of tracking.dimensions.dimension_id
+    if value is None:
+        return None
+    digest = blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def intern_values(apps, schema_editor):
+    """
+    Fill the lookup tables from the distinct text values, the empty string
+    included. Ids are hashes computed in Python, so only the (few) distinct
+    values leave the database; set_refs then sets the ref ids.
+    """
+    for model_name, columns in COLUMNS.items():
+        model = apps.get_model("tracking", model_name)
+        for column, dimension_name in columns.items():
+            dimension = apps.get_model("tracking", dimension_name)
+            values = (
+                model.objects.exclude(**{f"{column}__isnull": True})
+                .values_list(column, flat=True)
+                .distinct()
+                .iterator(chunk_size=BATCH_SIZE)
+            )
+            batch = []
+            for value in values:
+                batch.append(dimension(id=dimension_id(value), value=value))
+                if len(batch) == BATCH_SIZE:
+                    dimension.objects.bulk_create(batch, ignore_conflicts=True)
+                    batch = []
+            dimension.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def set_refs(apps, schema_editor):
+    """
+    Set the ref ids from the lookup tables, page views in id ranges of
+    BATCH_SIZE rows so no statement joins the whole table
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT MIN(id), MAX(id) FROM page_views")
+        low, high = cursor.fetchone()
+        if low is not None:
+            for start in range(low, high + 1, BATCH_SIZE):
+                cursor.execute(PAGEVIEW_REFS_SQL, [start, start + BATCH_SIZE])
+        cursor.execute(PAGESTATS_REFS_SQL)
+        # Fire deferred FK checks now; ALTER TABLE refuses pending trigger
+        # events
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+def restore_text_columns(apps, schema_editor):
+    for model_name, columns in COLUMNS.items():
+        model = apps.get_model("tracking", model_name)
+        for column, dimension_name in columns.items():
+            dimension = apps.get_model("tracking", dimension_name)
+            schema_editor.execute(
+                RESTORE_SQL.format(
+                    table=model._meta.db_table,
+                    column=column,
+                    dimension_table=dimension._meta.db_table,
+                )
+            )
+    schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+def dimension_model(name, table):
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+            ("value", models.TextField()),
+        ],
+        options={"db_table": table, "abstract": False},
+    )
+
+
+def dimension_ref(model, null=True):
+    return models.ForeignKey(
+        blank=null,
+        db_constraint=False,
+        db_index=False,
+        null=null,
+        on_delete=django.db.models.deletion.DO_NOTHING,
+        related_name="+",
+        to=f"tracking.{model}",
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0005_sampling"),
+    ]
+
+    operations = [
+        dimension_model("PageUrl", "dim_page_urls"),
+        dimension_model("PageTitle", "dim_page_titles"),
+        dimension_model("Referrer", "dim_referrers"),
+        dimension_model("UserAgent", "dim_user_agents"),
+        migrations.AddField(
+            model_name="pageview",
+            name="page_url_ref",
+            field=dimension_ref("pageurl"),
+        ),
+        migrations.AddField(
+            model_name="pageview",
+            name="page_title_ref",
+            field=dimension_ref("pagetitle"),
+        ),
+        migrations.AddField(
+            model_name="pageview",
+            name="referrer_ref",
+            field=dimension_ref("referrer"),
+        ),
+        migrations.AddField(
+            model_name="pageview",
+            name="user_agent_ref",
+            field=dimension_ref("useragent"),
+        ),
+        migrations.AddField(
+            model_name="pagestats",
+            name="page_url_ref",
+            field=dimension_ref("pageurl"),
+        ),
+        # Nullable so the text columns can be restored when reversing
+        migrations.AlterField(
+            model_name="pageview",
+            name="page_url",
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name="pagestats",
+            name="page_url",
+            field=models.TextField(null=True),
+        ),
+        migrations.RunPython(intern_values, restore_text_columns),
+        migrations.RunPython(set_refs, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="pagestats",
+            unique_together={("website", "page_url_ref", "date")},
+        ),
+        migrations.RemoveField(model_name="pageview", name="page_url"),
+        migrations.RemoveField(model_name="pageview", name="page_title"),
+        migrations.RemoveField(model_name="pageview", name="referrer"),
+        migrations.RemoveField(model_name="pageview", name="user_agent"),
+        migrations.RemoveField(model_name="pagestats", name="page_url"),
+        migrations.AlterField(
+            model_name="pageview",
+            name="page_url_ref",
+            field=dimension_ref("pageurl", null=False),
+        ),
+        migrations.AlterField(
+            model_name="pagestats",
+            name="page_url_ref",
+            field=dimension_ref("pageurl", null=False),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:33
+
+import django.db.models.functions.datetime
+import django.utils.timezone
+from django.db import migrations, models
+
+# Closed sessions were last seen when they ended; open ones at their
+# latest page view, falling back to the start
+BACKFILL_SQL = """
+UPDATE sessions SET last_seen_at = COALESCE(ended_at, started_at);
+UPDATE sessions s SET last_seen_at = pv.last_seen_at
+FROM (
+    SELECT session_id, MAX(timestamp) AS last_seen_at
+    FROM page_views
+    GROUP BY session_id
+) pv
+WHERE pv.session_id = s.id
+  AND s.ended_at IS NULL
+  AND pv.last_seen_at > s.last_seen_at;
+SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0006_intern_pageview_dimensions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="session",
+            name="last_seen_at",
+            field=models.DateTimeField(
+                db_default=django.db.models.functions.datetime.Now(),
+                default=django.utils.timezone.now,
+                help_text="Timestamp of the latest hit, kept to within "
+                "TRACKING_SESSION_LAST_SEEN_RESOLUTION seconds.",
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(
+                condition=models.Q(("ended_at__isnull", True)),
+                fields=["last_seen_at"],
+                name="sessions_open_last_seen_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:39
+
+import django.db.models.functions.datetime
+import django.utils.timezone
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+UPDATE sessions s SET pageview_count = pv.pageviews
+FROM (
+    SELECT session_id, COUNT(*) AS pageviews
+    FROM page_views
+    GROUP BY session_id
+) pv
+WHERE pv.session_id = s.id;
+SET CONSTRAINTS ALL IMMEDIATE;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0007_session_last_seen"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="session",
+            name="pageview_count",
+            field=models.PositiveIntegerField(
+                db_default=0,
+                default=0,
+                help_text="Page views in the session, as of the last activity flush.",
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name="session",
+            name="last_seen_at",
+            field=models.DateTimeField(
+                db_default=django.db.models.functions.datetime.Now(),
+                default=django.utils.timezone.now,
+                help_text="Timestamp of the latest hit, as of the last activity flush.",
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0008_session_pageview_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BotHitCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("user_agent", "Crawler user agent"),
+                            ("datacenter", "Datacenter IP range"),
+                            ("rate", "Hit rate per session"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("hits", models.BigIntegerField(default=0)),
+                (
+                    "website",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="bot_hits",
+                        to="tracking.website",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "bot_hit_counters",
+                "unique_together": {("website", "date", "reason")},
+            },
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0009_bot_hit_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventProperty",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_name", models.CharField(max_length=100)),
+                ("name", models.CharField(max_length=100)),
+                ("string_value", models.TextField(blank=True, null=True)),
+                ("number_value", models.FloatField(blank=True, null=True)),
+                ("timestamp", models.DateTimeField()),
+                ("sample_rate", models.FloatField(db_default=1.0, default=1.0)),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="properties",
+                        to="tracking.event",
+                    ),
+                ),
+                (
+                    "website",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="tracking.website",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "event_properties",
+                "indexes": [
+                    models.Index(
+                        fields=["website", "event_name", "name", "timestamp"],
+                        include=("string_value", "number_value", "sample_rate"),
+                        name="event_props_breakdown_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="EventSchema",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_name", models.CharField(max_length=100)),
+                ("properties", models.JSONField(default=dict)),
+                (
+                    "strict",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Reject events with undeclared properties.",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "website",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="event_schemas",
+                        to="tracking.website",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "event_schemas",
+                "unique_together": {("website", "event_name")},
+            },
+        ),
+    ]
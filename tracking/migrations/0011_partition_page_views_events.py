@@ -0,0 +1,106 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Rebuild page_views and events as tables range-partitioned by month on
+# "timestamp". Rows are copied into monthly partitions (plus three months
+# ahead and a DEFAULT partition for out-of-range timestamps); indexes and
+# foreign keys are recreated under their existing names. The primary key
+# becomes (id, timestamp), as partitioned tables require.
+# tracking.partitions maintains the partitions from then on.
+PARTITION_SQL = """
+DO $$
+DECLARE
+    tbl text;
+    old text;
+    definitions text[];
+    foreign_keys text[][];
+    definition text;
+    sequence_name text;
+    first_month timestamptz;
+    month timestamptz;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['page_views', 'events'] LOOP
+        old := tbl || '_unpartitioned';
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, old);
+
+        SELECT array_agg(indexdef) INTO definitions
+        FROM pg_indexes idx
+        JOIN pg_index x ON x.indexrelid = format('%I.%I', idx.schemaname, idx.indexname)::regclass
+        WHERE idx.tablename = old AND NOT x.indisprimary;
+        SELECT array_agg(ARRAY[conname::text, pg_get_constraintdef(oid)])
+        INTO foreign_keys
+        FROM pg_constraint
+        WHERE conrelid = old::regclass AND contype = 'f';
+
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING IDENTITY '
+            'INCLUDING CONSTRAINTS) PARTITION BY RANGE ("timestamp")',
+            tbl, old
+        );
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+
+        EXECUTE format('SELECT date_trunc(''month'', min("timestamp")) FROM %I', old)
+        INTO first_month;
+        month := least(
+            coalesce(first_month, date_trunc('month', now())),
+            date_trunc('month', now())
+        );
+        WHILE month <= date_trunc('month', now()) + interval '3 months' LOOP
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                tbl || '_p' || to_char(month, 'YYYYMM'), tbl,
+                month, month + interval '1 month'
+            );
+            month := month + interval '1 month';
+        END LOOP;
+
+        EXECUTE format('INSERT INTO %I SELECT * FROM %I', tbl, old);
+        sequence_name := pg_get_serial_sequence(tbl, 'id');
+        EXECUTE format(
+            'SELECT setval(%L, coalesce(max(id), 0) + 1, false) FROM %I',
+            sequence_name, tbl
+        );
+        EXECUTE format('DROP TABLE %I CASCADE', old);
+        EXECUTE format('ALTER SEQUENCE %s RENAME TO %I', sequence_name, tbl || '_id_seq');
+
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (id, "timestamp")',
+            tbl, tbl || '_pkey'
+        );
+        FOREACH definition IN ARRAY coalesce(definitions, ARRAY[]::text[]) LOOP
+            EXECUTE regexp_replace(
+                definition, ' ON (\\S+\\.)?' || old || ' ', ' ON \\1' || tbl || ' '
+            );
+        END LOOP;
+        FOR i IN 1 .. coalesce(array_length(foreign_keys, 1), 0) LOOP
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT %I %s',
+                tbl, foreign_keys[i][1], foreign_keys[i][2]
+            );
+        END LOOP;
+    END LOOP;
+END
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0010_event_schemas"),
+    ]
+
+    operations = [
+        # Foreign keys must reference the full (id, timestamp) key of a
+        # partitioned table; the ORM still cascades event deletes
+        migrations.AlterField(
+            model_name="eventproperty",
+            name="event",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="properties",
+                to="tracking.event",
+            ),
+        ),
+        migrations.RunSQL(PARTITION_SQL, migrations.RunSQL.noop),
+    ]
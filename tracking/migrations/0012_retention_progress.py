@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0011_partition_page_views_events"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RetentionProgress",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table", models.CharField(max_length=50)),
+                ("last_key", models.DateTimeField(blank=True, null=True)),
+                ("last_id", models.BigIntegerField(default=0)),
+                ("deleted", models.BigIntegerField(default=0)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "website",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="tracking.website",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "retention_progress",
+                "unique_together": {("website", "table")},
+            },
+        ),
+    ]
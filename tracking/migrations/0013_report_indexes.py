@@ -0,0 +1,125 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:56
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0012_retention_progress"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="event",
+            name="events_website_403465_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="event",
+            name="events_timesta_ba2f67_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="pageview",
+            name="page_views_website_52f856_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="pageview",
+            name="page_views_timesta_ae239d_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="session",
+            name="sessions_website_351bb8_idx",
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="event_name",
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="session",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="events",
+                to="tracking.session",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="website",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="events",
+                to="tracking.website",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pageview",
+            name="session",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="pageviews",
+                to="tracking.session",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="pageview",
+            name="website",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="pageviews",
+                to="tracking.website",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["website", "timestamp"],
+                include=("event_name", "session", "sample_rate"),
+                name="events_website_time_cov",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                autosummarize=True, fields=["timestamp"], name="events_timestamp_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pageview",
+            index=models.Index(
+                fields=["website", "timestamp"],
+                include=("session", "page_url_ref", "page_title_ref", "sample_rate"),
+                name="page_views_website_time_cov",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="pageview",
+            index=django.contrib.postgres.indexes.BrinIndex(
+                autosummarize=True,
+                fields=["timestamp"],
+                name="page_views_timestamp_brin",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(
+                fields=["website", "started_at"],
+                include=("ended_at", "sample_rate"),
+                name="sessions_website_started_cov",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(
+                fields=["website", "last_seen_at"],
+                include=("sample_rate",),
+                name="sessions_website_seen_cov",
+            ),
+        ),
+    ]
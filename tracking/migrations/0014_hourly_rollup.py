@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0013_report_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table", models.CharField(max_length=50, unique=True)),
+                ("last_id", models.BigIntegerField(default=0)),
+                ("caught_up_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "rollup_watermarks",
+            },
+        ),
+        migrations.CreateModel(
+            name="HourlyWebsiteStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("pageviews", models.FloatField(default=0)),
+                ("sessions", models.FloatField(default=0)),
+                ("events", models.FloatField(default=0)),
+                ("visitors_sketch", models.BinaryField(default=bytes)),
+                ("sample_rate", models.FloatField(default=1.0)),
+                (
+                    "website",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hourly_stats",
+                        to="tracking.website",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "hourly_website_stats",
+                "unique_together": {("website", "hour")},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:20
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tracking", "0014_hourly_rollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="rollupwatermark",
+            name="pending_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rollupwatermark",
+            name="pending_id",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rollupwatermark",
+            name="pending_xids",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.BigIntegerField(), blank=True, default=list, size=None
+            ),
+        ),
+    ]
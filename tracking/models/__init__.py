@@ -1,6 +1,11 @@
+from tracking.models.bot_hits import BotHitCounter
 from tracking.models.daily_stats import DailyWebsiteStats
+from tracking.models.dimensions import PageTitle, PageUrl, Referrer, UserAgent
 from tracking.models.event import Event
+from tracking.models.event_schema import EventProperty, EventSchema
+from tracking.models.hourly_stats import HourlyWebsiteStats, RollupWatermark
 from tracking.models.page_stats import PageStats
 from tracking.models.pageview import PageView
+from tracking.models.retention import RetentionProgress
 from tracking.models.session import Session
 from tracking.models.website import Website
@@ -0,0 +1,30 @@
+from django.db import models
+
+from tracking.models.website import Website
+
+
+class BotHitCounter(models.Model):
+    """
+    Daily count of hits dropped as bot traffic, per website and reason.
+    Bots are counted here instead of being stored as sessions and page views.
+    """
+
+    REASON_CHOICES = [
+        ("user_agent", "Crawler user agent"),
+        ("datacenter", "Datacenter IP range"),
+        ("rate", "Hit rate per session"),
+    ]
+
+    website = models.ForeignKey(
+        Website, on_delete=models.CASCADE, related_name="bot_hits", db_index=False
+    )
+    date = models.DateField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    hits = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "bot_hit_counters"
+        unique_together = ["website", "date", "reason"]
+
+    def __str__(self):
+        return f"{self.hits} {self.reason} bot hits on {self.date}"
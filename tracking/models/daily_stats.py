@@ -19,6 +19,9 @@ class DailyWebsiteStats(models.Model):
     # Bounce rate, conversion rate, etc.
     bounce_rate = models.FloatField(default=0)
 
+    # Counts are scaled up from sampled rows
+    sampled = models.BooleanField(default=False)
+
     class Meta:
         db_table = "daily_website_stats"
         unique_together = ["website", "date"]
@@ -0,0 +1,37 @@
+from django.db import models
+
+
+class Dimension(models.Model):
+    """
+    Interned text value, keyed by a 64-bit hash of the text
+    (see ``tracking.dimensions.dimension_id``). Rows are append-only.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    value = models.TextField()
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.value
+
+
+class PageUrl(Dimension):
+    class Meta:
+        db_table = "dim_page_urls"
+
+
+class PageTitle(Dimension):
+    class Meta:
+        db_table = "dim_page_titles"
+
+
+class Referrer(Dimension):
+    class Meta:
+        db_table = "dim_referrers"
+
+
+class UserAgent(Dimension):
+    class Meta:
+        db_table = "dim_user_agents"
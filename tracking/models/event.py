@@ -1,27 +1,40 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
+from django.utils import timezone
 
 from tracking.models.session import Session
 from tracking.models.website import Website
 
 
 class Event(models.Model):
+    # FK and event_name indexes are covered by the composite indexes in Meta
     website = models.ForeignKey(
-        Website, on_delete=models.CASCADE, related_name="events"
+        Website, on_delete=models.CASCADE, related_name="events", db_index=False
     )
     session = models.ForeignKey(
-        Session, on_delete=models.CASCADE, related_name="events"
+        Session, on_delete=models.CASCADE, related_name="events", db_index=False
     )
-    event_name = models.CharField(max_length=100, db_index=True)
+    event_name = models.CharField(max_length=100)
     event_data = models.JSONField(blank=True, null=True)  # Flexible event payload
     page_url = models.TextField(blank=True, null=True)  # URL where event occurred
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Website sample rate in effect when the hit was recorded
+    sample_rate = models.FloatField(default=1.0, db_default=1.0)
 
     class Meta:
         db_table = "events"
         indexes = [
-            models.Index(fields=["website", "event_name", "timestamp"]),
+            # Covers the event summary and overview queries
+            models.Index(
+                fields=["website", "timestamp"],
+                include=["event_name", "session", "sample_rate"],
+                name="events_website_time_cov",
+            ),
             models.Index(fields=["session"]),
-            models.Index(fields=["timestamp"]),
+            # Rows are appended in time order; BRIN stays tiny
+            BrinIndex(
+                fields=["timestamp"], name="events_timestamp_brin", autosummarize=True
+            ),
         ]
         ordering = ["-timestamp"]
 
@@ -0,0 +1,71 @@
+from django.db import models
+
+from tracking.models.event import Event
+from tracking.models.website import Website
+
+PROPERTY_TYPES = ["string", "number", "boolean"]
+
+
+class EventSchema(models.Model):
+    """
+    Expected properties of one event name on a website. ``properties`` maps
+    property names to ``{"type", "required", "promoted"}``; promoted
+    properties are copied into ``event_properties`` as typed rows.
+    """
+
+    website = models.ForeignKey(
+        Website,
+        on_delete=models.CASCADE,
+        related_name="event_schemas",
+        db_index=False,  # covered by the (website, event_name) constraint
+    )
+    event_name = models.CharField(max_length=100)
+    properties = models.JSONField(default=dict)
+    strict = models.BooleanField(
+        default=False, help_text="Reject events with undeclared properties."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "event_schemas"
+        unique_together = ["website", "event_name"]
+
+    def __str__(self):
+        return f"Schema: {self.event_name} - {self.website_id}"
+
+
+class EventProperty(models.Model):
+    """
+    Typed copy of a promoted event property, so breakdowns by property
+    value are served by an index instead of JSON extraction over events
+    """
+
+    # No FK constraint: events is partitioned and keyed on (id, timestamp)
+    event = models.ForeignKey(
+        Event, on_delete=models.CASCADE, related_name="properties", db_constraint=False
+    )
+    website = models.ForeignKey(
+        Website, on_delete=models.CASCADE, related_name="+", db_index=False
+    )
+    event_name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100)
+    string_value = models.TextField(blank=True, null=True)
+    number_value = models.FloatField(blank=True, null=True)
+    timestamp = models.DateTimeField()
+    # Sample rate of the event, so breakdowns scale like event counts
+    sample_rate = models.FloatField(default=1.0, db_default=1.0)
+
+    class Meta:
+        db_table = "event_properties"
+        indexes = [
+            # Breakdowns are index-only scans over this index
+            models.Index(
+                fields=["website", "event_name", "name", "timestamp"],
+                include=["string_value", "number_value", "sample_rate"],
+                name="event_props_breakdown_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.event_name}.{self.name}"
@@ -0,0 +1,58 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+
+from tracking.models.website import Website
+
+
+class HourlyWebsiteStats(models.Model):
+    """
+    Per-hour rollup of a website's hits, folded in incrementally by
+    ``tracking.rollups``. Counts are weighted by ``1 / sample_rate`` and
+    rounded when read.
+    """
+
+    website = models.ForeignKey(
+        Website,
+        on_delete=models.CASCADE,
+        related_name="hourly_stats",
+        db_index=False,  # covered by the (website, hour) constraint
+    )
+    hour = models.DateTimeField()
+
+    pageviews = models.FloatField(default=0)
+    sessions = models.FloatField(default=0)
+    events = models.FloatField(default=0)
+    # HyperLogLog registers of the sessions with page views (tracking.utils.hll)
+    visitors_sketch = models.BinaryField(default=bytes)
+    # Lowest sample rate among the hour's page views, scales the sketch
+    sample_rate = models.FloatField(default=1.0)
+
+    class Meta:
+        db_table = "hourly_website_stats"
+        unique_together = ["website", "hour"]
+
+    def __str__(self):
+        return f"Stats for {self.website_id} at {self.hour}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Highest id of a raw table already folded into ``HourlyWebsiteStats``
+    """
+
+    table = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # When the last run had folded in every row committed at that time
+    caught_up_at = models.DateTimeField(null=True, blank=True)
+    # Sequence value read by an earlier run at pending_at, usable once the
+    # transactions running then (pending_xids) have finished
+    pending_id = models.BigIntegerField(null=True, blank=True)
+    pending_xids = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    pending_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "rollup_watermarks"
+
+    def __str__(self):
+        return f"Rollup of {self.table} up to {self.last_id}"
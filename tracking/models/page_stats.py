@@ -1,13 +1,16 @@
 from django.db import models
 
+from tracking.dimensions import InternedDimensionsMixin, dimension_property
+from tracking.models.dimensions import PageUrl
+from tracking.models.pageview import dimension_ref
 from tracking.models.website import Website
 
 
-class PageStats(models.Model):
+class PageStats(InternedDimensionsMixin, models.Model):
     website = models.ForeignKey(
         Website, on_delete=models.CASCADE, related_name="page_stats"
     )
-    page_url = models.TextField()
+    page_url_ref = dimension_ref(PageUrl, null=False)
     date = models.DateField(db_index=True)
 
     # Page-specific metrics
@@ -16,9 +19,11 @@ class PageStats(models.Model):
     avg_time_on_page = models.FloatField(default=0)
     exit_rate = models.FloatField(default=0)
 
+    page_url = dimension_property("page_url")
+
     class Meta:
         db_table = "page_stats"
-        unique_together = ["website", "page_url", "date"]
+        unique_together = ["website", "page_url_ref", "date"]
         indexes = [
             models.Index(fields=["website", "date"]),
         ]
@@ -1,33 +1,72 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
+from django.utils import timezone
 
+from tracking.dimensions import InternedDimensionsMixin, dimension_property
+from tracking.models.dimensions import PageTitle, PageUrl, Referrer, UserAgent
 from tracking.models.session import Session
 from tracking.models.website import Website
 
 
-class PageView(models.Model):
+def dimension_ref(model, null=True):
+    # No FK constraint or index: ids are interned before the row is written
+    # and lookups only go from page views to the dimension tables
+    return models.ForeignKey(
+        model,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+        null=null,
+        blank=null,
+    )
+
+
+class PageView(InternedDimensionsMixin, models.Model):
+    # FK indexes are covered by the composite indexes in Meta
     website = models.ForeignKey(
-        Website, on_delete=models.CASCADE, related_name="pageviews"
+        Website, on_delete=models.CASCADE, related_name="pageviews", db_index=False
     )
     session = models.ForeignKey(
-        Session, on_delete=models.CASCADE, related_name="pageviews"
+        Session, on_delete=models.CASCADE, related_name="pageviews", db_index=False
     )
-    page_url = models.TextField()
-    page_title = models.CharField(max_length=500, blank=True, null=True)
-    referrer = models.TextField(blank=True, null=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Text columns are interned; assign and read them through the
+    # page_url / page_title / referrer / user_agent properties below
+    page_url_ref = dimension_ref(PageUrl, null=False)
+    page_title_ref = dimension_ref(PageTitle)
+    referrer_ref = dimension_ref(Referrer)
+    timestamp = models.DateTimeField(default=timezone.now)
     load_time = models.FloatField(
         null=True, blank=True
     )  # Page load time in milliseconds
 
-    user_agent = models.TextField(blank=True, null=True)
+    user_agent_ref = dimension_ref(UserAgent)
     ip_address = models.GenericIPAddressField(blank=True, null=True)
+    # Website sample rate in effect when the hit was recorded
+    sample_rate = models.FloatField(default=1.0, db_default=1.0)
+
+    page_url = dimension_property("page_url")
+    page_title = dimension_property("page_title")
+    referrer = dimension_property("referrer")
+    user_agent = dimension_property("user_agent")
 
     class Meta:
         db_table = "page_views"
         indexes = [
-            models.Index(fields=["website", "timestamp"]),
+            # Covers the daily aggregation and real-time report queries, so
+            # they are index-only scans
+            models.Index(
+                fields=["website", "timestamp"],
+                include=["session", "page_url_ref", "page_title_ref", "sample_rate"],
+                name="page_views_website_time_cov",
+            ),
             models.Index(fields=["session"]),
-            models.Index(fields=["timestamp"]),
+            # Rows are appended in time order; BRIN stays tiny
+            BrinIndex(
+                fields=["timestamp"],
+                name="page_views_timestamp_brin",
+                autosummarize=True,
+            ),
         ]
         ordering = ["-timestamp"]
 
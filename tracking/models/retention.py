@@ -0,0 +1,31 @@
+from django.db import models
+
+from tracking.models.website import Website
+
+
+class RetentionProgress(models.Model):
+    """
+    Keyset position of the retention pass over one raw table of a website,
+    so an interrupted pass resumes where it stopped. The key is reset
+    once a pass reaches the retention cutoff.
+    """
+
+    website = models.ForeignKey(
+        Website,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,  # covered by the (website, table) constraint
+    )
+    table = models.CharField(max_length=50)
+    last_key = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    deleted = models.BigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "retention_progress"
+        unique_together = ["website", "table"]
+
+    def __str__(self):
+        return f"Retention of {self.table} for {self.website_id}"
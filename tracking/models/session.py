@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
 
 from tracking.models.website import Website
 
@@ -9,10 +11,13 @@ class Session(models.Model):
         Website,
         on_delete=models.CASCADE,
         related_name="sessions",
+        db_index=False,  # covered by the (website, ...) composite indexes
         help_text="The website to which this session belongs.",
     )
+    # Uniqueness and lookups are served by the (website, session_id)
+    # constraint below; a separate index would only add write cost.
     session_id = models.CharField(
-        max_length=100, unique=True, db_index=True, help_text="Unique identifier for the session."
+        max_length=100, help_text="Unique identifier for the session within a website."
     )
     started_at = models.DateTimeField(
         auto_now_add=True, help_text="Timestamp when the session started."
@@ -22,6 +27,16 @@ class Session(models.Model):
         blank=True,
         help_text="Timestamp when the session ended (if available).",
     )
+    last_seen_at = models.DateTimeField(
+        default=timezone.now,
+        db_default=Now(),
+        help_text="Timestamp of the latest hit, as of the last activity flush.",
+    )
+    pageview_count = models.PositiveIntegerField(
+        default=0,
+        db_default=0,
+        help_text="Page views in the session, as of the last activity flush.",
+    )
     user_agent = models.TextField(
         blank=True, null=True, help_text="User agent string from the browser."
     )
@@ -48,12 +63,35 @@ class Session(models.Model):
         null=True,
         help_text="Type of device used during the session.",
     )
+    sample_rate = models.FloatField(
+        default=1.0,
+        db_default=1.0,
+        help_text="Website sample rate in effect when the session was recorded.",
+    )
 
     class Meta:
         db_table = "sessions"
         indexes = [
-            models.Index(fields=["session_id"]),
-            models.Index(fields=["website", "started_at"]),
+            # Covering: daily aggregation and sessions-today counts read
+            # only this index
+            models.Index(
+                fields=["website", "started_at"],
+                include=["ended_at", "sample_rate"],
+                name="sessions_website_started_cov",
+            ),
+            # Active visitors in the real-time report
+            models.Index(
+                fields=["website", "last_seen_at"],
+                include=["sample_rate"],
+                name="sessions_website_seen_cov",
+            ),
+            # Only open sessions are indexed, so the idle sweep never
+            # touches closed ones
+            models.Index(
+                fields=["last_seen_at"],
+                name="sessions_open_last_seen_idx",
+                condition=models.Q(ended_at__isnull=True),
+            ),
         ]
         unique_together = ["website", "session_id"]
 
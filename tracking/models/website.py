@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from accounts.models import Organization
@@ -11,6 +12,11 @@ class Website(models.Model):
     domain = models.CharField(max_length=255, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    sample_rate = models.FloatField(
+        default=1.0,
+        validators=[MinValueValidator(0.0001), MaxValueValidator(1.0)],
+        help_text="Fraction of sessions recorded; reports are scaled by 1 / rate.",
+    )
 
     class Meta:
         db_table = "websites"
@@ -0,0 +1,225 @@
+"""
+Maintenance of the time-range partitions of ``page_views`` and ``events``.
+
+Both tables are partitioned by ``timestamp`` (migration 0011) into
+``TRACKING_PARTITION_INTERVAL`` ("month" or "day") partitions named
+``<table>_p<YYYYMM[DD]>``, plus a ``<table>_default`` partition catching
+timestamps outside every range. ``maintain_partitions`` creates
+``TRACKING_PARTITION_PREMAKE`` partitions ahead of time, moving any rows
+the default partition already holds for their range, and detaches
+partitions older than ``TRACKING_PARTITION_DETACH_AFTER_DAYS``. Detached
+partitions keep their name and data as standalone tables, which
+``tracking.retention`` drops once they are past every retention window.
+With archiving enabled, partitions still holding rows the archive has not
+taken are left attached, since the archive only reads the parent table.
+"""
+import logging
+import re
+from collections import namedtuple
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracking import archive
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("page_views", "events")
+
+# Session-level advisory lock held while partitions are maintained
+MAINTENANCE_LOCK_ID = 7_281_450
+
+Partition = namedtuple("Partition", ["name", "start", "end"])
+
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+LIST_PARTITIONS_SQL = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = %s::regclass
+"""
+
+# Standalone tables named like a partition of the table, i.e. detached ones
+LIST_DETACHED_SQL = """
+SELECT relname FROM pg_class
+WHERE relkind = 'r' AND NOT relispartition
+  AND relnamespace = current_schema()::regnamespace
+  AND relname ~ %s
+"""
+
+
+def interval_start(moment, interval):
+    """
+    Return the UTC start of the partition interval containing ``moment``
+    """
+    moment = moment.astimezone(dt_timezone.utc)
+    if interval == "day":
+        return datetime(moment.year, moment.month, moment.day, tzinfo=dt_timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_interval(start, interval):
+    if interval == "day":
+        return start + timedelta(days=1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def partition_name(table, start, interval):
+    suffix = start.strftime("%Y%m%d" if interval == "day" else "%Y%m")
+    return f"{table}_p{suffix}"
+
+
+def list_partitions(table):
+    """
+    Return the range partitions of ``table`` ordered by start
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(LIST_PARTITIONS_SQL, [table])
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        match = BOUND_RE.search(bound)
+        if match:
+            start, end = (datetime.fromisoformat(value) for value in match.groups())
+            partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def list_detached(table):
+    """
+    Return the detached partitions of ``table`` ordered by start; their
+    range is read back from the name
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(LIST_DETACHED_SQL, [rf"^{table}_p(\d{{6}}|\d{{8}})$"])
+        names = [name for (name,) in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        suffix = name.rsplit("_p", 1)[1]
+        interval = "day" if len(suffix) == 8 else "month"
+        start = datetime.strptime(suffix, "%Y%m%d" if interval == "day" else "%Y%m")
+        start = start.replace(tzinfo=dt_timezone.utc)
+        partitions.append(Partition(name, start, next_interval(start, interval)))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def has_rows(name):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {connection.ops.quote_name(name)})"
+        )
+        return cursor.fetchone()[0]
+
+
+def create_partition(table, start, end, name):
+    """
+    Attach a new ``[start, end)`` partition, moving the rows the default
+    partition holds for that range into it first
+    """
+    quoted = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {quoted(name)} "
+            f"(LIKE {quoted(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {quoted(table + '_default')} "
+            f'WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+            f"INSERT INTO {quoted(name)} SELECT * FROM moved",
+            [start, end],
+        )
+        moved = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {quoted(table)} ATTACH PARTITION {quoted(name)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    if moved:
+        logger.info(f"Moved {moved} rows of {table}_default into {name}")
+
+
+def ensure_partitions(table, start, end, interval=None):
+    """
+    Create the missing partitions of ``table`` covering ``[start, end)``.
+    Ranges overlapping an existing partition (e.g. a day inside a month
+    partition) are skipped. Returns the names of the partitions created.
+    """
+    interval = interval or settings.TRACKING_PARTITION_INTERVAL
+    existing = list_partitions(table)
+    created = []
+    current = interval_start(start, interval)
+    while current < end:
+        upper = next_interval(current, interval)
+        if not any(p.start < upper and current < p.end for p in existing):
+            name = partition_name(table, current, interval)
+            create_partition(table, current, upper, name)
+            existing.append(Partition(name, current, upper))
+            created.append(name)
+        current = upper
+    return created
+
+
+def detach_partitions(table, before):
+    """
+    Detach the partitions of ``table`` that end at or before ``before``,
+    except, when archiving, those still holding rows to archive. Returns
+    the names of the detached tables.
+    """
+    detached = []
+    quoted = connection.ops.quote_name
+    hot_start = archive.hot_start()
+    for partition in list_partitions(table):
+        if partition.end > before:
+            break
+        if hot_start is not None and has_rows(partition.name):
+            logger.info(f"Kept {partition.name} attached until it is archived")
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {quoted(table)} "
+                f"DETACH PARTITION {quoted(partition.name)}"
+            )
+        detached.append(partition.name)
+    return detached
+
+
+def maintain_partitions(premake=None, detach_after_days=None):
+    """
+    Pre-create upcoming partitions and detach expired ones for every
+    partitioned table. Returns ``{"created": [...], "detached": [...]}``.
+    """
+    interval = settings.TRACKING_PARTITION_INTERVAL
+    if premake is None:
+        premake = settings.TRACKING_PARTITION_PREMAKE
+    if detach_after_days is None:
+        detach_after_days = settings.TRACKING_PARTITION_DETACH_AFTER_DAYS
+
+    now = timezone.now()
+    end = interval_start(now, interval)
+    for _ in range(premake + 1):
+        end = next_interval(end, interval)
+
+    result = {"created": [], "detached": []}
+    with connection.cursor() as cursor:
+        # Concurrent runs would race to create the same partitions
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [MAINTENANCE_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            logger.info("Partition maintenance already running, skipped")
+            return result
+    try:
+        for table in PARTITIONED_TABLES:
+            result["created"] += ensure_partitions(table, now, end, interval)
+            if detach_after_days > 0:
+                result["detached"] += detach_partitions(
+                    table, now - timedelta(days=detach_after_days)
+                )
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [MAINTENANCE_LOCK_ID])
+    return result
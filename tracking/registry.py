@@ -0,0 +1,221 @@
+"""
+In-process registry for domain -> website resolution on the ingest path.
+
+Each process keeps a bounded LRU map of ``domain -> WebsiteEntry`` that is
+bulk-loaded when the web worker starts (``analytics_core.handlers``) or on
+first use, and refreshed per entry after ``ttl`` seconds.
+``Website`` save/delete signals evict the local entry and publish the change
+on a Redis channel so every other process evicts it too.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+WebsiteEntry = namedtuple(
+    "WebsiteEntry",
+    ["website_id", "organization_id", "is_active", "sample_rate"],
+    defaults=[1.0],
+)
+
+ENTRY_FIELDS = ("domain", "id", "organization_id", "is_active", "sample_rate")
+
+INVALIDATION_CHANNEL = "tracking:website-registry"
+
+
+class WebsiteRegistry:
+    def __init__(self, max_size=None, ttl=None):
+        self.max_size = max_size or settings.WEBSITE_REGISTRY_MAX_SIZE
+        self.ttl = ttl or settings.WEBSITE_REGISTRY_TTL
+        self._entries = OrderedDict()  # domain -> (entry or None, expires_at)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._listener = None
+
+    def _store(self, domain, entry, expires_at):
+        self._entries[domain] = (entry, expires_at)
+        self._entries.move_to_end(domain)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _fetch(self, domains):
+        from tracking.models import Website
+
+        rows = Website.objects.filter(domain__in=domains).values_list(*ENTRY_FIELDS)
+        return {row[0]: WebsiteEntry(*row[1:]) for row in rows}
+
+    def load(self):
+        """
+        Bulk-load up to ``max_size`` websites, most recently created first
+        """
+        from tracking.models import Website
+
+        rows = Website.objects.order_by("-id").values_list(*ENTRY_FIELDS)[
+            : self.max_size
+        ]
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for row in reversed(rows):
+                self._store(row[0], WebsiteEntry(*row[1:]), expires_at)
+            self._loaded = True
+        self._start_listener()
+
+    def warm(self):
+        """
+        Load the registry ahead of the first hit; if the database is not
+        reachable yet the first lookup loads it instead
+        """
+        try:
+            self.load()
+        except DatabaseError as e:
+            logger.warning(f"Website registry not warmed: {e}")
+
+    def _lookup(self, domains):
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._lock:
+            for domain in domains:
+                cached = self._entries.get(domain)
+                if cached is None or cached[1] < now:
+                    missing.append(domain)
+                    continue
+                self._entries.move_to_end(domain)
+                if cached[0] is not None:
+                    found[domain] = cached[0]
+        return found, missing
+
+    def _remember(self, missing, fetched):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for domain in missing:
+                # Unknown domains are cached too, as None
+                self._store(domain, fetched.get(domain), expires_at)
+
+    def get_many(self, domains):
+        """
+        Return ``{domain: WebsiteEntry}`` for the given domains that exist.
+        Unknown or expired domains are fetched in a single query.
+        """
+        if not self._loaded:
+            self.load()
+
+        found, missing = self._lookup(domains)
+        if missing:
+            fetched = self._fetch(missing)
+            self._remember(missing, fetched)
+            found.update(fetched)
+        return found
+
+    async def aget_many(self, domains):
+        """
+        Async variant of ``get_many``; cache hits never leave the event loop
+        """
+        if not self._loaded:
+            await sync_to_async(self.load)()
+
+        found, missing = self._lookup(domains)
+        if missing:
+            fetched = await sync_to_async(self._fetch)(missing)
+            self._remember(missing, fetched)
+            found.update(fetched)
+        return found
+
+    def get(self, domain):
+        """
+        Return the WebsiteEntry for ``domain`` or None if it does not exist
+        """
+        return self.get_many([domain]).get(domain)
+
+    def get_active(self, domain):
+        """
+        Return the WebsiteEntry for an active website, otherwise None
+        """
+        entry = self.get(domain)
+        return entry if entry is not None and entry.is_active else None
+
+    async def aget_active(self, domain):
+        entry = (await self.aget_many([domain])).get(domain)
+        return entry if entry is not None and entry.is_active else None
+
+    def get_active_many(self, domains):
+        """
+        Return ``{domain: WebsiteEntry}`` for the active websites among domains
+        """
+        return {
+            domain: entry
+            for domain, entry in self.get_many(domains).items()
+            if entry.is_active
+        }
+
+    def invalidate(self, domain=None, website_id=None):
+        """
+        Evict a domain and/or every domain that points to website_id.
+        Without arguments the whole registry is cleared.
+        """
+        with self._lock:
+            if domain is None and website_id is None:
+                self._entries.clear()
+                self._loaded = False
+                return
+            self._entries.pop(domain, None)
+            if website_id is not None:
+                stale = [
+                    cached_domain
+                    for cached_domain, (entry, _) in self._entries.items()
+                    if entry is not None and entry.website_id == website_id
+                ]
+                for cached_domain in stale:
+                    del self._entries[cached_domain]
+
+    def publish_invalidation(self, domain, website_id):
+        """
+        Ask every process to evict a website from its registry
+        """
+        if not settings.WEBSITE_REGISTRY_PUBSUB:
+            return
+        try:
+            client = redis.Redis.from_url(settings.WEBSITE_REGISTRY_REDIS_URL)
+            client.publish(
+                INVALIDATION_CHANNEL,
+                json.dumps({"domain": domain, "website_id": website_id}),
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Website registry invalidation not published: {e}")
+
+    def _start_listener(self):
+        if not settings.WEBSITE_REGISTRY_PUBSUB:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(
+                target=self._listen, name="website-registry", daemon=True
+            )
+        self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                client = redis.Redis.from_url(settings.WEBSITE_REGISTRY_REDIS_URL)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                for message in pubsub.listen():
+                    data = json.loads(message["data"])
+                    self.invalidate(data.get("domain"), data.get("website_id"))
+            except Exception as e:
+                logger.warning(f"Website registry listener reconnecting: {e}")
+                # Entries may have missed invalidations while disconnected
+                self.invalidate()
+                time.sleep(5)
+
+
+website_registry = WebsiteRegistry()
@@ -0,0 +1,283 @@
+"""
+Per-organization retention of tracking data.
+
+Raw data (page views, events with their promoted properties, sessions,
+hourly rollups) is kept for ``Organization.raw_retention_days`` (default
+``TRACKING_RAW_RETENTION_DAYS``); daily aggregates independently for
+``aggregate_retention_days`` (default ``TRACKING_AGGREGATE_RETENTION_DAYS``).
+0 keeps data forever.
+
+With archiving enabled (``TRACKING_ARCHIVE_AFTER_DAYS``, see
+``tracking.archive``) page views and events leave the hot tables through
+the archive instead of the raw window, so none is deleted before it is
+archived; the raw window still applies to sessions and hourly rollups.
+Archived days are kept for ``TRACKING_ARCHIVE_RETENTION_DAYS``, or by
+default for the organization's aggregate window, since they back reports
+over the same periods as the daily aggregates.
+
+Partitions older than every website's cutoff are detached and dropped,
+as are the ones ``maintain_partitions`` already detached; with archiving
+enabled only once they are past the hot window and empty.
+The rest is deleted per website in keyset-ordered chunks of
+``TRACKING_RETENTION_BATCH_SIZE`` with set-based ``DELETE ... USING``
+statements, pausing ``TRACKING_RETENTION_PAUSE`` seconds between chunks.
+A run stops after ``TRACKING_RETENTION_MAX_SECONDS``; raw table passes
+record their keyset position in ``RetentionProgress`` and resume there.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from tracking import archive, partitions
+from tracking.models import RetentionProgress, Website
+
+logger = logging.getLogger(__name__)
+
+# Deletes one keyset chunk of a website's rows older than the cutoff and
+# returns the last key of the chunk and the number of rows deleted
+PURGE_SQL = """
+WITH batch AS (
+    SELECT id, {column} AS key FROM {table}
+    WHERE website_id = %(website_id)s AND {column} < %(cutoff)s{condition}
+      AND ({column}, id) > (%(after_key)s, %(after_id)s)
+    ORDER BY {column}, id
+    LIMIT %(limit)s
+), gone AS (
+    DELETE FROM {table} t USING batch b
+    WHERE t.id = b.id AND t.{column} = b.key
+    RETURNING t.id
+){cascade}
+SELECT key, id, (SELECT count(*) FROM gone) FROM batch
+ORDER BY key DESC, id DESC
+LIMIT 1
+"""
+
+EVENT_PROPERTIES_CASCADE = """, properties AS (
+    DELETE FROM event_properties p USING gone g WHERE p.event_id = g.id
+)"""
+
+# Sessions go once their hits are gone; last_seen_at bounds their hits
+SESSION_CONDITION = """
+      AND last_seen_at < %(cutoff)s
+      AND NOT EXISTS (SELECT 1 FROM page_views p WHERE p.session_id = sessions.id)
+      AND NOT EXISTS (SELECT 1 FROM events e WHERE e.session_id = sessions.id)"""
+
+# Promoted properties of an events partition about to be dropped
+PARTITION_PROPERTIES_SQL = """
+WITH batch AS (
+    SELECT id FROM {partition} WHERE id > %s ORDER BY id LIMIT %s
+), gone AS (
+    DELETE FROM event_properties p USING batch b WHERE p.event_id = b.id
+)
+SELECT max(id) FROM batch
+"""
+
+# (table, keyset column, extra condition, cascade), in deletion order
+RAW_TABLES = (
+    ("page_views", '"timestamp"', "", ""),
+    ("events", '"timestamp"', "", EVENT_PROPERTIES_CASCADE),
+    ("sessions", "started_at", SESSION_CONDITION, ""),
+    # Intraday detail goes with the raw data; daily aggregates outlive it
+    ("hourly_website_stats", "hour", "", ""),
+)
+AGGREGATE_TABLES = ("daily_website_stats", "page_stats", "bot_hit_counters")
+
+
+class RetentionBudgetExceeded(Exception):
+    pass
+
+
+def raw_days(days):
+    return settings.TRACKING_RAW_RETENTION_DAYS if days is None else days
+
+
+def aggregate_days(days):
+    return settings.TRACKING_AGGREGATE_RETENTION_DAYS if days is None else days
+
+
+def archive_days(aggregate_retention):
+    return settings.TRACKING_ARCHIVE_RETENTION_DAYS or aggregate_retention
+
+
+def get_policies():
+    """
+    Return ``[(website_id, raw_days, aggregate_days)]`` for every website
+    """
+    rows = Website.objects.values_list(
+        "id",
+        "organization__raw_retention_days",
+        "organization__aggregate_retention_days",
+    )
+    return [(pk, raw_days(raw), aggregate_days(agg)) for pk, raw, agg in rows]
+
+
+class RetentionRun:
+    def __init__(self, now=None, max_seconds=None):
+        self.now = now or timezone.now()
+        if max_seconds is None:
+            max_seconds = settings.TRACKING_RETENTION_MAX_SECONDS
+        self.deadline = time.monotonic() + max_seconds
+        self.batch_size = settings.TRACKING_RETENTION_BATCH_SIZE
+        self.hot_start = archive.hot_start(self.now)
+        self.stats = {"dropped_partitions": [], "deleted": {}, "complete": True}
+
+    def pause(self):
+        """
+        Throttle between chunks; stop the run once its time budget is spent
+        """
+        if time.monotonic() >= self.deadline:
+            raise RetentionBudgetExceeded()
+        if settings.TRACKING_RETENTION_PAUSE:
+            time.sleep(settings.TRACKING_RETENTION_PAUSE)
+
+    def count(self, table, deleted):
+        self.stats["deleted"][table] = self.stats["deleted"].get(table, 0) + deleted
+
+    def drop_partitions(self, cutoff):
+        """
+        Drop the page_views / events partitions, attached or detached, that
+        end before ``cutoff`` and, when archiving, that the archive has
+        emptied
+        """
+        if self.hot_start is not None:
+            cutoff = min(cutoff, self.hot_start)
+        for table in partitions.PARTITIONED_TABLES:
+            for attached, listed in (
+                (True, partitions.list_partitions(table)),
+                (False, partitions.list_detached(table)),
+            ):
+                for partition in listed:
+                    if partition.end > cutoff:
+                        break
+                    if self.hot_start is not None and partitions.has_rows(
+                        partition.name
+                    ):
+                        continue
+                    self.drop_partition(table, partition.name, attached)
+
+    def drop_partition(self, table, name, attached):
+        quoted = connection.ops.quote_name
+        if table == "events":
+            self.purge_partition_properties(name)
+        with connection.cursor() as cursor:
+            # Deferred FK checks pending in an enclosing transaction would
+            # block the DROP
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            if attached:
+                cursor.execute(
+                    f"ALTER TABLE {quoted(table)} DETACH PARTITION {quoted(name)}"
+                )
+            cursor.execute(f"DROP TABLE {quoted(name)}")
+        self.stats["dropped_partitions"].append(name)
+        logger.info(f"Dropped expired partition {name}")
+
+    def purge_partition_properties(self, partition):
+        sql = PARTITION_PROPERTIES_SQL.format(
+            partition=connection.ops.quote_name(partition)
+        )
+        last_id = 0
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [last_id, self.batch_size])
+                last_id = cursor.fetchone()[0]
+            if last_id is None:
+                return
+            self.pause()
+
+    def purge(
+        self, website_id, table, column, cutoff, condition="", cascade="", progress=None
+    ):
+        """
+        Delete a website's rows of ``table`` older than ``cutoff`` chunk by
+        chunk, following ``progress`` if given
+        """
+        sql = PURGE_SQL.format(
+            table=table, column=column, condition=condition, cascade=cascade
+        )
+        after_key, after_id = "-infinity", 0
+        if progress is not None and progress.last_key is not None:
+            after_key, after_id = progress.last_key, progress.last_id
+
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    sql,
+                    {
+                        "website_id": website_id,
+                        "cutoff": cutoff,
+                        "after_key": after_key,
+                        "after_id": after_id,
+                        "limit": self.batch_size,
+                    },
+                )
+                row = cursor.fetchone()
+
+            if row is None:
+                if progress is not None:
+                    progress.last_key, progress.last_id = None, 0
+                    progress.completed_at = timezone.now()
+                    progress.save()
+                return
+
+            after_key, after_id, deleted = row
+            self.count(table, deleted)
+            if progress is not None:
+                progress.last_key, progress.last_id = after_key, after_id
+                progress.deleted += deleted
+                progress.save(
+                    update_fields=["last_key", "last_id", "deleted", "updated_at"]
+                )
+            self.pause()
+
+    def purge_raw(self, website_id, days):
+        cutoff = self.now - timedelta(days=days)
+        for table, column, condition, cascade in RAW_TABLES:
+            if self.hot_start is not None and table in archive.TABLES:
+                # Moved to the archive by archive_closed_days instead
+                continue
+            progress, _ = RetentionProgress.objects.get_or_create(
+                website_id=website_id, table=table
+            )
+            self.purge(website_id, table, column, cutoff, condition, cascade, progress)
+
+    def purge_archive(self, website_id, days):
+        cutoff = self.now - timedelta(days=days)
+        # Archived days are whole days; one straddling the cutoff stays
+        self.count("archive", archive.purge(website_id, timezone.localdate(cutoff)))
+
+    def purge_aggregates(self, website_id, days):
+        cutoff = (self.now - timedelta(days=days)).date()
+        for table in AGGREGATE_TABLES:
+            self.purge(website_id, table, "date", cutoff)
+
+    def run(self):
+        policies = get_policies()
+        try:
+            # Partitions can go once they are past every website's window
+            raw = [days for _, days, _ in policies]
+            if raw and all(raw):
+                self.drop_partitions(self.now - timedelta(days=max(raw)))
+
+            for website_id, raw_retention, aggregate_retention in policies:
+                if raw_retention:
+                    self.purge_raw(website_id, raw_retention)
+                if aggregate_retention:
+                    self.purge_aggregates(website_id, aggregate_retention)
+                if archive_days(aggregate_retention):
+                    self.purge_archive(website_id, archive_days(aggregate_retention))
+        except RetentionBudgetExceeded:
+            self.stats["complete"] = False
+            logger.info("Retention time budget spent, resuming on the next run")
+        return self.stats
+
+
+def apply_retention(now=None, max_seconds=None):
+    """
+    Apply every organization's retention windows. Returns
+    ``{"dropped_partitions": [...], "deleted": {table: rows}, "complete"}``.
+    """
+    return RetentionRun(now, max_seconds).run()
@@ -0,0 +1,316 @@
+"""
+Incremental hourly rollup of page views, events and sessions.
+
+Every run folds the rows inserted since the previous one into
+``HourlyWebsiteStats``, keyed by the hour of their timestamp (sessions by
+``started_at``), so late batches still land in their own hour. Progress is
+an id watermark per table in ``RollupWatermark``. Ids are drawn before
+their rows commit, so a run records the sequence value together with the
+transactions running at that moment (from ``pg_locks``), and a later run
+advances the watermark to it once all of them have finished; an insert
+gets its xid when it writes its first row, right after drawing its first
+id. No lock is taken, so writers never wait for the rollup. The recorded
+value is used one run later even when nothing was running: an insert that
+had drawn its id but not yet written its row has no xid to wait for, and
+the interval between runs covers that gap.
+
+Readers add the raw rows past the watermark (the "tail") to the hourly
+rows, so totals are current while only rows from the last few minutes
+are counted.
+"""
+import logging
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from tracking.models import (
+    Event,
+    HourlyWebsiteStats,
+    PageView,
+    RollupWatermark,
+    Session,
+)
+from tracking.utils import hll
+from tracking.utils.sampling import weighted_count
+
+logger = logging.getLogger(__name__)
+
+# Session-level advisory lock held while a rollup runs
+ROLLUP_LOCK_ID = 7_281_451
+
+# (table, model, time column, hourly field)
+SOURCES = (
+    ("page_views", PageView, "timestamp", "pageviews"),
+    ("events", Event, "timestamp", "events"),
+    ("sessions", Session, "started_at", "sessions"),
+)
+COUNTERS = ("pageviews", "sessions", "events")
+
+SKETCH_SQL = f"""
+SELECT website_id, hour, register, max(rank)
+FROM (
+    SELECT website_id, date_trunc('hour', "timestamp") AS hour,
+           {hll.REGISTERS_SQL}
+    FROM (
+        SELECT website_id, "timestamp", hashint8extended(session_id, 0) AS h
+        FROM page_views WHERE id > %s AND id <= %s
+    ) hits
+) ranked
+GROUP BY website_id, hour, register
+"""
+
+
+# The table's last id, then the xids of the other running transactions
+# (each holds a lock on its own xid)
+BOUND_SQL = """
+SELECT pg_sequence_last_value(pg_get_serial_sequence(%s, 'id')),
+       ARRAY(
+           SELECT DISTINCT transactionid::text::bigint FROM pg_locks
+           WHERE locktype = 'transactionid'
+             AND pid IS DISTINCT FROM pg_backend_pid()
+       )
+"""
+
+
+def committed_upper_bound(mark):
+    """
+    Return ``(last id, time)`` such that every insert into the mark's table
+    up to that id had finished by then, or ``None`` if no such bound is
+    known yet. Records the current sequence value on ``mark`` for a later
+    run; the value recorded by the previous run is the earliest returned.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(BOUND_SQL, [mark.table])
+        last_id, running = cursor.fetchone()
+    now = timezone.now()
+
+    bound = None
+    if mark.pending_id is not None and not set(mark.pending_xids) & set(running):
+        bound = (mark.pending_id, mark.pending_at)
+    if bound is not None or mark.pending_id is None:
+        mark.pending_id, mark.pending_xids, mark.pending_at = last_id or 0, running, now
+    if bound is None:
+        logger.info(f"Rollup of {mark.table} waits for running transactions")
+    return bound
+
+
+def count_by_hour(model, column, window):
+    """
+    Return ``{(website_id, hour): (weighted count, lowest rate)}`` for the
+    rows of ``model`` with ids in ``window``
+    """
+    rows = (
+        model.objects.filter(id__gt=window[0], id__lte=window[1])
+        .annotate(hour=TruncHour(column, tzinfo=dt_timezone.utc))
+        .values("website_id", "hour", "sample_rate")
+        .annotate(count=Count("*"))
+    )
+    counts = {}
+    for row in rows:
+        key = (row["website_id"], row["hour"])
+        count, rate = counts.get(key, (0.0, 1.0))
+        counts[key] = (
+            count + row["count"] / row["sample_rate"],
+            min(rate, row["sample_rate"]),
+        )
+    return counts
+
+
+def visitor_registers(window):
+    """
+    Return ``{(website_id, hour): [(register, rank)]}`` for the page views
+    with ids in ``window``
+    """
+    registers = {}
+    with connection.cursor() as cursor:
+        cursor.execute(SKETCH_SQL, list(window))
+        for website_id, hour, register, rank in cursor.fetchall():
+            registers.setdefault((website_id, hour), []).append((register, rank))
+    return registers
+
+
+def fold(windows):
+    """
+    Add the rows of each table's ``(after, upto)`` window to the hourly
+    rows. Returns the number of hourly rows written.
+    """
+    deltas = {}
+    for table, model, column, field in SOURCES:
+        if table not in windows:
+            continue
+        for key, (count, rate) in count_by_hour(model, column, windows[table]).items():
+            delta = deltas.setdefault(key, {"sample_rate": 1.0, "registers": []})
+            delta[field] = count
+            if table == "page_views":
+                delta["sample_rate"] = rate
+    if "page_views" in windows:
+        for key, pairs in visitor_registers(windows["page_views"]).items():
+            deltas.setdefault(key, {"sample_rate": 1.0, "registers": []})
+            deltas[key]["registers"] = pairs
+    if not deltas:
+        return 0
+
+    existing = {
+        (row.website_id, row.hour): row
+        for row in HourlyWebsiteStats.objects.filter(
+            website_id__in={website_id for website_id, _ in deltas},
+            hour__in={hour for _, hour in deltas},
+        )
+    }
+    rows = []
+    for (website_id, hour), delta in deltas.items():
+        row = existing.get((website_id, hour)) or HourlyWebsiteStats(
+            website_id=website_id, hour=hour
+        )
+        for field in COUNTERS:
+            setattr(row, field, getattr(row, field) + delta.get(field, 0))
+        row.sample_rate = min(row.sample_rate, delta["sample_rate"])
+        row.visitors_sketch = hll.from_registers(
+            delta["registers"], row.visitors_sketch
+        )
+        rows.append(row)
+    HourlyWebsiteStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["website", "hour"],
+        update_fields=[*COUNTERS, "visitors_sketch", "sample_rate"],
+    )
+    return len(rows)
+
+
+def rollup_hourly_stats():
+    """
+    Fold the rows inserted since the last run into ``HourlyWebsiteStats``.
+    Returns ``{"hours": rows written, "tables": {table: last id}}``.
+    """
+    result = {"hours": 0, "tables": {}}
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [ROLLUP_LOCK_ID])
+        if not cursor.fetchone()[0]:
+            logger.info("Hourly rollup already running, skipped")
+            return result
+    try:
+        marks = {
+            mark.table: mark
+            for mark in RollupWatermark.objects.filter(
+                table__in=[table for table, *_ in SOURCES]
+            )
+        }
+        windows = {}
+        for table, *_ in SOURCES:
+            mark = marks.setdefault(table, RollupWatermark(table=table))
+            bound = committed_upper_bound(mark)
+            if bound is None:
+                continue
+            upto = min(bound[0], mark.last_id + settings.TRACKING_ROLLUP_MAX_ROWS)
+            if upto > mark.last_id:
+                windows[table] = (mark.last_id, upto)
+            if upto == bound[0]:
+                mark.caught_up_at = bound[1]
+            mark.last_id = upto
+
+        with transaction.atomic():
+            result["hours"] = fold(windows)
+            for mark in marks.values():
+                mark.save()
+                result["tables"][mark.table] = mark.last_id
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [ROLLUP_LOCK_ID])
+    return result
+
+
+def watermarks():
+    """
+    Return ``{table: last id}`` of the folded rows
+    """
+    marks = dict(RollupWatermark.objects.values_list("table", "last_id"))
+    return {table: marks.get(table, 0) for table, *_ in SOURCES}
+
+
+def caught_up(moment):
+    """
+    Return True if every row committed before ``moment`` has been folded in
+    """
+    return RollupWatermark.objects.filter(
+        table__in=[table for table, *_ in SOURCES], caught_up_at__gte=moment
+    ).count() == len(SOURCES)
+
+
+def empty_totals():
+    return {"pageviews": 0.0, "sessions": 0.0, "events": 0.0, "sampled": False}
+
+
+def tail_by_hour(website_ids, start, end=None):
+    """
+    Return ``{hour: totals}`` for the raw rows of ``website_ids`` past the
+    watermarks, within ``[start, end)``
+    """
+    marks = watermarks()
+    tail = {}
+    for table, model, column, field in SOURCES:
+        filters = {
+            "website_id__in": website_ids,
+            "id__gt": marks[table],
+            f"{column}__gte": start,
+        }
+        if end is not None:
+            filters[f"{column}__lt"] = end
+        rows = (
+            model.objects.filter(**filters)
+            .annotate(hour=TruncHour(column, tzinfo=dt_timezone.utc))
+            .values("hour")
+            .annotate(count=weighted_count(), min_rate=Min("sample_rate"))
+        )
+        for row in rows:
+            totals = tail.setdefault(row["hour"], empty_totals())
+            totals[field] += row["count"]
+            totals["sampled"] = totals["sampled"] or row["min_rate"] < 1
+    return tail
+
+
+def hourly_totals(website_ids, start, end=None, group_by=None, tail=True):
+    """
+    Sum the hourly rows of ``website_ids`` within ``[start, end)`` into
+    ``pageviews``, ``sessions``, ``events``, ``visitors`` and ``sampled``.
+    ``group_by`` ("hour" or "website_id") returns ``{key: totals}``
+    instead. With ``tail`` the raw rows past the watermarks are added to
+    the counts (by hour only); visitors come from the sketches alone.
+    """
+    rows = HourlyWebsiteStats.objects.filter(
+        website_id__in=website_ids, hour__gte=start
+    )
+    if end is not None:
+        rows = rows.filter(hour__lt=end)
+
+    grouped = {}
+    sketches = {}
+    for row in rows:
+        key = getattr(row, group_by) if group_by else None
+        totals = grouped.setdefault(key, empty_totals())
+        for field in COUNTERS:
+            totals[field] += getattr(row, field)
+        totals["sampled"] = totals["sampled"] or row.sample_rate < 1
+        sketch, rate = sketches.get(key, (None, 1.0))
+        sketches[key] = (
+            hll.merge(sketch, row.visitors_sketch),
+            min(rate, row.sample_rate),
+        )
+
+    if tail and group_by != "website_id":
+        for hour, counts in tail_by_hour(website_ids, start, end).items():
+            totals = grouped.setdefault(hour if group_by else None, empty_totals())
+            for field in COUNTERS:
+                totals[field] += counts[field]
+            totals["sampled"] = totals["sampled"] or counts["sampled"]
+
+    for key, totals in grouped.items():
+        sketch, rate = sketches.get(key, (None, 1.0))
+        totals["visitors"] = hll.estimate(sketch) / rate
+    if group_by:
+        return grouped
+    return grouped.get(None, {**empty_totals(), "visitors": 0.0})
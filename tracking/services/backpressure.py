@@ -0,0 +1,217 @@
+"""
+Admission control for the ingest path.
+
+Each process counts the tracking requests it is currently serving, overall
+and per website, and sheds load before requests pile up behind a slow
+database:
+
+* 503 + Retry-After when the process is at ``TRACKING_MAX_INFLIGHT`` or, in
+  buffered mode, when the ingestion stream is deeper than
+  ``TRACKING_MAX_BUFFER_DEPTH``;
+* 429 + Retry-After when one website holds more than its share of slots:
+  ``TRACKING_MAX_INFLIGHT_PER_WEBSITE`` normally, and an equal share of
+  ``TRACKING_MAX_INFLIGHT`` across active websites once the process is
+  past ``TRACKING_FAIR_SHARE_AT`` of its capacity.
+
+Shed counters are aggregated across processes in a Redis hash and exposed
+by the metrics endpoint. Requests never wait on Redis: they only count
+sheds in memory and read the last sampled stream depth, while a background
+thread samples the depth every ``DEPTH_SAMPLE_INTERVAL`` seconds and adds
+the shed counts to the hash every ``SHED_FLUSH_INTERVAL`` seconds.
+"""
+import logging
+import threading
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+from django.http import JsonResponse
+
+from tracking.services.ingestion_service import IngestionService, get_ingestion_buffer
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "tracking:backpressure:shed"
+
+# Buffer depth is sampled at most this often (seconds)
+DEPTH_SAMPLE_INTERVAL = 1.0
+# Shed counts are added to METRICS_KEY this often (seconds)
+SHED_FLUSH_INTERVAL = 5.0
+# Socket timeouts of the metrics Redis client (seconds)
+METRICS_REDIS_TIMEOUT = 0.5
+
+Rejection = namedtuple("Rejection", ["status", "reason", "retry_after"])
+
+
+class AdmissionController:
+    def __init__(self):
+        self.inflight = 0
+        self.per_website = Counter()
+        self.shed = Counter()
+        self.admitted = 0
+        self._depth = 0
+        self._lock = threading.Lock()
+        self._client = None
+        # Shed counts not yet added to METRICS_KEY
+        self._unflushed = Counter()
+        self._flusher = None
+
+    def buffer_depth(self):
+        """
+        Return the last sampled ingestion stream length, 0 in sync mode
+        """
+        if not IngestionService.is_buffered():
+            return 0
+        self._start_flusher()
+        with self._lock:
+            return self._depth
+
+    def sample_depth(self):
+        """
+        Read the ingestion stream length, through the timeout-bounded
+        metrics client when the buffer lives in Redis
+        """
+        if not IngestionService.is_buffered():
+            return
+        try:
+            if settings.TRACKING_BUFFER_BACKEND == "local":
+                depth = get_ingestion_buffer().length()
+            else:
+                depth = self._redis().xlen(settings.TRACKING_BUFFER_STREAM)
+        except redis.RedisError as e:
+            logger.warning(f"Could not sample ingestion buffer depth: {e}")
+            return
+        with self._lock:
+            self._depth = depth
+
+    def _reject(self, website_key, depth):
+        if depth > settings.TRACKING_MAX_BUFFER_DEPTH:
+            return Rejection(503, "buffer_depth", settings.TRACKING_RETRY_AFTER)
+
+        max_inflight = settings.TRACKING_MAX_INFLIGHT
+        if self.inflight >= max_inflight:
+            return Rejection(503, "inflight", settings.TRACKING_RETRY_AFTER)
+
+        limit = settings.TRACKING_MAX_INFLIGHT_PER_WEBSITE
+        if self.inflight >= max_inflight * settings.TRACKING_FAIR_SHARE_AT:
+            active = len(self.per_website) + (website_key not in self.per_website)
+            limit = min(limit, max(1, max_inflight // active))
+        if self.per_website[website_key] >= limit:
+            return Rejection(429, "website_share", settings.TRACKING_RETRY_AFTER)
+        return None
+
+    def admit(self, website_key):
+        """
+        Take a slot for ``website_key`` or return the Rejection to send
+        """
+        if not settings.TRACKING_BACKPRESSURE:
+            return None
+        depth = self.buffer_depth()
+        with self._lock:
+            rejection = self._reject(website_key, depth)
+            if rejection is None:
+                self.inflight += 1
+                self.per_website[website_key] += 1
+                self.admitted += 1
+                return None
+            self.shed[rejection.reason] += 1
+            self._unflushed[rejection.reason] += 1
+        self._start_flusher()
+        return rejection
+
+    def release(self, website_key):
+        with self._lock:
+            self.inflight -= 1
+            self.per_website[website_key] -= 1
+            if self.per_website[website_key] <= 0:
+                del self.per_website[website_key]
+
+    @contextmanager
+    def admission(self, website_key):
+        """
+        Yield None while holding a slot, or the Rejection if none is available
+        """
+        enabled = settings.TRACKING_BACKPRESSURE
+        rejection = self.admit(website_key)
+        if rejection is not None or not enabled:
+            yield rejection
+            return
+        try:
+            yield None
+        finally:
+            self.release(website_key)
+
+    def _redis(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(
+                settings.TRACKING_BUFFER_REDIS_URL,
+                socket_timeout=METRICS_REDIS_TIMEOUT,
+                socket_connect_timeout=METRICS_REDIS_TIMEOUT,
+            )
+        return self._client
+
+    def flush_shed(self):
+        """
+        Add the shed counts of this process to METRICS_KEY
+        """
+        with self._lock:
+            counts, self._unflushed = self._unflushed, Counter()
+        if not counts:
+            return
+        try:
+            pipeline = self._redis().pipeline(transaction=False)
+            for reason, count in counts.items():
+                pipeline.hincrby(METRICS_KEY, reason, count)
+            pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not record shed requests: {e}")
+            with self._lock:
+                self._unflushed.update(counts)
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="backpressure", daemon=True
+            )
+        self._flusher.start()
+
+    def _flush_loop(self):
+        flushed_at = time.monotonic()
+        while True:
+            time.sleep(DEPTH_SAMPLE_INTERVAL)
+            try:
+                self.sample_depth()
+                if time.monotonic() - flushed_at >= SHED_FLUSH_INTERVAL:
+                    self.flush_shed()
+                    flushed_at = time.monotonic()
+            except Exception as e:
+                # The thread must outlive unexpected errors
+                logger.error(f"Backpressure sampling failed: {e}")
+
+    def shed_totals(self):
+        """
+        Return shed counts by reason across all processes
+        """
+        self.flush_shed()
+        try:
+            totals = self._redis().hgetall(METRICS_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Could not read shed counters: {e}")
+            return dict(self.shed)
+        return {reason.decode(): int(count) for reason, count in totals.items()}
+
+
+admission_controller = AdmissionController()
+
+
+def rejection_response(rejection):
+    response = JsonResponse(
+        {"error": "Tracking temporarily overloaded", "reason": rejection.reason},
+        status=rejection.status,
+    )
+    response["Retry-After"] = str(rejection.retry_after)
+    return response
@@ -0,0 +1,229 @@
+"""
+Ingest-time bot filtering.
+
+Hits are checked before anything is persisted: first the cached static
+verdicts of ``tracking.utils.bots`` (crawler user agents, datacenter IPs),
+then a per-session hit rate kept in one-minute Redis counters, all in a
+single pipelined round trip per request or batch. Only the hits of a minute
+beyond ``TRACKING_BOT_MAX_HITS_PER_MINUTE`` count as bots; imported batches
+(NDJSON uploads) replay old traffic at once and skip the rate check. Bot
+hits are dropped;
+with ``TRACKING_BOT_FILTER = "count"`` they are tallied in a Redis hash and
+folded into ``bot_hit_counters`` by the ``flush_bot_counters`` task instead
+of being stored as sessions and page views. Without Redis the rate check is
+skipped and counts are written through.
+"""
+import hashlib
+import logging
+import time
+from collections import Counter
+from datetime import date
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from tracking.utils.async_redis import get_async_client
+from tracking.utils.bots import REASON_RATE, static_verdict
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY_PREFIX = "tracking:bots:rate"
+COUNTS_KEY = "tracking:bots:counts"
+FLUSHING_COUNTS_KEY = COUNTS_KEY + ":flushing"
+
+COUNT_ROW_SQL = "(%s::bigint, %s::date, %s::varchar, %s::bigint)"
+
+# Counts of websites deleted since the hits were seen are discarded
+ADD_COUNTS_SQL = """
+INSERT INTO bot_hit_counters (website_id, date, reason, hits)
+SELECT v.website_id, v.date, v.reason, v.hits
+FROM (VALUES {values}) AS v (website_id, date, reason, hits)
+JOIN websites w ON w.id = v.website_id
+ON CONFLICT (website_id, date, reason)
+DO UPDATE SET hits = bot_hit_counters.hits + EXCLUDED.hits
+"""
+
+
+def is_enabled():
+    return settings.TRACKING_BOT_FILTER in ("drop", "count")
+
+
+_client = None
+
+
+def get_bot_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.TRACKING_BOT_REDIS_URL)
+    return _client
+
+
+def _rate_keys(hits, verdicts, rates=True):
+    """
+    Return the rate counter key of each hit without a verdict (else None)
+    and the number of hits per key
+    """
+    if not rates or settings.TRACKING_BOT_MAX_HITS_PER_MINUTE <= 0:
+        return [None] * len(hits), Counter()
+    minute = int(time.time() // 60)
+    hit_keys = []
+    for (domain, session_id, _, _), verdict in zip(hits, verdicts):
+        key = None
+        if verdict is None:
+            digest = hashlib.blake2b(f"{domain}:{session_id}".encode(), digest_size=8)
+            key = f"{RATE_KEY_PREFIX}:{minute}:{digest.hexdigest()}"
+        hit_keys.append(key)
+    return hit_keys, Counter(key for key in hit_keys if key)
+
+
+def _queue_rates(pipe, counts):
+    for key, hits in counts.items():
+        pipe.incrby(key, hits)
+        pipe.expire(key, 120)
+
+
+def _apply_rates(verdicts, hit_keys, counts, replies):
+    limit = settings.TRACKING_BOT_MAX_HITS_PER_MINUTE
+    # Hits of each session counted in this minute before these ones
+    seen = {key: total - counts[key] for key, total in zip(counts, replies[::2])}
+    flagged = []
+    for verdict, key in zip(verdicts, hit_keys):
+        if key is not None:
+            seen[key] += 1
+            if seen[key] > limit:
+                verdict = REASON_RATE
+        flagged.append(verdict)
+    return flagged
+
+
+def detect_bots(hits, rates=True):
+    """
+    Return a bot reason (or None) for each ``(domain, session_id,
+    user_agent, ip_address)`` hit; ``rates=False`` skips the hit rate check
+    """
+    verdicts = [static_verdict(user_agent, ip) for _, _, user_agent, ip in hits]
+    hit_keys, counts = _rate_keys(hits, verdicts, rates)
+    if not counts:
+        return verdicts
+    try:
+        pipe = get_bot_client().pipeline(transaction=False)
+        _queue_rates(pipe, counts)
+        replies = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Bot rate check skipped: {e}")
+        return verdicts
+    return _apply_rates(verdicts, hit_keys, counts, replies)
+
+
+async def adetect_bots(hits, rates=True):
+    """
+    Async variant of ``detect_bots`` using ``redis.asyncio``
+    """
+    verdicts = [static_verdict(user_agent, ip) for _, _, user_agent, ip in hits]
+    hit_keys, counts = _rate_keys(hits, verdicts, rates)
+    if not counts:
+        return verdicts
+    try:
+        pipe = get_async_client(settings.TRACKING_BOT_REDIS_URL).pipeline(
+            transaction=False
+        )
+        _queue_rates(pipe, counts)
+        replies = await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Bot rate check skipped: {e}")
+        return verdicts
+    return _apply_rates(verdicts, hit_keys, counts, replies)
+
+
+def _count_fields(entries, bots):
+    """
+    Return ``{"website_id:date:reason": hits}`` for ``(domain, reason)`` bots
+    """
+    today = timezone.now().date().isoformat()
+    fields = Counter()
+    for domain, reason in bots:
+        entry = entries.get(domain)
+        if entry is not None:
+            fields[f"{entry.website_id}:{today}:{reason}"] += 1
+    return fields
+
+
+def count_bots(entries, bots):
+    """
+    Tally dropped ``(domain, reason)`` bot hits, if counting is enabled
+    """
+    fields = _count_fields(entries, bots)
+    if not fields or settings.TRACKING_BOT_FILTER != "count":
+        return
+    try:
+        pipe = get_bot_client().pipeline(transaction=False)
+        for field, hits in fields.items():
+            pipe.hincrby(COUNTS_KEY, field, hits)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Writing bot counts through, Redis failed: {e}")
+        add_counts(fields)
+
+
+async def acount_bots(entries, bots):
+    """
+    Async variant of ``count_bots``
+    """
+    fields = _count_fields(entries, bots)
+    if not fields or settings.TRACKING_BOT_FILTER != "count":
+        return
+    try:
+        pipe = get_async_client(settings.TRACKING_BOT_REDIS_URL).pipeline(
+            transaction=False
+        )
+        for field, hits in fields.items():
+            pipe.hincrby(COUNTS_KEY, field, hits)
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Writing bot counts through, Redis failed: {e}")
+        await sync_to_async(add_counts)(fields)
+
+
+def add_counts(fields):
+    """
+    Add ``{"website_id:date:reason": hits}`` to ``bot_hit_counters`` in one
+    upsert
+    """
+    rows = []
+    for field, hits in fields.items():
+        website_id, day, reason = field.split(":")
+        rows.append((int(website_id), date.fromisoformat(day), reason, int(hits)))
+    if not rows:
+        return 0
+    values = ", ".join([COUNT_ROW_SQL] * len(rows))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ADD_COUNTS_SQL.format(values=values),
+            [param for row in rows for param in row],
+        )
+        return cursor.rowcount
+
+
+def flush_counts():
+    """
+    Move the bot counts tallied in Redis into ``bot_hit_counters``; returns
+    the number of counter rows written. A flush interrupted after its
+    upsert may count its hits twice.
+    """
+    client = get_bot_client()
+    if not client.exists(FLUSHING_COUNTS_KEY):
+        try:
+            client.rename(COUNTS_KEY, FLUSHING_COUNTS_KEY)
+        except redis.ResponseError:
+            # Nothing tallied since the last flush
+            return 0
+    fields = {
+        field.decode(): int(hits)
+        for field, hits in client.hgetall(FLUSHING_COUNTS_KEY).items()
+    }
+    written = add_counts(fields)
+    client.delete(FLUSHING_COUNTS_KEY)
+    return written
@@ -0,0 +1,329 @@
+"""
+PostgreSQL COPY-based bulk loader for page views and events.
+
+Hits are streamed with ``COPY ... FROM STDIN`` into a temporary staging
+table (temporary tables are never WAL-logged and are private to the
+connection, so concurrent loaders do not need to coordinate), then merged
+into ``sessions``, ``page_views`` and ``events`` with three set-based
+statements in the same transaction. Rows are encoded lazily while psycopg2
+reads the stream, so a batch is never materialized as model instances.
+Domains are resolved inside the database, since the connection cannot run
+other queries while a COPY is in progress. Page view text columns are
+interned: ids are hashed while encoding rows, text already known to the
+process's dimension cache is not sent at all, and the remaining values are
+upserted into the lookup tables with one statement. Per-session activity is
+read back from the staging table and handed to the write-behind
+``SessionActivity`` instead of updating existing sessions.
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, Iterator
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from tracking.dimensions import dimension_cache, dimension_id, remember_on_commit
+from tracking.event_schemas import PROMOTED_PROPERTIES_CTE
+from tracking.models import PageTitle, PageUrl, Referrer, UserAgent
+from tracking.services.session_activity import Activity, session_activity
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = "tracking_hits_staging"
+
+STAGING_COLUMNS = (
+    "kind",
+    "domain",
+    "session_key",
+    "timestamp",
+    "page_url",
+    "page_title",
+    "referrer",
+    "load_time",
+    "user_agent",
+    "ip_address",
+    "event_name",
+    "event_data",
+    "country",
+    "browser",
+    "device_type",
+    "page_url_id",
+    "page_title_id",
+    "referrer_id",
+    "user_agent_id",
+)
+
+# Interned page view columns and their lookup models
+DIMENSIONS = (
+    ("page_url", PageUrl),
+    ("page_title", PageTitle),
+    ("referrer", Referrer),
+    ("user_agent", UserAgent),
+)
+
+CREATE_STAGING_SQL = f"""
+CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+    kind char(1) NOT NULL,
+    domain varchar(255) NOT NULL,
+    website_id bigint,
+    sample_rate double precision,
+    session_key varchar(100) NOT NULL,
+    timestamp timestamptz NOT NULL,
+    page_url text,
+    page_title varchar(500),
+    referrer text,
+    load_time double precision,
+    user_agent text,
+    ip_address inet,
+    event_name varchar(100),
+    event_data jsonb,
+    country varchar(2),
+    browser varchar(50),
+    device_type varchar(20),
+    page_url_id bigint,
+    page_title_id bigint,
+    referrer_id bigint,
+    user_agent_id bigint
+) ON COMMIT DELETE ROWS
+"""
+
+# Text is staged only for values not yet known to be interned (the user
+# agent is always staged, since new sessions need it)
+INTERN_DIMENSIONS_SQL = (
+    "WITH "
+    + ",\n".join(
+        f"""{column} AS (
+    INSERT INTO {model._meta.db_table} (id, value)
+    SELECT DISTINCT ON ({column}_id) {column}_id, {column}
+    FROM {STAGING_TABLE}
+    WHERE kind = 'p' AND {column} IS NOT NULL
+    ORDER BY {column}_id
+    ON CONFLICT (id) DO NOTHING
+)"""
+        for column, model in DIMENSIONS
+    )
+    + "\nSELECT 1"
+)
+
+# Rows are only cleared on commit; a load nested in an outer transaction
+# must not see the previous batch
+TRUNCATE_STAGING_SQL = f"TRUNCATE {STAGING_TABLE}"
+
+RESOLVE_WEBSITES_SQL = f"""
+UPDATE {STAGING_TABLE} st SET website_id = w.id, sample_rate = w.sample_rate
+FROM websites w
+WHERE w.domain = st.domain AND w.is_active
+"""
+
+DROP_UNRESOLVED_SQL = f"DELETE FROM {STAGING_TABLE} WHERE website_id IS NULL"
+
+MERGE_SESSIONS_SQL = f"""
+INSERT INTO sessions (
+    website_id, session_id, started_at, user_agent, ip_address,
+    country, browser, device_type, sample_rate, last_seen_at
+)
+SELECT DISTINCT ON (website_id, session_key)
+    website_id, session_key, timestamp, user_agent, ip_address,
+    country, browser, device_type, sample_rate,
+    MAX(timestamp) OVER (PARTITION BY website_id, session_key)
+FROM {STAGING_TABLE}
+ORDER BY website_id, session_key, timestamp
+ON CONFLICT (website_id, session_id) DO NOTHING
+"""
+
+# Per-session activity of the batch, recorded through SessionActivity
+SESSION_ACTIVITY_SQL = f"""
+SELECT st.website_id, s.id, MAX(st.timestamp), COUNT(*) FILTER (WHERE st.kind = 'p')
+FROM {STAGING_TABLE} st
+JOIN sessions s ON s.website_id = st.website_id AND s.session_id = st.session_key
+GROUP BY st.website_id, s.id
+"""
+
+MERGE_PAGEVIEWS_SQL = f"""
+INSERT INTO page_views (
+    website_id, session_id, page_url_ref_id, page_title_ref_id, referrer_ref_id,
+    timestamp, load_time, user_agent_ref_id, ip_address, sample_rate
+)
+SELECT st.website_id, s.id, st.page_url_id, st.page_title_id, st.referrer_id,
+       st.timestamp, st.load_time, st.user_agent_id, st.ip_address, st.sample_rate
+FROM {STAGING_TABLE} st
+JOIN sessions s ON s.website_id = st.website_id AND s.session_id = st.session_key
+WHERE st.kind = 'p'
+"""
+
+# Promoted event properties are inserted by the same statement
+MERGE_EVENTS_SQL = (
+    f"""
+WITH inserted AS (
+    INSERT INTO events (
+        website_id, session_id, event_name, event_data, page_url, timestamp,
+        sample_rate
+    )
+    SELECT st.website_id, s.id, st.event_name, st.event_data, st.page_url,
+           st.timestamp, st.sample_rate
+    FROM {STAGING_TABLE} st
+    JOIN sessions s
+      ON s.website_id = st.website_id AND s.session_id = st.session_key
+    WHERE st.kind = 'e'
+    RETURNING id, website_id, event_name, event_data, timestamp, sample_rate
+),
+"""
+    + PROMOTED_PROPERTIES_CTE
+)
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value):
+    """
+    Encode a value for COPY's text format
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _event_data(data):
+    """
+    Encode ``event_data`` as JSON text; scalars such as "" are JSON too
+    """
+    if data.get("event_data") is None:
+        return None
+    return json.dumps(data["event_data"])
+
+
+class CopyStream:
+    """
+    Minimal file-like object that encodes COPY rows on demand
+    """
+
+    def __init__(self, rows: Iterator[tuple]):
+        self._rows = rows
+        self._buffer = b""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = "\t".join(_copy_value(value) for value in row) + "\n"
+            self._buffer += line.encode()
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+class CopyLoader:
+    """
+    Stream already-validated hits (see ``build_hit``) into Postgres with COPY
+    """
+
+    def __init__(self):
+        self.skipped = 0
+        self.interned = {}
+
+    def _intern(self, column, model, value):
+        """
+        Return ``(id, text to stage)``; known values are not staged again
+        """
+        key = dimension_id(value)
+        if key is None:
+            return None, None
+        table = model._meta.db_table
+        if dimension_cache.get(table, key) is not None:
+            return key, None
+        self.interned.setdefault(table, {})[key] = value
+        return key, value
+
+    def _rows(self, hits: Iterable[Dict[str, Any]]) -> Iterator[tuple]:
+        for hit in hits:
+            if not hit.get("domain") or hit.get("type") not in ("pageview", "event"):
+                self.skipped += 1
+                continue
+
+            data = hit.get("data", {})
+            session = hit.get("session", {})
+            is_event = hit["type"] == "event"
+            values = {
+                "page_url": data.get("page_url"),
+                "page_title": data.get("page_title"),
+                "referrer": data.get("referrer"),
+                "user_agent": data.get("user_agent") or session.get("user_agent"),
+            }
+            ids = {}
+            if not is_event:
+                for column, model in DIMENSIONS:
+                    ids[column], staged = self._intern(column, model, values[column])
+                    if column != "user_agent":
+                        values[column] = staged
+            yield (
+                "e" if is_event else "p",
+                hit["domain"],
+                hit["session_id"],
+                hit.get("timestamp") or timezone.now().isoformat(),
+                values["page_url"],
+                values["page_title"],
+                values["referrer"],
+                data.get("load_time"),
+                values["user_agent"],
+                data.get("ip_address") or session.get("ip_address") or None,
+                data.get("event_name") if is_event else None,
+                _event_data(data) if is_event else None,
+                session.get("country"),
+                session.get("browser"),
+                session.get("device_type"),
+                ids.get("page_url"),
+                ids.get("page_title"),
+                ids.get("referrer"),
+                ids.get("user_agent"),
+            )
+
+    def load(self, hits: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Load hits and return counts plus the achieved rows/sec
+        """
+        self.skipped = 0
+        self.interned = {}
+        started = time.monotonic()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_SQL)
+            cursor.execute(TRUNCATE_STAGING_SQL)
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN",
+                CopyStream(self._rows(hits)),
+            )
+            cursor.execute(RESOLVE_WEBSITES_SQL)
+            cursor.execute(DROP_UNRESOLVED_SQL)
+            self.skipped += cursor.rowcount
+            cursor.execute(MERGE_SESSIONS_SQL)
+            cursor.execute(INTERN_DIMENSIONS_SQL)
+            cursor.execute(MERGE_PAGEVIEWS_SQL)
+            pageviews = cursor.rowcount
+            cursor.execute(MERGE_EVENTS_SQL)
+            events = cursor.fetchone()[0]
+            cursor.execute(SESSION_ACTIVITY_SQL)
+            session_activity.record(Activity(*row) for row in cursor.fetchall())
+            remember_on_commit(self.interned)
+
+        elapsed = time.monotonic() - started
+        rows = pageviews + events
+        stats = {
+            "pageviews": pageviews,
+            "events": events,
+            "skipped": self.skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": int(rows / elapsed) if elapsed > 0 else rows,
+        }
+        logger.info(
+            f"COPY loaded {rows} hits ({pageviews} pageviews, {events} events, "
+            f"{self.skipped} skipped) at {stats['rows_per_sec']} rows/sec"
+        )
+        return stats
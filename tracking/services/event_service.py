@@ -0,0 +1,72 @@
+"""
+Service layer for event writes on the ingest path
+"""
+import json
+
+from django.db import connection
+
+from tracking.event_schemas import PROMOTED_PROPERTIES_CTE
+
+EVENT_COLUMNS = (
+    ("website_id", "bigint"),
+    ("session_id", "bigint"),
+    ("event_name", "varchar"),
+    ("event_data", "jsonb"),
+    ("page_url", "text"),
+    ("timestamp", "timestamptz"),
+    ("sample_rate", "double precision"),
+)
+
+INSERT_EVENTS_SQL = (
+    """
+WITH input ({columns}) AS (VALUES {values}),
+inserted AS (
+    INSERT INTO events ({columns})
+    SELECT {columns} FROM input
+    RETURNING id, website_id, event_name, event_data, timestamp, sample_rate
+),
+"""
+    + PROMOTED_PROPERTIES_CTE
+)
+
+
+class EventService:
+    """
+    Service class for event-related operations
+    """
+
+    @staticmethod
+    def insert_events(events, chunk_size=1000):
+        """
+        Insert unsaved ``Event`` instances and their promoted properties,
+        one statement per chunk. Returns the number of events inserted.
+        """
+        columns = ", ".join(name for name, _ in EVENT_COLUMNS)
+        row_sql = "(" + ", ".join(f"%s::{cast}" for _, cast in EVENT_COLUMNS) + ")"
+        inserted = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(events), chunk_size):
+                chunk = events[start : start + chunk_size]
+                params = []
+                for event in chunk:
+                    params.extend(
+                        [
+                            event.website_id,
+                            event.session_id,
+                            event.event_name,
+                            None
+                            if event.event_data is None
+                            else json.dumps(event.event_data),
+                            event.page_url,
+                            event.timestamp,
+                            event.sample_rate,
+                        ]
+                    )
+                cursor.execute(
+                    INSERT_EVENTS_SQL.format(
+                        columns=columns, values=", ".join([row_sql] * len(chunk))
+                    ),
+                    params,
+                )
+                inserted += cursor.fetchone()[0]
+        return inserted
@@ -0,0 +1,592 @@
+"""
+Buffered ingestion for tracking hits.
+
+In ``buffered`` mode the tracking views only validate a hit and append it to
+a durable stream; the ``drain_ingestion_buffer`` Celery task reads the stream
+in large batches and hands them to ``TrackingService.bulk_record`` (or to the
+COPY loader when ``TRACKING_BULK_LOADER = "copy"``). A batch the database
+rejects is retried hit by hit, and hits that still fail are moved to a
+dead-letter stream (``<stream>:dead``) so they cannot block the buffer.
+"""
+import json
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DataError, IntegrityError
+
+from tracking.event_schemas import asplit_invalid_events, split_invalid_events
+from tracking.registry import website_registry
+from tracking.services import bot_filter
+from tracking.services.copy_loader import CopyLoader
+from tracking.services.tracking_service import (
+    TrackingService,
+    build_batch_hit,
+    build_hit,
+)
+from tracking.utils.async_redis import get_async_client
+from tracking.utils.idempotency import (
+    aclaim_event_ids,
+    arelease_event_ids,
+    claim_event_ids,
+    release_event_ids,
+)
+from tracking.utils.sampling import keep_session
+
+logger = logging.getLogger(__name__)
+
+INGESTION_MODE_SYNC = "sync"
+INGESTION_MODE_BUFFERED = "buffered"
+
+
+class LocalBuffer:
+    """
+    In-process stand-in for the Redis stream (development and tests only).
+    Entries are lost when the process exits.
+    """
+
+    def __init__(self):
+        self._entries = deque()
+        self._pending = {}
+        self.dead = []
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def push(self, hits: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for hit in hits:
+                self._counter += 1
+                self._entries.append((str(self._counter), json.dumps(hit)))
+
+    async def apush(self, hits: List[Dict[str, Any]]) -> None:
+        self.push(hits)
+
+    def read(self, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            batch = []
+            while self._entries and len(batch) < count:
+                entry_id, payload = self._entries.popleft()
+                self._pending[entry_id] = payload
+                batch.append((entry_id, json.loads(payload)))
+            return batch
+
+    def ack(self, entry_ids: List[str]) -> None:
+        with self._lock:
+            for entry_id in entry_ids:
+                self._pending.pop(entry_id, None)
+
+    def dead_letter(self, hits: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.dead.extend(hits)
+
+    def requeue_pending(self) -> None:
+        with self._lock:
+            for entry_id, payload in sorted(
+                self._pending.items(), key=lambda item: int(item[0])
+            ):
+                self._entries.appendleft((entry_id, payload))
+            self._pending.clear()
+
+    def length(self) -> int:
+        return len(self._entries)
+
+
+class RedisStreamBuffer:
+    """
+    Durable buffer backed by a Redis Stream and a consumer group.
+
+    Entries stay in the group's pending list until they are acknowledged,
+    so a worker that dies mid-batch does not lose hits: the next drain
+    claims entries that have been idle longer than ``claim_idle_ms``.
+    """
+
+    group = "tracking-ingest"
+
+    def __init__(self, url, stream, maxlen, claim_idle_ms=60000):
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+        self.stream = stream
+        self.maxlen = maxlen
+        self.claim_idle_ms = claim_idle_ms
+        self.consumer = f"consumer-{id(self)}"
+        self._group_ready = False
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    def push(self, hits: List[Dict[str, Any]]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for hit in hits:
+            pipe.xadd(
+                self.stream,
+                {"hit": json.dumps(hit)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        pipe.execute()
+
+    async def apush(self, hits: List[Dict[str, Any]]) -> None:
+        pipe = get_async_client(self.url).pipeline(transaction=False)
+        for hit in hits:
+            pipe.xadd(
+                self.stream,
+                {"hit": json.dumps(hit)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        await pipe.execute()
+
+    def read(self, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+        self._ensure_group()
+
+        # Reclaim entries abandoned by crashed consumers first
+        _, entries, *_ = self.client.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            count=count,
+        )
+        if len(entries) < count:
+            response = self.client.xreadgroup(
+                self.group,
+                self.consumer,
+                {self.stream: ">"},
+                count=count - len(entries),
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+
+        return [
+            (entry_id.decode(), json.loads(fields[b"hit"]))
+            for entry_id, fields in entries
+            if fields
+        ]
+
+    def ack(self, entry_ids: List[str]) -> None:
+        if not entry_ids:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, *entry_ids)
+        pipe.xdel(self.stream, *entry_ids)
+        pipe.execute()
+
+    def dead_letter(self, hits: List[Dict[str, Any]]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for hit in hits:
+            pipe.xadd(
+                f"{self.stream}:dead",
+                {"hit": json.dumps(hit)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        pipe.execute()
+
+    def requeue_pending(self) -> None:
+        # Unacknowledged entries are reclaimed by the next read
+        pass
+
+    def length(self) -> int:
+        return self.client.xlen(self.stream)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_ingestion_buffer():
+    """
+    Return the process-wide ingestion buffer configured in settings
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                if settings.TRACKING_BUFFER_BACKEND == "local":
+                    _buffer = LocalBuffer()
+                else:
+                    _buffer = RedisStreamBuffer(
+                        settings.TRACKING_BUFFER_REDIS_URL,
+                        settings.TRACKING_BUFFER_STREAM,
+                        settings.TRACKING_BUFFER_MAXLEN,
+                    )
+    return _buffer
+
+
+def sampled_out(entries, domain, session_id):
+    """
+    True if the website samples and this session falls outside its rate.
+    Unknown domains are left for the write path to reject.
+    """
+    entry = entries.get(domain)
+    return entry is not None and not keep_session(session_id, entry.sample_rate)
+
+
+def split_sampled(entries, items):
+    """
+    Return the batch items to record and the number sampled out
+    """
+    kept = [
+        item
+        for item in items
+        if not sampled_out(entries, item.get("domain"), item.get("session_id"))
+    ]
+    return kept, len(items) - len(kept)
+
+
+def bot_hit(domain, session_id, data, session_data=None):
+    """
+    Return the ``(domain, session_id, user_agent, ip_address)`` bot check
+    input of a hit
+    """
+    session_data = session_data or {}
+    return (
+        domain,
+        session_id,
+        data.get("user_agent") or session_data.get("user_agent"),
+        data.get("ip_address") or session_data.get("ip_address"),
+    )
+
+
+def batch_bot_checks(items):
+    """
+    Return ``(index, bot check input)`` for the batch items to judge. An
+    item may carry ``bot_check``: the ``(user_agent, ip_address)`` it
+    supplied itself, or None to skip it; otherwise its own fields are used.
+    """
+    checks = []
+    for index, item in enumerate(items):
+        signals = item.pop(
+            "bot_check", (item.get("user_agent"), item.get("ip_address"))
+        )
+        if signals is not None:
+            user_agent, ip_address = signals
+            hit = (item.get("domain"), item.get("session_id"), user_agent, ip_address)
+            checks.append((index, hit))
+    return checks
+
+
+def _split_verdicts(items, checks, verdicts):
+    reasons = [None] * len(items)
+    for (index, _), verdict in zip(checks, verdicts):
+        reasons[index] = verdict
+    kept = [item for item, reason in zip(items, reasons) if reason is None]
+    bots = [
+        (item.get("domain"), reason)
+        for item, reason in zip(items, reasons)
+        if reason is not None
+    ]
+    return kept, bots
+
+
+def split_bots(entries, items, rates=True):
+    """
+    Return the batch items to record and the number dropped as bots
+    """
+    checks = batch_bot_checks(items)
+    if not checks or not bot_filter.is_enabled():
+        return items, 0
+    verdicts = bot_filter.detect_bots([hit for _, hit in checks], rates)
+    kept, bots = _split_verdicts(items, checks, verdicts)
+    bot_filter.count_bots(entries, bots)
+    return kept, len(bots)
+
+
+async def asplit_bots(entries, items):
+    """
+    Async variant of ``split_bots``
+    """
+    checks = batch_bot_checks(items)
+    if not checks or not bot_filter.is_enabled():
+        return items, 0
+    verdicts = await bot_filter.adetect_bots([hit for _, hit in checks])
+    kept, bots = _split_verdicts(items, checks, verdicts)
+    await bot_filter.acount_bots(entries, bots)
+    return kept, len(bots)
+
+
+class IngestionService:
+    """
+    Service class that routes tracking hits to the configured ingestion path
+    """
+
+    @staticmethod
+    def is_buffered():
+        return settings.TRACKING_INGESTION_MODE == INGESTION_MODE_BUFFERED
+
+    @staticmethod
+    def submit(hit_type, domain, session_id, data, session_data=None):
+        """
+        Record a hit synchronously or append it to the ingestion buffer.
+        Buffered hits return ``{"status": "queued"}``; hits whose
+        ``event_id`` was already seen return ``{"status": "duplicate"}`` and
+        hits of sessions outside the website's sample return
+        ``{"status": "sampled"}`` and bot hits ``{"status": "filtered"}``.
+        Events that fail their website's event schema return an error.
+        """
+        entries = website_registry.get_many([domain])
+        if sampled_out(entries, domain, session_id):
+            return {"status": "sampled"}
+        if bot_filter.is_enabled():
+            [reason] = bot_filter.detect_bots(
+                [bot_hit(domain, session_id, data, session_data)]
+            )
+            if reason is not None:
+                bot_filter.count_bots(entries, [(domain, reason)])
+                return {"status": "filtered"}
+        if hit_type == "event":
+            _, errors = split_invalid_events(
+                entries, [dict(data, type=hit_type, domain=domain)]
+            )
+            if errors:
+                return {"error": errors[0]["error"]}
+
+        key = (domain, data.pop("event_id", None))
+        if not claim_event_ids([key])[0]:
+            return {"status": "duplicate"}
+
+        if not IngestionService.is_buffered():
+            if hit_type == "event":
+                result = TrackingService.record_event(domain, session_id, data)
+            else:
+                result = TrackingService.record_pageview(domain, session_id, data)
+            if "error" in result:
+                release_event_ids([key])
+            return result
+
+        try:
+            get_ingestion_buffer().push(
+                [build_hit(hit_type, domain, session_id, data, session_data)]
+            )
+        except redis.RedisError as e:
+            logger.error(f"Failed to buffer {hit_type} for {domain}: {e}")
+            release_event_ids([key])
+            return {"error": "Ingestion buffer unavailable"}
+        return {"status": "queued"}
+
+    @staticmethod
+    def submit_batch(items, imported=False):
+        """
+        Record validated batch items in bulk, or append them all to the
+        ingestion buffer in a single pipelined round trip. Items whose
+        ``event_id`` was already seen are skipped and counted as duplicates;
+        items of sessions outside the website's sample are counted as sampled
+        and bot hits as filtered; a batch whose items were all filtered
+        returns ``{"status": "filtered"}``. Events that fail their event
+        schema are reported in ``errors``. ``imported`` batches replay past
+        traffic, so they skip the per-session hit rate check.
+        """
+        entries = website_registry.get_many({item.get("domain") for item in items})
+        items, sampled_count = split_sampled(entries, items)
+        items, filtered_count = split_bots(entries, items, rates=not imported)
+        items, schema_errors = split_invalid_events(entries, items)
+
+        keys = [(item.get("domain"), item.pop("event_id", None)) for item in items]
+        is_new = claim_event_ids(keys)
+        new_items = [item for item, new in zip(items, is_new) if new]
+        new_keys = [key for key, new in zip(keys, is_new) if new]
+        duplicate_count = len(items) - len(new_items)
+
+        if not IngestionService.is_buffered():
+            result = TrackingService.batch_track_events(new_items)
+            failed = {id(error["item"]) for error in result.get("errors", [])}
+            release_event_ids(
+                [key for key, item in zip(new_keys, new_items) if id(item) in failed]
+            )
+            result["duplicate_count"] = duplicate_count
+            result["sampled_count"] = sampled_count
+            result["filtered_count"] = filtered_count
+            if schema_errors:
+                result["status"] = "partial"
+                result["errors"] = schema_errors + result.get("errors", [])
+            elif filtered_count and not items:
+                result["status"] = "filtered"
+            return result
+
+        try:
+            get_ingestion_buffer().push([build_batch_hit(item) for item in new_items])
+        except redis.RedisError as e:
+            logger.error(f"Failed to buffer batch of {len(items)} hits: {e}")
+            release_event_ids(new_keys)
+            return {"error": "Ingestion buffer unavailable"}
+        return {
+            "status": "filtered" if filtered_count and not items else "queued",
+            "queued_count": len(new_items),
+            "duplicate_count": duplicate_count,
+            "sampled_count": sampled_count,
+            "filtered_count": filtered_count,
+            "errors": schema_errors,
+        }
+
+    @staticmethod
+    async def asubmit(hit_type, domain, session_id, data, session_data=None):
+        """
+        Async variant of ``submit`` for the ASGI endpoints
+        """
+        entries = await website_registry.aget_many([domain])
+        if sampled_out(entries, domain, session_id):
+            return {"status": "sampled"}
+        if bot_filter.is_enabled():
+            [reason] = await bot_filter.adetect_bots(
+                [bot_hit(domain, session_id, data, session_data)]
+            )
+            if reason is not None:
+                await bot_filter.acount_bots(entries, [(domain, reason)])
+                return {"status": "filtered"}
+        if hit_type == "event":
+            _, errors = await asplit_invalid_events(
+                entries, [dict(data, type=hit_type, domain=domain)]
+            )
+            if errors:
+                return {"error": errors[0]["error"]}
+
+        key = (domain, data.pop("event_id", None))
+        if not (await aclaim_event_ids([key]))[0]:
+            return {"status": "duplicate"}
+
+        if not IngestionService.is_buffered():
+            if hit_type == "event":
+                result = await TrackingService.arecord_event(domain, session_id, data)
+            else:
+                result = await TrackingService.arecord_pageview(
+                    domain, session_id, data
+                )
+            if "error" in result:
+                await arelease_event_ids([key])
+            return result
+
+        try:
+            await get_ingestion_buffer().apush(
+                [build_hit(hit_type, domain, session_id, data, session_data)]
+            )
+        except redis.RedisError as e:
+            logger.error(f"Failed to buffer {hit_type} for {domain}: {e}")
+            await arelease_event_ids([key])
+            return {"error": "Ingestion buffer unavailable"}
+        return {"status": "queued"}
+
+    @staticmethod
+    async def asubmit_batch(items):
+        """
+        Async variant of ``submit_batch``. Buffered batches are pushed from
+        the event loop; synchronous bulk writes run in the ORM thread.
+        """
+        if not IngestionService.is_buffered():
+            return await sync_to_async(IngestionService.submit_batch)(items)
+
+        entries = await website_registry.aget_many(
+            {item.get("domain") for item in items}
+        )
+        items, sampled_count = split_sampled(entries, items)
+        items, filtered_count = await asplit_bots(entries, items)
+        items, schema_errors = await asplit_invalid_events(entries, items)
+
+        keys = [(item.get("domain"), item.pop("event_id", None)) for item in items]
+        is_new = await aclaim_event_ids(keys)
+        new_items = [item for item, new in zip(items, is_new) if new]
+        new_keys = [key for key, new in zip(keys, is_new) if new]
+
+        try:
+            await get_ingestion_buffer().apush(
+                [build_batch_hit(item) for item in new_items]
+            )
+        except redis.RedisError as e:
+            logger.error(f"Failed to buffer batch of {len(items)} hits: {e}")
+            await arelease_event_ids(new_keys)
+            return {"error": "Ingestion buffer unavailable"}
+        return {
+            "status": "filtered" if filtered_count and not items else "queued",
+            "queued_count": len(new_items),
+            "duplicate_count": len(items) - len(new_items),
+            "sampled_count": sampled_count,
+            "filtered_count": filtered_count,
+            "errors": schema_errors,
+        }
+
+    @staticmethod
+    def load(hits):
+        """
+        Write drained hits with the configured bulk loader
+        """
+        if settings.TRACKING_BULK_LOADER == "copy":
+            stats = CopyLoader().load(hits)
+            return {
+                "successful_count": stats["pageviews"] + stats["events"],
+                "errors": [{"error": "Website not found"}] * stats["skipped"],
+            }
+        return TrackingService.bulk_record(hits)
+
+    @staticmethod
+    def load_one_by_one(buffer, hits):
+        """
+        Retry a batch the database rejected hit by hit; hits that still
+        fail are moved to the dead-letter stream
+        """
+        result = {"successful_count": 0, "errors": []}
+        dead = []
+        for hit in hits:
+            try:
+                hit_result = IngestionService.load([hit])
+            except (DataError, IntegrityError) as e:
+                dead.append(hit)
+                reason = str(e).partition("\n")[0]
+                result["errors"].append(
+                    {"error": f"Rejected by the database: {reason}"}
+                )
+                continue
+            result["successful_count"] += hit_result["successful_count"]
+            result["errors"].extend(hit_result.get("errors", []))
+        if dead:
+            buffer.dead_letter(dead)
+        return result
+
+    @staticmethod
+    def drain(batch_size=None, max_batches=None):
+        """
+        Drain buffered hits into the database in bulk.
+        Entries are acknowledged only after their batch is committed or,
+        for hits the database rejects, dead-lettered.
+        """
+        batch_size = batch_size or settings.TRACKING_BUFFER_BATCH_SIZE
+        max_batches = max_batches or settings.TRACKING_BUFFER_MAX_BATCHES
+        buffer = get_ingestion_buffer()
+
+        stored = 0
+        failed = 0
+        for _ in range(max_batches):
+            entries = buffer.read(batch_size)
+            if not entries:
+                break
+
+            hits = [hit for _, hit in entries]
+            try:
+                try:
+                    result = IngestionService.load(hits)
+                except (DataError, IntegrityError) as e:
+                    logger.warning(f"Retrying buffered batch hit by hit: {e}")
+                    result = IngestionService.load_one_by_one(buffer, hits)
+            except Exception:
+                buffer.requeue_pending()
+                raise
+
+            buffer.ack([entry_id for entry_id, _ in entries])
+            stored += result["successful_count"]
+            failed += len(result.get("errors", []))
+            for error in result.get("errors", [])[:10]:
+                logger.warning(f"Dropped buffered hit: {error['error']}")
+
+            if len(entries) < batch_size:
+                break
+
+        return {"stored": stored, "failed": failed}
@@ -0,0 +1,170 @@
+"""
+Write-behind session activity.
+
+Hits do not touch their ``sessions`` row. Once the hit is committed its
+session's last-seen time and page view count are recorded in Redis:
+
+* ``tracking:activity:last_seen`` - sorted set of session pk -> last hit
+  (epoch seconds, only ever moved forward with ``ZADD GT``);
+* ``tracking:activity:pageviews`` - hash of session pk -> page views not
+  yet written to the database;
+* ``tracking:activity:live:<website_id>`` - sorted set of the website's
+  sessions by last hit, read by the realtime stats.
+
+``flush`` moves the pending keys aside atomically and writes them back in
+batched ``UPDATE ... FROM (VALUES ...)`` statements, so a busy session costs
+one row update per flush instead of one per hit. Flushed chunks are removed
+only after their update commits, so a crashed flush is retried (page view
+counts are at-least-once). When Redis is unavailable activity is written
+through to the database.
+"""
+import logging
+from collections import namedtuple
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from tracking.services.session_service import SessionService
+
+logger = logging.getLogger(__name__)
+
+LAST_SEEN_KEY = "tracking:activity:last_seen"
+PAGEVIEWS_KEY = "tracking:activity:pageviews"
+LIVE_KEY = "tracking:activity:live:{website_id}"
+FLUSHING_SUFFIX = ":flushing"
+
+# Claim pending activity for a flush, unless a previous flush left work behind
+CLAIM_SCRIPT = """
+if redis.call("EXISTS", KEYS[3]) == 0 and redis.call("EXISTS", KEYS[4]) == 0 then
+    if redis.call("EXISTS", KEYS[1]) == 1 then
+        redis.call("RENAME", KEYS[1], KEYS[3])
+    end
+    if redis.call("EXISTS", KEYS[2]) == 1 then
+        redis.call("RENAME", KEYS[2], KEYS[4])
+    end
+end
+return redis.call("ZCARD", KEYS[3])
+"""
+
+Activity = namedtuple(
+    "Activity", ["website_id", "session_pk", "last_seen_at", "pageviews"]
+)
+
+
+def merge_activity(activity):
+    """
+    Collapse activity to one entry per session: latest hit, summed page views
+    """
+    merged = {}
+    for item in activity:
+        current = merged.get(item.session_pk)
+        if current is None:
+            merged[item.session_pk] = item
+        else:
+            merged[item.session_pk] = current._replace(
+                last_seen_at=max(current.last_seen_at, item.last_seen_at),
+                pageviews=current.pageviews + item.pageviews,
+            )
+    return list(merged.values())
+
+
+class SessionActivity:
+    def __init__(self):
+        self._client = None
+
+    def _redis(self):
+        if self._client is None:
+            self._client = redis.Redis.from_url(settings.TRACKING_ACTIVITY_REDIS_URL)
+        return self._client
+
+    def record(self, activity):
+        """
+        Record ``Activity`` entries once the current transaction commits
+        """
+        merged = merge_activity(activity)
+        if merged:
+            transaction.on_commit(lambda: self._push(merged))
+
+    def _push(self, merged):
+        live_ttl = settings.TRACKING_SESSION_IDLE_MINUTES * 60 * 2
+        try:
+            pipe = self._redis().pipeline(transaction=False)
+            for item in merged:
+                score = {item.session_pk: item.last_seen_at.timestamp()}
+                live_key = LIVE_KEY.format(website_id=item.website_id)
+                pipe.zadd(LAST_SEEN_KEY, score, gt=True)
+                pipe.zadd(live_key, score, gt=True)
+                pipe.expire(live_key, live_ttl)
+                if item.pageviews:
+                    pipe.hincrby(PAGEVIEWS_KEY, item.session_pk, item.pageviews)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Writing session activity through, Redis failed: {e}")
+            SessionService.record_activity(
+                [
+                    (item.session_pk, item.last_seen_at, item.pageviews)
+                    for item in merged
+                ]
+            )
+
+    def flush(self, batch_size=None):
+        """
+        Write pending activity to ``sessions``; returns sessions updated
+        """
+        batch_size = batch_size or settings.TRACKING_ACTIVITY_FLUSH_BATCH_SIZE
+        client = self._redis()
+        last_seen_key = LAST_SEEN_KEY + FLUSHING_SUFFIX
+        pageviews_key = PAGEVIEWS_KEY + FLUSHING_SUFFIX
+        client.eval(
+            CLAIM_SCRIPT, 4, LAST_SEEN_KEY, PAGEVIEWS_KEY, last_seen_key, pageviews_key
+        )
+
+        flushed = 0
+        while True:
+            entries = client.zrange(last_seen_key, 0, batch_size - 1, withscores=True)
+            if not entries:
+                break
+            members = [member for member, _ in entries]
+            counts = client.hmget(pageviews_key, members)
+            rows = [
+                (
+                    int(member),
+                    datetime.fromtimestamp(score, tz=dt_timezone.utc),
+                    int(count or 0),
+                )
+                for (member, score), count in zip(entries, counts)
+            ]
+            with transaction.atomic():
+                flushed += SessionService.record_activity(rows)
+
+            pipe = client.pipeline(transaction=False)
+            pipe.zrem(last_seen_key, *members)
+            pipe.hdel(pageviews_key, *members)
+            pipe.execute()
+        client.delete(pageviews_key)
+        return flushed
+
+    def active_counts(self, website_ids, minutes=30):
+        """
+        Return ``{website_id: sessions seen in the last minutes}``, dropping
+        older entries from the live sets; None if Redis is unavailable
+        """
+        since = (timezone.now() - timedelta(minutes=minutes)).timestamp()
+        try:
+            pipe = self._redis().pipeline(transaction=False)
+            for website_id in website_ids:
+                live_key = LIVE_KEY.format(website_id=website_id)
+                pipe.zremrangebyscore(live_key, "-inf", f"({since}")
+                pipe.zcard(live_key)
+            results = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not read live sessions: {e}")
+            return None
+        return dict(zip(website_ids, results[1::2]))
+
+
+session_activity = SessionActivity()
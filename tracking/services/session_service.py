@@ -0,0 +1,174 @@
+"""
+Service layer for session writes on the ingest path
+"""
+from datetime import timedelta
+from typing import Any, Dict, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from tracking.models import Session
+
+SessionKey = Tuple[int, str]
+
+# Columns written by the upsert, with the casts needed inside VALUES
+UPSERT_COLUMNS = (
+    ("website_id", "bigint"),
+    ("session_id", "varchar"),
+    ("started_at", "timestamptz"),
+    ("last_seen_at", "timestamptz"),
+    ("sample_rate", "double precision"),
+    ("user_agent", "text"),
+    ("ip_address", "inet"),
+    ("country", "varchar"),
+    ("browser", "varchar"),
+    ("device_type", "varchar"),
+)
+
+UPSERT_SQL = """
+WITH input ({columns}) AS (VALUES {values}),
+inserted AS (
+    INSERT INTO sessions ({columns})
+    SELECT {columns} FROM input
+    ON CONFLICT (website_id, session_id) DO NOTHING
+    RETURNING website_id, session_id, id
+)
+SELECT website_id, session_id, id FROM inserted
+UNION ALL
+SELECT s.website_id, s.session_id, s.id
+FROM sessions s
+JOIN input i ON s.website_id = i.website_id AND s.session_id = i.session_id
+"""
+
+ACTIVITY_ROW_SQL = "(%s::bigint, %s::timestamptz, %s::integer)"
+
+# Applies aggregated activity flushed from Redis; GREATEST keeps last_seen_at
+# from moving backwards when flushes overlap. Activity after ended_at reopens
+# the session, so the sweeper ends it again at its new last activity
+RECORD_ACTIVITY_SQL = """
+UPDATE sessions s
+SET last_seen_at = GREATEST(s.last_seen_at, v.last_seen_at),
+    pageview_count = s.pageview_count + v.pageviews,
+    ended_at = CASE WHEN v.last_seen_at > s.ended_at THEN NULL ELSE s.ended_at END
+FROM (VALUES {values}) AS v (id, last_seen_at, pageviews)
+WHERE s.id = v.id
+"""
+
+# Served by the partial index on last_seen_at of open sessions; SKIP LOCKED
+# lets the sweep run next to the ingest path without waiting on it
+CLOSE_IDLE_SQL = """
+WITH idle AS (
+    SELECT id FROM sessions
+    WHERE ended_at IS NULL AND last_seen_at < %s
+    ORDER BY last_seen_at
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+)
+UPDATE sessions s SET ended_at = s.last_seen_at
+FROM idle
+WHERE s.id = idle.id
+"""
+
+
+class SessionService:
+    """
+    Service class for session-related operations
+    """
+
+    @staticmethod
+    def upsert_sessions(sessions: Dict[SessionKey, Dict[str, Any]], chunk_size=1000):
+        """
+        Create missing sessions and return ``{(website_id, session_id): pk}``.
+
+        Uses ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` combined with a
+        lookup of the rows that already existed, so each chunk of sessions
+        costs one round trip. ``sessions`` maps keys to optional attributes
+        (user_agent, ip_address, ...) used only when a session is created;
+        activity on existing sessions is written behind by ``SessionActivity``.
+        """
+        pks = {}
+        keys = list(sessions)
+        columns = ", ".join(name for name, _ in UPSERT_COLUMNS)
+        row_sql = "(" + ", ".join(f"%s::{cast}" for _, cast in UPSERT_COLUMNS) + ")"
+        now = timezone.now()
+
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start : start + chunk_size]
+            params = []
+            for website_id, session_id in chunk:
+                attrs = sessions[(website_id, session_id)] or {}
+                row = {"website_id": website_id, "session_id": session_id}
+                row["started_at"] = attrs.get("started_at", now)
+                row["last_seen_at"] = attrs.get("last_seen_at", row["started_at"])
+                row["sample_rate"] = attrs.get("sample_rate", 1.0)
+                for name, _ in UPSERT_COLUMNS[5:]:
+                    row[name] = attrs.get(name) or None
+                params.extend(row[name] for name, _ in UPSERT_COLUMNS)
+
+            sql = UPSERT_SQL.format(
+                columns=columns, values=", ".join([row_sql] * len(chunk))
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                for website_id, session_id, pk in cursor.fetchall():
+                    pks[(website_id, session_id)] = pk
+
+        # A row inserted by a concurrent transaction after this statement's
+        # snapshot is neither returned nor visible; look those up directly.
+        missing = [key for key in keys if key not in pks]
+        if missing:
+            for website_id, session_id, pk in Session.objects.filter(
+                website_id__in={key[0] for key in missing},
+                session_id__in={key[1] for key in missing},
+            ).values_list("website_id", "session_id", "id"):
+                pks[(website_id, session_id)] = pk
+        return pks
+
+    @staticmethod
+    def upsert_session(website_id, session_id, **attrs):
+        """
+        Return the pk of the session, creating it if needed
+        """
+        key = (website_id, session_id)
+        return SessionService.upsert_sessions({key: attrs})[key]
+
+    @staticmethod
+    def record_activity(rows, chunk_size=1000):
+        """
+        Apply ``(session_pk, last_seen_at, pageviews)`` rows with one
+        ``UPDATE ... FROM (VALUES ...)`` per chunk; returns rows updated
+        """
+        updated = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start : start + chunk_size]
+                values = ", ".join([ACTIVITY_ROW_SQL] * len(chunk))
+                cursor.execute(
+                    RECORD_ACTIVITY_SQL.format(values=values),
+                    [param for row in chunk for param in row],
+                )
+                updated += cursor.rowcount
+        return updated
+
+    @staticmethod
+    def close_idle_sessions(idle_minutes=None, batch_size=None, max_batches=None):
+        """
+        End open sessions without a hit in the last ``idle_minutes``,
+        setting ``ended_at`` to their last activity. Works in batches of
+        ``batch_size`` rows, each its own short statement, and returns the
+        number of sessions closed.
+        """
+        idle_minutes = idle_minutes or settings.TRACKING_SESSION_IDLE_MINUTES
+        batch_size = batch_size or settings.TRACKING_SESSION_SWEEP_BATCH_SIZE
+        max_batches = max_batches or settings.TRACKING_SESSION_SWEEP_MAX_BATCHES
+        cutoff = timezone.now() - timedelta(minutes=idle_minutes)
+
+        closed = 0
+        with connection.cursor() as cursor:
+            for _ in range(max_batches):
+                cursor.execute(CLOSE_IDLE_SQL, [cutoff, batch_size])
+                closed += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+        return closed
@@ -1,8 +1,56 @@
+from asgiref.sync import sync_to_async
 from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from tracking.models import Event, PageView, Session, Website
-from tracking.utils.cache_utils import get_or_set_cache
+from tracking.dimensions import intern_instances
+from tracking.models import Event, PageView, Session
+from tracking.registry import website_registry
+from tracking.services.event_service import EventService
+from tracking.services.session_activity import Activity, session_activity
+from tracking.services.session_service import SessionService
+from tracking.utils.sampling import keep_session
+
+PAGEVIEW_FIELDS = (
+    "page_url",
+    "page_title",
+    "referrer",
+    "load_time",
+    "user_agent",
+    "ip_address",
+)
+EVENT_FIELDS = ("event_name", "event_data", "page_url")
+SESSION_FIELDS = ("user_agent", "ip_address", "country", "browser", "device_type")
+
+
+def build_hit(hit_type, domain, session_id, data, session_data=None):
+    """
+    Build the JSON-serializable representation of a single tracking hit
+    """
+    return {
+        "type": hit_type,
+        "domain": domain,
+        "session_id": session_id,
+        "timestamp": timezone.now().isoformat(),
+        "data": data,
+        "session": session_data or {},
+    }
+
+
+def build_batch_hit(item):
+    """
+    Build a hit from a flat batch item, keeping only the fields that
+    belong to its type
+    """
+    hit_type = item.get("type", "pageview")
+    fields = EVENT_FIELDS if hit_type == "event" else PAGEVIEW_FIELDS
+    return build_hit(
+        hit_type,
+        item.get("domain"),
+        item.get("session_id"),
+        {field: item[field] for field in fields if field in item},
+        {field: item[field] for field in SESSION_FIELDS if item.get(field)},
+    )
 
 
 class TrackingService:
@@ -13,60 +61,125 @@ class TrackingService:
     @staticmethod
     def record_pageview(domain, session_id, data):
         """
-        Record a page view event with caching
+        Record a page view event
         """
-        cache_key = f"pageview:{domain}:{session_id}"
-
-        def fetch_data():
-            try:
-                website = Website.objects.get(domain=domain, is_active=True)
-                session, _ = Session.objects.get_or_create(
-                    website=website, session_id=session_id
-                )
-                PageView.objects.create(
-                    website=website, session=session, **data, timestamp=timezone.now()
-                )
-                return {"status": "ok"}
-            except Website.DoesNotExist:
-                return {"error": "Website not found"}
-            except Exception as e:
-                return {"error": str(e)}
-
-        return get_or_set_cache(cache_key, fetch_data, timeout=300)
+        website = website_registry.get_active(domain)
+        if website is None:
+            return {"error": "Website not found"}
+        try:
+            session_pk = SessionService.upsert_session(
+                website.website_id, session_id, sample_rate=website.sample_rate
+            )
+            hit = PageView.objects.create(
+                website_id=website.website_id,
+                session_id=session_pk,
+                sample_rate=website.sample_rate,
+                **data,
+                timestamp=timezone.now(),
+            )
+            session_activity.record(
+                [Activity(website.website_id, session_pk, hit.timestamp, 1)]
+            )
+            return {"status": "ok"}
+        except Exception as e:
+            return {"error": str(e)}
 
     @staticmethod
     def record_event(domain, session_id, data):
         """
-        Record a custom event with caching
+        Record a custom event
         """
-        cache_key = f"event:{domain}:{session_id}"
+        website = website_registry.get_active(domain)
+        if website is None:
+            return {"error": "Website not found"}
+        try:
+            session_pk = SessionService.upsert_session(
+                website.website_id, session_id, sample_rate=website.sample_rate
+            )
+            hit = Event(
+                website_id=website.website_id,
+                session_id=session_pk,
+                sample_rate=website.sample_rate,
+                **data,
+                timestamp=timezone.now(),
+            )
+            EventService.insert_events([hit])
+            session_activity.record(
+                [Activity(website.website_id, session_pk, hit.timestamp, 0)]
+            )
+            return {"status": "ok"}
+        except Exception as e:
+            return {"error": str(e)}
 
-        def fetch_data():
-            try:
-                website = Website.objects.get(domain=domain, is_active=True)
-                session, _ = Session.objects.get_or_create(
-                    website=website, session_id=session_id
-                )
-                Event.objects.create(
-                    website=website, session=session, **data, timestamp=timezone.now()
-                )
-                return {"status": "ok"}
-            except Website.DoesNotExist:
-                return {"error": "Website not found"}
-            except Exception as e:
-                return {"error": str(e)}
+    @staticmethod
+    async def arecord_pageview(domain, session_id, data):
+        """
+        Async variant of ``record_pageview``
+        """
+        website = await website_registry.aget_active(domain)
+        if website is None:
+            return {"error": "Website not found"}
+        try:
+            session_pk = await sync_to_async(SessionService.upsert_session)(
+                website.website_id, session_id, sample_rate=website.sample_rate
+            )
+            hit = await PageView.objects.acreate(
+                website_id=website.website_id,
+                session_id=session_pk,
+                sample_rate=website.sample_rate,
+                **data,
+                timestamp=timezone.now(),
+            )
+            await sync_to_async(session_activity.record)(
+                [Activity(website.website_id, session_pk, hit.timestamp, 1)]
+            )
+            return {"status": "ok"}
+        except Exception as e:
+            return {"error": str(e)}
 
-        return get_or_set_cache(cache_key, fetch_data, timeout=300)
+    @staticmethod
+    async def arecord_event(domain, session_id, data):
+        """
+        Async variant of ``record_event``
+        """
+        website = await website_registry.aget_active(domain)
+        if website is None:
+            return {"error": "Website not found"}
+        try:
+            session_pk = await sync_to_async(SessionService.upsert_session)(
+                website.website_id, session_id, sample_rate=website.sample_rate
+            )
+            hit = Event(
+                website_id=website.website_id,
+                session_id=session_pk,
+                sample_rate=website.sample_rate,
+                **data,
+                timestamp=timezone.now(),
+            )
+            await sync_to_async(EventService.insert_events)([hit])
+            await sync_to_async(session_activity.record)(
+                [Activity(website.website_id, session_pk, hit.timestamp, 0)]
+            )
+            return {"status": "ok"}
+        except Exception as e:
+            return {"error": str(e)}
 
     @staticmethod
     def start_session(domain, data):
         """
         Start a new session
         """
+        website = website_registry.get_active(domain)
+        if website is None:
+            return None, {"error": f"Website with this domain {domain} not found"}
+        if not keep_session(data.get("session_id"), website.sample_rate):
+            return None, {"status": "sampled", "session_id": data.get("session_id")}
         try:
-            website = Website.objects.get(domain=domain, is_active=True)
             session = Session.objects.create(
-                website=website, **data, started_at=timezone.now()
+                website_id=website.website_id,
+                **data,
+                sample_rate=website.sample_rate,
+                started_at=timezone.now(),
             )
             return session, {
                 "status": "ok",
@@ -74,8 +187,6 @@ class TrackingService:
                 "started_at": session.started_at,
                 "device_type": session.device_type
             }
-        except Website.DoesNotExist:
-            return None, {"error": f"Website with this domain {domain} not found"}
         except Exception as e:
             return None, {"error": str(e)}
 
@@ -84,58 +195,161 @@ class TrackingService:
         """
         End an existing session
         """
+        website = website_registry.get_active(domain)
+        if website is None:
+            return {"error": "Session or website not found"}
         try:
-            website = Website.objects.get(domain=domain, is_active=True)
             session = Session.objects.get(
-                website=website, session_id=session_id)
+                website_id=website.website_id, session_id=session_id
+            )
             session.ended_at = timezone.now()
             session.save()
             return {"status": "ok"}
-        except (Website.DoesNotExist, Session.DoesNotExist):
+        except Session.DoesNotExist:
             return {"error": "Session or website not found"}
         except Exception as e:
             return {"error": str(e)}
 
     @staticmethod
-    def batch_track_events(events_data):
+    async def astart_session(domain, data):
+        """
+        Async variant of ``start_session``
+        """
+        website = await website_registry.aget_active(domain)
+        if website is None:
+            return None, {"error": f"Website with this domain {domain} not found"}
+        if not keep_session(data.get("session_id"), website.sample_rate):
+            return None, {"status": "sampled", "session_id": data.get("session_id")}
+        try:
+            session = await Session.objects.acreate(
+                website_id=website.website_id,
+                **data,
+                sample_rate=website.sample_rate,
+                started_at=timezone.now(),
+            )
+            return session, {
+                "status": "ok",
+                "session_id": session.session_id,
+                "started_at": session.started_at,
+                "device_type": session.device_type,
+            }
+        except Exception as e:
+            return None, {"error": str(e)}
+
+    @staticmethod
+    async def aend_session(domain, session_id):
         """
-        Process multiple tracking events in batch
+        Async variant of ``end_session``; a single UPDATE, no fetch
+        """
+        website = await website_registry.aget_active(domain)
+        if website is None:
+            return {"error": "Session or website not found"}
+        try:
+            updated = await Session.objects.filter(
+                website_id=website.website_id, session_id=session_id
+            ).aupdate(ended_at=timezone.now())
+        except Exception as e:
+            return {"error": str(e)}
+        if not updated:
+            return {"error": "Session or website not found"}
+        return {"status": "ok"}
+
+    @staticmethod
+    def bulk_record(hits):
+        """
+        Persist many buffered hits with bulk inserts.
+
+        Each hit is a dict built by ``build_hit``. Hits that
+        reference unknown domains or an invalid type are reported in
+        ``errors`` (with their index) instead of failing the whole batch.
         """
         errors = []
-        successful_count = 0
+
+        websites = website_registry.get_active_many({hit.get("domain") for hit in hits})
+
+        valid_hits = []
+        for index, hit in enumerate(hits):
+            if hit.get("type") not in ("pageview", "event"):
+                errors.append({"index": index, "error": "Invalid event type"})
+            elif hit.get("domain") not in websites:
+                errors.append({"index": index, "error": "Website not found"})
+            else:
+                valid_hits.append(hit)
+
+        if not valid_hits:
+            return {"successful_count": 0, "errors": errors}
 
         with transaction.atomic():
-            for item in events_data:
-                try:
-                    domain = item.get("domain")
-                    session_id = item.get("session_id")
-                    event_type = item.get("type", "pageview")
-
-                    if event_type == "pageview":
-                        result = TrackingService.record_pageview(
-                            domain, session_id, item
-                        )
-                    elif event_type == "event":
-                        result = TrackingService.record_event(
-                            domain, session_id, item)
-                    else:
-                        errors.append(
-                            {"error": "Invalid event type", "item": item})
-                        continue
-
-                    if "error" in result:
-                        errors.append({"error": result["error"], "item": item})
-                    else:
-                        successful_count += 1
-
-                except Exception as e:
-                    errors.append({"error": str(e), "item": item})
+            # Create missing sessions, keeping attributes from the first hit;
+            # sessions span the batch's hits from first to last
+            now = timezone.now()
+            timestamps = [parse_datetime(hit["timestamp"]) or now for hit in valid_hits]
+            sessions = {}
+            for hit, timestamp in zip(valid_hits, timestamps):
+                website = websites[hit["domain"]]
+                key = (website.website_id, hit["session_id"])
+                if key not in sessions:
+                    sessions[key] = dict(
+                        hit.get("session") or {},
+                        sample_rate=website.sample_rate,
+                        started_at=timestamp,
+                        last_seen_at=timestamp,
+                    )
+                attrs = sessions[key]
+                attrs["started_at"] = min(attrs["started_at"], timestamp)
+                attrs["last_seen_at"] = max(attrs["last_seen_at"], timestamp)
+            session_pks = SessionService.upsert_sessions(sessions)
+
+            pageviews = []
+            events = []
+            for hit, timestamp in zip(valid_hits, timestamps):
+                website = websites[hit["domain"]]
+                fields = {
+                    "website_id": website.website_id,
+                    "session_id": session_pks[(website.website_id, hit["session_id"])],
+                    "sample_rate": website.sample_rate,
+                    "timestamp": timestamp,
+                    **hit["data"],
+                }
+                if hit["type"] == "pageview":
+                    pageviews.append(PageView(**fields))
+                else:
+                    events.append(Event(**fields))
+
+            # bulk_create bypasses save(); intern the batch's text values here
+            intern_instances(pageviews)
+            PageView.objects.bulk_create(pageviews, batch_size=1000)
+            # Events go through raw SQL that also writes promoted properties
+            EventService.insert_events(events)
+            session_activity.record(
+                Activity(hit.website_id, hit.session_id, hit.timestamp, counted)
+                for hits, counted in ((pageviews, 1), (events, 0))
+                for hit in hits
+            )
+
+        return {"successful_count": len(pageviews) + len(events), "errors": errors}
+
+    @staticmethod
+    def batch_track_events(events_data):
+        """
+        Process multiple tracking events in batch.
+
+        Domains are resolved from the website registry, sessions are upserted
+        in one statement and page views / events are inserted with one bulk
+        insert each, so the query count does not grow with the batch size.
+        """
+        hits = [build_batch_hit(item) for item in events_data]
+        result = TrackingService.bulk_record(hits)
 
+        errors = [
+            {"error": error["error"], "item": events_data[error["index"]]}
+            for error in result["errors"]
+        ]
         if errors:
             return {
                 "status": "partial",
-                "successful_count": successful_count,
+                "successful_count": result["successful_count"],
                 "errors": errors,
             }
 
-        return {"status": "ok", "successful_count": successful_count}
+        return {"status": "ok", "successful_count": result["successful_count"]}
@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from tracking.event_schemas import event_schema_registry
+from tracking.models import EventSchema, Website
+from tracking.registry import website_registry
+
+
+@receiver(post_save, sender=Website)
+@receiver(post_delete, sender=Website)
+def invalidate_website_registry(sender, instance, **kwargs):
+    """
+    Evict the website from this process now and from every other process
+    once the change is committed
+    """
+    website_registry.invalidate(instance.domain, instance.id)
+    transaction.on_commit(
+        lambda: website_registry.publish_invalidation(instance.domain, instance.id)
+    )
+
+
+@receiver(post_save, sender=EventSchema)
+@receiver(post_delete, sender=EventSchema)
+def invalidate_event_schemas(sender, instance, **kwargs):
+    """
+    Evict the website's schemas from this process; other processes pick
+    up the change within ``EVENT_SCHEMA_REGISTRY_TTL``
+    """
+    event_schema_registry.invalidate(instance.website_id)
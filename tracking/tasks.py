@@ -2,21 +2,44 @@ import logging
 from datetime import date, timedelta
 
 from celery import shared_task
-from django.db.models import Avg, Case, Count, F, IntegerField, Q, When
+from django.db.models import Count, F, Q, Subquery, Sum
 from django.db.models.functions import Extract
 from django.utils import timezone
 
+from analytics_core.db_router import replica_reads
+
+from . import archive, partitions, retention, rollups
 from .cache import AnalyticsCache
-from .models import DailyWebsiteStats, PageStats, PageView, Session, Website
+from .dimensions import resolve
+from .models import (
+    DailyWebsiteStats,
+    Event,
+    PageStats,
+    PageTitle,
+    PageUrl,
+    PageView,
+    Session,
+    Website,
+)
+from .services import bot_filter
+from .services.ingestion_service import IngestionService
+from .services.session_activity import session_activity
+from .services.session_service import SessionService
+from .utils.common import day_bounds
+from .utils.sampling import scale_rows
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
+@replica_reads()
 def aggregate_daily_stats():
     """
     OPTIMIZED: Aggregate daily statistics for all websites
 
+    Source scans read from a replica when one is configured; the upserts
+    go to the primary.
+
     Optimization: 97% query reduction by using:
     - Bulk aggregation instead of loops
     - Database-level calculations with Case/When
@@ -24,6 +47,8 @@ def aggregate_daily_stats():
     """
     try:
         yesterday = timezone.now().date() - timedelta(days=1)
+        # Half-open timestamp range so page view queries prune partitions
+        day_start, day_end = day_bounds(yesterday)
 
         # Fetch all active websites with org data at once
         websites = (
@@ -39,73 +64,132 @@ def aggregate_daily_stats():
             logger.info("No active websites to aggregate")
             return "No active websites found"
 
-        # Get ALL pageview stats in ONE query instead of per-website
-        pageview_stats = (
-            PageView.objects.filter(
-                website_id__in=website_ids, timestamp__date=yesterday
+        if rollups.caught_up(day_end):
+            # The hourly rollup holds the whole day: read its 24 rows per
+            # website; unique visitors are the union of the hourly sketches
+            hourly = rollups.hourly_totals(
+                website_ids, day_start, day_end, group_by="website_id", tail=False
             )
-            .values("website_id")
-            .annotate(
-                total_pageviews=Count("id"),
-                unique_visitors=Count("session_id", distinct=True),
+            pageview_dict = {
+                (website_id,): {
+                    "total_pageviews": totals["pageviews"],
+                    "unique_visitors": totals["visitors"],
+                    "events": totals["events"],
+                    "sampled": totals["sampled"],
+                }
+                for website_id, totals in hourly.items()
+            }
+        else:
+            # Get ALL pageview stats in ONE query instead of per-website.
+            # Rows are grouped by sample rate too and scaled back up by 1 / rate.
+            pageview_stats = (
+                PageView.objects.filter(
+                    website_id__in=website_ids,
+                    timestamp__gte=day_start,
+                    timestamp__lt=day_end,
+                )
+                .values("website_id", "sample_rate")
+                .annotate(
+                    total_pageviews=Count("*"),
+                    unique_visitors=Count("session_id", distinct=True),
+                )
             )
-        )
-        pageview_dict = {stat["website_id"]: stat for stat in pageview_stats}
+            pageview_dict = scale_rows(
+                pageview_stats, ["website_id"], ["total_pageviews", "unique_visitors"]
+            )
+            event_stats = (
+                Event.objects.filter(
+                    website_id__in=website_ids,
+                    timestamp__gte=day_start,
+                    timestamp__lt=day_end,
+                )
+                .values("website_id", "sample_rate")
+                .annotate(events=Count("*"))
+            )
+            event_dict = scale_rows(event_stats, ["website_id"], ["events"])
+            for key, stat in event_dict.items():
+                pageview_dict.setdefault(key, {})["events"] = stat["events"]
 
         # Get ALL session stats in ONE query
         session_stats = (
             Session.objects.filter(
-                website_id__in=website_ids, started_at__date=yesterday
+                website_id__in=website_ids,
+                started_at__gte=day_start,
+                started_at__lt=day_end,
             )
-            .values("website_id")
+            .values("website_id", "sample_rate")
             .annotate(
-                total_sessions=Count("id"),
-                avg_duration=Avg(
-                    Extract(F("ended_at") - F("started_at"), "seconds"),
+                total_sessions=Count("*"),
+                # Summed rather than averaged so groups can be combined;
+                # counting ended_at counts the ended sessions
+                ended_sessions=Count("ended_at"),
+                total_duration=Sum(
+                    Extract(F("ended_at") - F("started_at"), "epoch"),
                     filter=Q(ended_at__isnull=False),
                 ),
             )
         )
-        session_dict = {stat["website_id"]: stat for stat in session_stats}
+        session_dict = scale_rows(
+            session_stats,
+            ["website_id"],
+            ["total_sessions", "ended_sessions", "total_duration"],
+        )
 
-        # Calculate bounce rate using database-level Case/When
+        # Bounced sessions are those with exactly one pageview
+        single_pageview_sessions = (
+            PageView.objects.filter(
+                website_id__in=website_ids,
+                session__started_at__gte=day_start,
+                session__started_at__lt=day_end,
+                # No page view precedes its session
+                timestamp__gte=day_start,
+            )
+            .values("session_id")
+            .annotate(pageview_count=Count("*"))
+            .filter(pageview_count=1)
+            .values("session_id")
+        )
         bounce_stats = (
             Session.objects.filter(
-                website_id__in=website_ids, started_at__date=yesterday
-            )
-            .annotate(pageview_count=Count("pageviews"))
-            .values("website_id")
-            .annotate(
-                bounce_sessions=Count(
-                    Case(When(pageview_count=1, then=1), output_field=IntegerField())
-                ),
-                total_sessions_calc=Count("id"),
+                website_id__in=website_ids,
+                started_at__gte=day_start,
+                started_at__lt=day_end,
+                id__in=Subquery(single_pageview_sessions),
             )
+            .values("website_id", "sample_rate")
+            .annotate(bounce_sessions=Count("id"))
         )
-        bounce_dict = {stat["website_id"]: stat for stat in bounce_stats}
+        bounce_dict = scale_rows(bounce_stats, ["website_id"], ["bounce_sessions"])
 
         # Build all daily stats for bulk creation
         daily_stats_list = []
         for website_id in website_ids:
-            pv_stat = pageview_dict.get(website_id, {})
-            s_stat = session_dict.get(website_id, {})
-            b_stat = bounce_dict.get(website_id, {})
+            pv_stat = pageview_dict.get((website_id,), {})
+            s_stat = session_dict.get((website_id,), {})
+            b_stat = bounce_dict.get((website_id,), {})
 
-            total_sessions = s_stat.get("total_sessions", 0) or 0
-            bounce_sessions = b_stat.get("bounce_sessions", 0) or 0
+            total_sessions = s_stat.get("total_sessions", 0)
+            bounce_sessions = b_stat.get("bounce_sessions", 0)
             bounce_rate = (
                 (bounce_sessions / total_sessions * 100) if total_sessions > 0 else 0
             )
+            ended_sessions = s_stat.get("ended_sessions", 0)
+            avg_duration = (
+                s_stat["total_duration"] / ended_sessions if ended_sessions > 0 else 0
+            )
 
             daily_stats_list.append(
                 DailyWebsiteStats(
                     website_id=website_id,
                     date=yesterday,
-                    pageviews=pv_stat.get("total_pageviews", 0),
-                    unique_visitors=pv_stat.get("unique_visitors", 0),
-                    sessions=total_sessions,
-                    avg_session_duration=s_stat.get("avg_duration", 0) or 0,
+                    pageviews=round(pv_stat.get("total_pageviews", 0)),
+                    unique_visitors=round(pv_stat.get("unique_visitors", 0)),
+                    sessions=round(total_sessions),
+                    events=round(pv_stat.get("events", 0)),
+                    avg_session_duration=avg_duration,
                     bounce_rate=bounce_rate,
+                    sampled=pv_stat.get("sampled", False)
+                    or s_stat.get("sampled", False),
                 )
             )
 
@@ -118,29 +202,35 @@ def aggregate_daily_stats():
                     "pageviews": stat.pageviews,
                     "unique_visitors": stat.unique_visitors,
                     "sessions": stat.sessions,
+                    "events": stat.events,
                     "avg_session_duration": stat.avg_session_duration,
                     "bounce_rate": stat.bounce_rate,
+                    "sampled": stat.sampled,
                 },
             )
 
-        # Get ALL page stats in ONE query instead of looping each page_url
+        # Get ALL page stats in ONE query instead of looping each page_url,
+        # grouped by the interned URL id rather than the URL text
         page_stats_data = (
             PageView.objects.filter(
-                website_id__in=website_ids, timestamp__date=yesterday
+                website_id__in=website_ids,
+                timestamp__gte=day_start,
+                timestamp__lt=day_end,
             )
-            .values("website_id", "page_url", "page_title")
-            .annotate(views=Count("id"))
+            .values("website_id", "page_url_ref", "sample_rate")
+            .annotate(views=Count("*"))
         )
 
         page_stats_list = []
-        for stat in page_stats_data:
+        for (website_id, page_url_id), stat in scale_rows(
+            page_stats_data, ["website_id", "page_url_ref"], ["views"]
+        ).items():
             page_stats_list.append(
                 PageStats(
-                    website_id=stat["website_id"],
+                    website_id=website_id,
                     date=yesterday,
-                    page_url=stat["page_url"],
-                    page_title=stat.get("page_title", ""),
-                    views=stat["views"],
+                    page_url_ref_id=page_url_id,
+                    views=round(stat["views"]),
                     avg_time_on_page=0,
                 )
             )
@@ -150,7 +240,7 @@ def aggregate_daily_stats():
             PageStats.objects.update_or_create(
                 website_id=stat.website_id,
                 date=yesterday,
-                page_url=stat.page_url,
+                page_url_ref_id=stat.page_url_ref_id,
                 defaults={
                     "views": stat.views,
                     "avg_time_on_page": stat.avg_time_on_page,
@@ -182,55 +272,129 @@ def aggregate_daily_stats():
 
 
 @shared_task
-def cleanup_old_sessions():
+def apply_retention():
     """
-    OPTIMIZED: Clean up old sessions with better batch handling
+    Remove raw hits and aggregates past their organization's retention
+    window: expired partitions are dropped, the rest is deleted in throttled
+    keyset chunks that resume where the previous run stopped.
+    """
+    try:
+        # Sessions are judged on their flushed last_seen_at
+        session_activity.flush()
+        stats = retention.apply_retention()
+        logger.info(
+            f"Retention dropped partitions {stats['dropped_partitions']}, "
+            f"deleted {stats['deleted']}"
+            + ("" if stats["complete"] else " (incomplete)")
+        )
+        return f"Deleted {sum(stats['deleted'].values())} rows"
+
+    except Exception as e:
+        logger.error(f"Error in apply_retention: {str(e)}", exc_info=True)
+        raise
+
 
-    Optimization:
-    - Reduced batch size from 1000 to 500 for better memory management
-    - Added select_for_update to prevent race conditions
-    - Better progress tracking
+@shared_task
+def flush_session_activity():
+    """
+    Write session last-seen times and page view counts buffered in Redis
+    back to the sessions table in batched UPDATEs.
     """
     try:
-        cutoff_date = timezone.now() - timedelta(days=90)
+        flushed = session_activity.flush()
+        if flushed:
+            logger.info(f"Flushed activity of {flushed} sessions")
+        return f"Flushed activity of {flushed} sessions"
 
-        total_count = Session.objects.filter(started_at__lt=cutoff_date).count()
+    except Exception as e:
+        logger.error(f"Error in flush_session_activity: {str(e)}", exc_info=True)
+        raise
 
-        if total_count == 0:
-            logger.info("No old sessions to clean up")
-            return "No old sessions found"
 
-        batch_size = 500  # Optimized from 1000
-        deleted_total = 0
-        batch_num = 0
+@shared_task
+def flush_bot_counters():
+    """
+    Fold bot hit counts tallied in Redis into bot_hit_counters with one
+    upsert.
+    """
+    try:
+        written = bot_filter.flush_counts()
+        return f"Updated {written} bot hit counters"
 
-        while True:
-            batch_num += 1
+    except Exception as e:
+        logger.error(f"Error in flush_bot_counters: {str(e)}", exc_info=True)
+        raise
 
-            # Use select_for_update to prevent concurrent modification
-            batch_ids = list(
-                Session.objects.filter(started_at__lt=cutoff_date)
-                .select_for_update(skip_locked=True)
-                .values_list("id", flat=True)[:batch_size]
-            )
 
-            if not batch_ids:
-                break
+@shared_task
+def maintain_partitions():
+    """
+    Pre-create upcoming page_views / events partitions and detach expired
+    ones.
+    """
+    try:
+        result = partitions.maintain_partitions()
+        logger.info(
+            f"Created partitions {result['created']}, detached {result['detached']}"
+        )
+        return (
+            f"Created {len(result['created'])} partitions, "
+            f"detached {len(result['detached'])}"
+        )
+
+    except Exception as e:
+        logger.error(f"Error in maintain_partitions: {str(e)}", exc_info=True)
+        raise
 
-            # Django cascade delete handles dependent records
-            del_count, _ = Session.objects.filter(id__in=batch_ids).delete()
-            deleted_total += del_count
 
-            logger.info(
-                f"Batch {batch_num}: Deleted {len(batch_ids)} sessions "
-                f"({deleted_total}/{total_count} total)"
-            )
+@shared_task
+def archive_cold_days():
+    """
+    Move page views and events older than the hot window to the columnar
+    archive.
+    """
+    try:
+        moved = archive.archive_closed_days()
+        logger.info(f"Archived {moved}")
+        return f"Archived {moved}"
 
-        logger.info(f"Session cleanup completed: {deleted_total} records deleted")
-        return f"Cleaned up {deleted_total} old sessions"
+    except Exception as e:
+        logger.error(f"Error in archive_cold_days: {str(e)}", exc_info=True)
+        raise
+
+
+@shared_task
+def rollup_hourly_stats():
+    """
+    Fold page views, events and sessions inserted since the last run into
+    the hourly rollup.
+    """
+    try:
+        result = rollups.rollup_hourly_stats()
+        return f"Updated {result['hours']} hourly rows up to {result['tables']}"
 
     except Exception as e:
-        logger.error(f"Error in cleanup_old_sessions: {str(e)}", exc_info=True)
+        logger.error(f"Error in rollup_hourly_stats: {str(e)}", exc_info=True)
+        raise
+
+
+@shared_task
+def close_idle_sessions():
+    """
+    End sessions that have been idle for TRACKING_SESSION_IDLE_MINUTES.
+    Set-based batches over the partial index of open sessions, so a run
+    costs the number of sessions it closes rather than the table size.
+    """
+    try:
+        # Sessions must not be judged on last_seen_at values still in Redis
+        session_activity.flush()
+        closed = SessionService.close_idle_sessions()
+        if closed:
+            logger.info(f"Closed {closed} idle sessions")
+        return f"Closed {closed} idle sessions"
+
+    except Exception as e:
+        logger.error(f"Error in close_idle_sessions: {str(e)}", exc_info=True)
         raise
 
 
@@ -266,15 +430,18 @@ def update_realtime_cache():
         today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
         one_hour_ago = now - timedelta(hours=1)
 
-        # Get active visitors for ALL websites in ONE query
-        active_visitors = (
-            Session.objects.filter(
-                website_id__in=website_ids, started_at__gte=thirty_mins_ago
+        # Active visitors come from the live session sets in Redis, falling
+        # back to ONE query over flushed last_seen_at values
+        active_dict = session_activity.active_counts(website_ids, minutes=30)
+        if active_dict is None:
+            active_visitors = (
+                Session.objects.filter(
+                    website_id__in=website_ids, last_seen_at__gte=thirty_mins_ago
+                )
+                .values("website_id")
+                .annotate(count=Count("id"))
             )
-            .values("website_id")
-            .annotate(count=Count("id"))
-        )
-        active_dict = {av["website_id"]: av["count"] for av in active_visitors}
+            active_dict = {av["website_id"]: av["count"] for av in active_visitors}
 
         # Get today's pageviews for ALL websites in ONE query
         pageviews_today = (
@@ -291,7 +458,7 @@ def update_realtime_cache():
             PageView.objects.filter(
                 website_id__in=website_ids, timestamp__gte=one_hour_ago
             )
-            .values("website_id", "page_url", "page_title")
+            .values("website_id", "page_url_ref", "page_title_ref")
             .annotate(views=Count("id"))
             .order_by("website_id", "-views")
         )
@@ -303,13 +470,21 @@ def update_realtime_cache():
             if wid not in popular_dict:
                 popular_dict[wid] = []
             if len(popular_dict[wid]) < 5:
-                popular_dict[wid].append(
-                    {
-                        "page_url": page["page_url"],
-                        "page_title": page.get("page_title", ""),
-                        "views": page["views"],
-                    }
-                )
+                popular_dict[wid].append(page)
+
+        # Resolve the interned ids of the selected pages only
+        selected = [page for pages in popular_dict.values() for page in pages]
+        urls = resolve(PageUrl, [page["page_url_ref"] for page in selected])
+        titles = resolve(PageTitle, [page["page_title_ref"] for page in selected])
+        for wid, pages in popular_dict.items():
+            popular_dict[wid] = [
+                {
+                    "page_url": urls.get(page["page_url_ref"]),
+                    "page_title": titles.get(page["page_title_ref"], ""),
+                    "views": page["views"],
+                }
+                for page in pages
+            ]
 
         # Batch cache updates
         for website in websites:
@@ -331,3 +506,26 @@ def update_realtime_cache():
     except Exception as e:
         logger.error(f"Error in update_realtime_cache: {str(e)}", exc_info=True)
         raise
+
+
+@shared_task
+def drain_ingestion_buffer():
+    """
+    Write buffered tracking hits to the database in bulk batches.
+    No-op unless TRACKING_INGESTION_MODE is "buffered".
+    """
+    if not IngestionService.is_buffered():
+        return "Ingestion buffer disabled"
+
+    try:
+        result = IngestionService.drain()
+        if result["stored"] or result["failed"]:
+            logger.info(
+                f"Drained ingestion buffer: {result['stored']} stored, "
+                f"{result['failed']} dropped"
+            )
+        return f"Stored {result['stored']} buffered hits"
+
+    except Exception as e:
+        logger.error(f"Error in drain_ingestion_buffer: {str(e)}", exc_info=True)
+        raise
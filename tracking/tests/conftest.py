@@ -0,0 +1,45 @@
+import pytest
+from silk.collector import DataCollector
+
+from tracking.dimensions import dimension_cache
+from tracking.event_schemas import event_schema_registry
+from tracking.registry import website_registry
+
+
+@pytest.fixture(autouse=True)
+def clear_website_registry():
+    """Rolled-back test data must not leak through the in-process registry"""
+    website_registry.invalidate()
+    yield
+    website_registry.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def clear_event_schema_registry():
+    """Schemas cached by one test may be rolled back before the next"""
+    event_schema_registry.invalidate()
+    yield
+    event_schema_registry.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def clear_dimension_cache():
+    """Interned ids cached by one test may be rolled back before the next"""
+    dimension_cache.clear()
+    yield
+    dimension_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_silk_collector():
+    """Silk keeps the last request in a thread-local, which would make it
+    profile (and EXPLAIN) queries issued by later tests"""
+    yield
+    DataCollector().clear()
+
+
+@pytest.fixture(autouse=True)
+def archive_root(settings, tmp_path):
+    """Archived files are written outside the database and not rolled back"""
+    settings.TRACKING_ARCHIVE_ROOT = str(tmp_path / "archive")
+    return tmp_path / "archive"
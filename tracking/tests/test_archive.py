@@ -0,0 +1,157 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from reporting.services.analytics_service import AnalyticsService
+from tracking import archive, archive_query
+from tracking.models import Event, EventProperty, PageView, Session
+from tracking.retention import apply_retention
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.fixture
+def archiving(settings):
+    settings.TRACKING_ARCHIVE_AFTER_DAYS = 30
+    settings.TRACKING_ARCHIVE_BATCH_SIZE = 2
+    settings.TRACKING_RETENTION_PAUSE = 0
+
+
+def hit(website, session_id, when, event_name=None, **event_data):
+    session, _ = Session.objects.get_or_create(
+        website=website, session_id=session_id, defaults={"country": "DE"}
+    )
+    if event_name is None:
+        return PageView.objects.create(
+            website=website, session=session, page_url="/", timestamp=when
+        )
+    return Event.objects.create(
+        website=website,
+        session=session,
+        event_name=event_name,
+        event_data=event_data,
+        timestamp=when,
+    )
+
+
+@pytest.mark.django_db
+def test_closed_days_move_to_memory_mapped_segments(archiving):
+    website = WebsiteFactory()
+    old = timezone.now() - timedelta(days=40)
+    for session_id in ("a", "a", "b"):
+        hit(website, session_id, old)
+    signup = hit(website, "a", old, "signup", plan="pro")
+    EventProperty.objects.create(
+        event=signup,
+        website=website,
+        event_name="signup",
+        name="plan",
+        string_value="pro",
+        timestamp=old,
+    )
+    hit(website, "c", timezone.now())
+
+    moved = archive.archive_closed_days()
+
+    assert moved == {"page_views": 3, "events": 1}
+    assert PageView.objects.count() == 1
+    assert not Event.objects.exists() and not EventProperty.objects.exists()
+    days = archive.day_directories("page_views", website.id)
+    assert [day for day, _ in days] == [timezone.localdate(old)]
+    # Batches of two rows make two segments
+    segments = list(
+        archive_query.segments(
+            "page_views", [website.id], old - timedelta(days=1), old + timedelta(days=1)
+        )
+    )
+    assert [len(segment) for segment in segments] == [2, 1]
+    assert isinstance(segments[0].column("session_id"), np.memmap)
+    assert segments[0].dictionary("country") == ["DE"]
+    event = next(archive_query.segments("events", [website.id], old, timezone.now()))
+    assert event.texts("event_data") == [{"plan": "pro"}]
+
+
+@pytest.mark.django_db
+def test_aggregate_groups_filters_and_counts_distinct(archiving):
+    website = WebsiteFactory()
+    first = timezone.now() - timedelta(days=40)
+    second = first + timedelta(days=1)
+    hit(website, "a", first, "signup", plan="pro")
+    hit(website, "a", first, "signup", plan="free")
+    hit(website, "b", second, "signup", plan="pro")
+    hit(website, "b", second, "click")
+    archive.archive_closed_days()
+
+    rows = archive_query.aggregate(
+        "events",
+        [website.id],
+        first - timedelta(days=1),
+        timezone.now(),
+        ["day"],
+        {"event_name": "signup"},
+        users="session_id",
+    )
+    assert sorted((row["day"], row["count"], row["users"]) for row in rows) == [
+        (timezone.localdate(first), 2, 1),
+        (timezone.localdate(second), 1, 1),
+    ]
+
+    plans = archive_query.aggregate(
+        "events",
+        [website.id],
+        first - timedelta(days=1),
+        timezone.now(),
+        ["event_data.plan"],
+    )
+    assert {row["event_data.plan"]: row["count"] for row in plans} == {
+        "pro": 2,
+        "free": 1,
+        None: 1,
+    }
+
+
+@pytest.mark.django_db
+def test_reports_read_archived_days_and_retention_removes_them(archiving):
+    website = WebsiteFactory()
+    organization = website.organization
+    old = timezone.now() - timedelta(days=40)
+    hit(website, "a", old, "signup", plan="pro")
+    hit(website, "b", old, "signup", plan="pro")
+    hit(website, "c", timezone.now() - timedelta(days=1), "signup", plan="free")
+    archive.archive_closed_days()
+
+    summary = AnalyticsService.get_event_summary(organization, website.id, days=60)
+    assert summary == [{"event_name": "signup", "count": 3, "unique_users": 3}]
+    breakdown = AnalyticsService.get_event_property_breakdown(
+        organization, website.id, "signup", "plan", days=60
+    )
+    assert {row["value"]: row["count"] for row in breakdown} == {"pro": 2}
+
+    # The raw window leaves archived days alone, the aggregate window
+    # removes them
+    organization.raw_retention_days = 35
+    organization.save()
+    assert "archive" not in apply_retention()["deleted"]
+
+    organization.aggregate_retention_days = 35
+    organization.save()
+    stats = apply_retention()
+
+    assert stats["deleted"]["archive"] == 2
+    assert archive.day_directories("events", website.id) == []
+
+
+@pytest.mark.django_db
+def test_hits_past_the_raw_window_wait_for_the_archive(archiving, settings):
+    settings.TRACKING_RAW_RETENTION_DAYS = 20
+    website = WebsiteFactory()
+    hit(website, "a", timezone.now() - timedelta(days=25))
+    hit(website, "b", timezone.now() - timedelta(days=40))
+
+    apply_retention()
+
+    assert PageView.objects.count() == 2
+    assert archive.archive_closed_days() == {"page_views": 1, "events": 0}
+    apply_retention()
+    assert PageView.objects.get().session.session_id == "a"
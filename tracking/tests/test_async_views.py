@@ -0,0 +1,103 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+from tracking.models import Event, PageView, Session
+from tracking.services import ingestion_service
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+def post(name, payload):
+    client = AsyncClient()
+    url = reverse(f"tracking:api-v1:{name}")
+    return async_to_sync(client.post)(url, payload, content_type="application/json")
+
+
+@pytest.mark.django_db
+def test_async_pageview_and_event_are_stored():
+    website = WebsiteFactory()
+
+    response = post(
+        "track-pageview-async",
+        {"domain": website.domain, "session_id": "s-1", "page_url": "/home"},
+    )
+    assert response.status_code == 201
+
+    response = post(
+        "track-event-async",
+        {"domain": website.domain, "session_id": "s-1", "event_name": "click"},
+    )
+    assert response.status_code == 201
+
+    session = Session.objects.get(website=website, session_id="s-1")
+    assert PageView.objects.get(session=session).page_url == "/home"
+    assert Event.objects.get(session=session).event_name == "click"
+
+
+@pytest.mark.django_db
+def test_async_pageview_rejects_unknown_domain_and_bad_json():
+    response = post(
+        "track-pageview-async",
+        {"domain": "unknown.com", "session_id": "s-1", "page_url": "/"},
+    )
+    assert response.status_code == 400
+
+    client = AsyncClient()
+    url = reverse("tracking:api-v1:track-pageview-async")
+    response = async_to_sync(client.post)(url, "{", content_type="application/json")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_session_start_and_end():
+    website = WebsiteFactory()
+
+    response = post(
+        "session-start-async",
+        {"domain": website.domain, "session_id": "abc", "user_agent": "iPhone"},
+    )
+    assert response.status_code == 201
+    assert response.json()["device_type"] == "mobile"
+
+    response = post(
+        "session-end-async", {"domain": website.domain, "session_id": "abc"}
+    )
+    assert response.status_code == 200
+    assert Session.objects.get(session_id="abc").ended_at is not None
+
+    response = post(
+        "session-end-async", {"domain": website.domain, "session_id": "missing"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_batch_buffered(settings, monkeypatch):
+    settings.TRACKING_INGESTION_MODE = "buffered"
+    settings.TRACKING_BUFFER_BACKEND = "local"
+    monkeypatch.setattr(ingestion_service, "_buffer", None)
+    website = WebsiteFactory()
+    SessionFactory(website=website, session_id="s-1")
+
+    response = post(
+        "batch-tracking-async",
+        [
+            {
+                "type": "pageview",
+                "domain": website.domain,
+                "session_id": "s-1",
+                "page_url": "/",
+            },
+            {
+                "type": "event",
+                "domain": website.domain,
+                "session_id": "s-1",
+                "event_name": "x",
+            },
+            {"type": "bogus"},
+        ],
+    )
+
+    assert response.status_code == 207
+    assert ingestion_service.get_ingestion_buffer().length() == 2
@@ -0,0 +1,122 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from tracking.services import backpressure, ingestion_service
+from tracking.services.backpressure import METRICS_KEY, admission_controller
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.fixture
+def controller(settings):
+    settings.TRACKING_MAX_INFLIGHT = 8
+    settings.TRACKING_MAX_INFLIGHT_PER_WEBSITE = 8
+    settings.TRACKING_FAIR_SHARE_AT = 0.5
+    admission_controller.__init__()
+    admission_controller._redis().delete(METRICS_KEY)
+    yield admission_controller
+    admission_controller.__init__()
+
+
+def test_process_capacity_is_enforced(controller, settings):
+    settings.TRACKING_MAX_INFLIGHT = 2
+
+    assert controller.admit("a.com") is None
+    assert controller.admit("b.com") is None
+    rejection = controller.admit("c.com")
+
+    assert (rejection.status, rejection.reason) == (503, "inflight")
+    controller.release("a.com")
+    assert controller.admit("c.com") is None
+
+
+def test_noisy_website_is_limited_to_its_fair_share(controller):
+    for _ in range(4):
+        assert controller.admit("noisy.com") is None
+
+    # Past the fair-share threshold each active website gets 8 // 2 slots
+    assert controller.admit("quiet.com") is None
+    rejection = controller.admit("noisy.com")
+
+    assert (rejection.status, rejection.reason) == (429, "website_share")
+    assert controller.admit("quiet.com") is None
+    assert controller.shed_totals() == {"website_share": 1}
+
+
+def test_shed_requests_are_counted_in_redis_off_the_request_path(
+    controller, settings, monkeypatch
+):
+    settings.TRACKING_MAX_INFLIGHT = 1
+    assert controller.admit("a.com") is None
+
+    def unreachable():
+        raise AssertionError("Redis used while admitting")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(controller, "_redis", unreachable)
+        assert controller.admit("b.com").reason == "inflight"
+        assert controller.admit("b.com").reason == "inflight"
+
+    controller.flush_shed()
+    assert controller._redis().hgetall(METRICS_KEY) == {b"inflight": b"2"}
+
+
+def test_slots_are_released_after_the_request(controller):
+    with controller.admission("a.com") as rejection:
+        assert rejection is None
+        assert controller.inflight == 1
+
+    assert controller.inflight == 0
+    assert not controller.per_website
+
+
+def test_deep_buffer_sheds_with_503(controller, settings, monkeypatch):
+    settings.TRACKING_INGESTION_MODE = "buffered"
+    settings.TRACKING_BUFFER_BACKEND = "local"
+    settings.TRACKING_MAX_BUFFER_DEPTH = 1
+    monkeypatch.setattr(ingestion_service, "_buffer", None)
+    ingestion_service.get_ingestion_buffer().push([{}, {}])
+    assert controller.admit("a.com") is None
+
+    # The background thread samples the depth; admitting only reads it
+    controller.sample_depth()
+
+    def unreachable():
+        raise AssertionError("Buffer read while admitting")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(backpressure, "get_ingestion_buffer", unreachable)
+        patched.setattr(controller, "_redis", unreachable)
+        rejection = controller.admit("a.com")
+
+    assert (rejection.status, rejection.reason) == (503, "buffer_depth")
+
+
+@pytest.mark.django_db
+def test_overloaded_pageview_gets_retry_after(controller, settings):
+    settings.TRACKING_MAX_INFLIGHT = 0
+    website = WebsiteFactory()
+
+    response = Client().post(
+        reverse("tracking:api-v1:track-pageview"),
+        {"domain": website.domain, "session_id": "s-1", "page_url": "/"},
+        content_type="application/json",
+    )
+
+    assert response.status_code == 503
+    assert response["Retry-After"] == str(settings.TRACKING_RETRY_AFTER)
+
+    response = Client().get(reverse("tracking:api-v1:ingestion-metrics"))
+
+    assert response.status_code == 200
+    assert 'tracking_shed_total{reason="inflight"} 1' in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_metrics_token_is_required_when_configured(controller, settings):
+    settings.TRACKING_METRICS_TOKEN = "secret"
+    url = reverse("tracking:api-v1:ingestion-metrics")
+
+    assert Client().get(url).status_code == 401
+    response = Client().get(url, HTTP_AUTHORIZATION="Bearer secret")
+    assert response.status_code == 200
@@ -0,0 +1,102 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tracking.models import Event, PageView, Session
+from tracking.services.tracking_service import TrackingService
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+@pytest.mark.django_db
+def test_batch_tracking_uses_constant_number_of_queries(django_assert_max_num_queries):
+    website = WebsiteFactory()
+    SessionFactory(website=website, session_id="existing")
+    payload = [
+        {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": f"s-{i % 20}",
+            "page_url": f"/page/{i}",
+        }
+        for i in range(200)
+    ]
+    payload.append(
+        {
+            "type": "event",
+            "domain": website.domain,
+            "session_id": "existing",
+            "event_name": "signup",
+            "event_data": {"plan": "pro"},
+        }
+    )
+
+    # Domains, session upsert, interned URLs, pageviews, events and the savepoint
+    with django_assert_max_num_queries(7):
+        result = TrackingService.batch_track_events(payload)
+
+    assert result == {"status": "ok", "successful_count": 201}
+    assert PageView.objects.count() == 200
+    assert Event.objects.get().session.session_id == "existing"
+    assert Session.objects.filter(website=website).count() == 21
+
+
+@pytest.mark.django_db
+def test_batch_tracking_reports_item_errors():
+    website = WebsiteFactory()
+    payload = [
+        {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": "s-1",
+            "page_url": "/ok",
+        },
+        {
+            "type": "pageview",
+            "domain": "unknown.com",
+            "session_id": "s-1",
+            "page_url": "/lost",
+        },
+        {"type": "pageview", "domain": website.domain, "session_id": "s-1"},
+        {"type": "unknown", "domain": website.domain, "session_id": "s-1"},
+    ]
+
+    client = APIClient()
+    url = reverse("tracking:api-v1:batch-tracking")
+    response = client.post(url, data=payload, format="json")
+
+    assert response.status_code == 207
+    assert response.data["status"] == "partial"
+    assert response.data["successful_count"] == 1
+    assert len(response.data["errors"]) == 3
+    assert PageView.objects.get().page_url == "/ok"
+
+
+@pytest.mark.django_db
+def test_batch_reports_items_that_do_not_fit_the_session_columns():
+    website = WebsiteFactory()
+    item = {"domain": website.domain, "session_id": "s-1", "page_url": "/ok"}
+    payload = [
+        item,
+        {**item, "ip_address": "not-an-ip"},
+        {**item, "country": "USA"},
+        {**item, "device_type": "x" * 21},
+        {**item, "browser": "x" * 51},
+        {**item, "session_id": "s-2", "country": "de", "device_type": "tablet"},
+    ]
+
+    client = APIClient()
+    url = reverse("tracking:api-v1:batch-tracking")
+    response = client.post(url, data=payload, format="json")
+
+    assert response.status_code == 207
+    assert response.json()["successful_count"] == 2
+    errors = [error["error"] for error in response.json()["errors"]]
+    assert [list(error) for error in errors] == [
+        ["ip_address"],
+        ["country"],
+        ["device_type"],
+        ["browser"],
+    ]
+    assert PageView.objects.count() == 2
+    session = Session.objects.get(session_id="s-2")
+    assert (session.country, session.device_type) == ("de", "tablet")
@@ -0,0 +1,72 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from tracking.api.v1.fast_views import PIXEL_GIF
+from tracking.models import Event, PageView, Session
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.mark.django_db
+def test_pixel_records_pageview_and_returns_gif():
+    website = WebsiteFactory()
+
+    response = Client().get(
+        reverse("tracking:api-v1:track-pixel"),
+        {"d": website.domain, "s": "s-1", "u": "/pricing", "ti": "Pricing"},
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/gif"
+    assert response.content == PIXEL_GIF
+    pageview = PageView.objects.get()
+    assert (pageview.page_url, pageview.page_title) == ("/pricing", "Pricing")
+
+
+@pytest.mark.django_db
+def test_zero_js_pixel_uses_referer_and_anonymous_session():
+    website = WebsiteFactory()
+    client = Client(HTTP_USER_AGENT="Mozilla/5.0", REMOTE_ADDR="1.2.3.4")
+    url = reverse("tracking:api-v1:track-pixel")
+
+    client.get(url, {"d": website.domain}, HTTP_REFERER="https://example.com/a")
+    client.get(url, {"d": website.domain}, HTTP_REFERER="https://example.com/b")
+
+    assert PageView.objects.count() == 2
+    session = Session.objects.get()
+    assert session.session_id.startswith("anon-")
+
+
+@pytest.mark.django_db
+def test_pixel_with_invalid_payload_still_returns_gif():
+    response = Client().get(reverse("tracking:api-v1:track-pixel"), {"s": "s-1"})
+
+    assert response.status_code == 400
+    assert response.content == PIXEL_GIF
+
+
+@pytest.mark.django_db
+def test_text_plain_beacon_records_event():
+    website = WebsiteFactory()
+
+    response = Client().post(
+        reverse("tracking:api-v1:track-beacon"),
+        data=f"t=ev&d={website.domain}&s=s-1&n=unload&e=%7B%22ms%22%3A1200%7D",
+        content_type="text/plain;charset=UTF-8",
+    )
+
+    assert response.status_code == 204
+    event = Event.objects.get()
+    assert (event.event_name, event.event_data) == ("unload", {"ms": 1200})
+
+
+@pytest.mark.django_db
+def test_json_beacon_reports_validation_errors():
+    response = Client().post(
+        reverse("tracking:api-v1:track-beacon"),
+        data='{"t": "ev", "d": "a.com", "s": "s-1"}',
+        content_type="text/plain",
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"event_name": ["This field is required."]}
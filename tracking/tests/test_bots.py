@@ -0,0 +1,179 @@
+import json
+from pathlib import Path
+
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tracking.api.v1 import fast_views
+from tracking.models import BotHitCounter, PageView, Session
+from tracking.services import bot_filter
+from tracking.services.ingestion_service import IngestionService
+from tracking.tasks import flush_bot_counters
+from tracking.tests.factories.factories import WebsiteFactory
+from tracking.utils import bots
+
+SERVER = "python-requests/2.32.3"
+RANGES_FILE = Path(__file__).parent / "data" / "datacenter-ranges.txt"
+BROWSER = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/126.0 Safari/537.36"
+CRAWLER = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+@pytest.fixture
+def bot_filtering(settings):
+    settings.TRACKING_DATACENTER_RANGES_PATH = str(RANGES_FILE)
+    bots.reset()
+    client = bot_filter.get_bot_client()
+    client.delete(bot_filter.COUNTS_KEY, bot_filter.FLUSHING_COUNTS_KEY)
+    for key in client.scan_iter(f"{bot_filter.RATE_KEY_PREFIX}:*"):
+        client.delete(key)
+    yield
+    bots.reset()
+
+
+def test_static_verdicts_use_user_agent_and_datacenter_ranges(bot_filtering):
+    assert bots.static_verdict(CRAWLER, "81.2.69.160") == "user_agent"
+    assert bots.static_verdict(BROWSER, "198.51.100.200") == "datacenter"
+    assert bots.static_verdict(BROWSER, "2001:db8:dc::1") == "datacenter"
+    assert bots.static_verdict(BROWSER, "198.51.101.1") is None
+    assert bots.static_verdict(BROWSER, None) is None
+
+    starts, ends = bots.get_ranges()[4]
+    assert len(starts) == len(ends) == 1
+
+
+@pytest.mark.django_db
+def test_crawler_hits_are_counted_instead_of_stored(bot_filtering):
+    website = WebsiteFactory()
+    url = reverse("tracking:api-v1:track-pageview")
+    payload = {"domain": website.domain, "session_id": "s-1", "page_url": "/"}
+
+    response = APIClient().post(
+        url, data=payload, format="json", HTTP_USER_AGENT=CRAWLER
+    )
+
+    assert response.status_code == 202
+    assert response.data["status"] == "filtered"
+    assert not Session.objects.exists()
+    flush_bot_counters()
+    counter = BotHitCounter.objects.get()
+    assert (counter.website, counter.reason, counter.hits) == (website, "user_agent", 1)
+
+
+@pytest.mark.django_db
+def test_batch_drops_bots_by_user_agent_ip_and_hit_rate(bot_filtering, settings):
+    settings.TRACKING_BOT_MAX_HITS_PER_MINUTE = 3
+    website = WebsiteFactory()
+
+    def item(session_id, **fields):
+        return {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": session_id,
+            "page_url": "/",
+            "user_agent": BROWSER,
+            "ip_address": "81.2.69.160",
+            **fields,
+        }
+
+    items = [
+        item("human"),
+        item("crawler", user_agent=CRAWLER),
+        item("cloud", ip_address="198.51.100.7"),
+    ]
+    items += [item("scraper") for _ in range(2)]
+
+    result = IngestionService.submit_batch(items)
+
+    # Only the scraper's hits beyond the per-minute limit are flagged
+    assert result["successful_count"] == 3
+    assert result["filtered_count"] == 2
+    assert IngestionService.submit_batch([item("scraper") for _ in range(3)]) == {
+        **result,
+        "successful_count": 1,
+        "filtered_count": 2,
+    }
+    assert PageView.objects.filter(session__session_id="scraper").count() == 3
+    bot_filter.flush_counts()
+    assert dict(BotHitCounter.objects.values_list("reason", "hits")) == {
+        "user_agent": 1,
+        "datacenter": 1,
+        "rate": 2,
+    }
+
+
+@pytest.mark.django_db
+def test_imported_batches_skip_the_hit_rate_check(bot_filtering, settings):
+    settings.TRACKING_BOT_MAX_HITS_PER_MINUTE = 3
+    website = WebsiteFactory()
+    items = [
+        {
+            "domain": website.domain,
+            "session_id": "replayed",
+            "page_url": f"/{i}",
+            "user_agent": BROWSER,
+        }
+        for i in range(10)
+    ]
+
+    result = IngestionService.submit_batch(items, imported=True)
+
+    assert (result["successful_count"], result["filtered_count"]) == (10, 0)
+
+
+@pytest.mark.django_db
+def test_drop_mode_does_not_count(bot_filtering, settings):
+    settings.TRACKING_BOT_FILTER = "drop"
+    website = WebsiteFactory()
+
+    result = IngestionService.submit(
+        "pageview", website.domain, "s-1", {"page_url": "/", "user_agent": CRAWLER}
+    )
+
+    assert result == {"status": "filtered"}
+    assert bot_filter.flush_counts() == 0
+    assert not BotHitCounter.objects.exists()
+
+
+def post_batch_drf(payload, **headers):
+    url = reverse("tracking:api-v1:batch-tracking")
+    response = APIClient().post(url, data=payload, format="json", **headers)
+    return response.status_code, response.json()
+
+
+def post_batch_fast(payload, **headers):
+    request = RequestFactory().post(
+        "/api/tracking/v1/batch/",
+        data=json.dumps(payload),
+        content_type="application/json",
+        **headers,
+    )
+    response = fast_views.batch(request)
+    return response.status_code, json.loads(response.content)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("post_batch", [post_batch_drf, post_batch_fast])
+def test_batch_items_are_judged_by_their_own_user_agent_and_ip(
+    bot_filtering, post_batch
+):
+    website = WebsiteFactory()
+    item = {"domain": website.domain, "session_id": "s-1", "page_url": "/"}
+    relay = {"HTTP_USER_AGENT": SERVER, "REMOTE_ADDR": "198.51.100.7"}
+
+    # A backend relaying browser hits is not judged by its own user agent/IP
+    status_code, body = post_batch([item, item], **relay)
+    assert (status_code, body["filtered_count"]) == (201, 0)
+
+    status_code, body = post_batch([{**item, "user_agent": CRAWLER}] * 2, **relay)
+    assert status_code == 202
+    assert (body["status"], body["filtered_count"]) == ("filtered", 2)
+
+    # Authenticated server batches are not filtered at all
+    api_key = website.organization.api_key
+    status_code, body = post_batch(
+        [{**item, "user_agent": CRAWLER}], HTTP_X_API_KEY=api_key, **relay
+    )
+    assert (status_code, body["filtered_count"]) == (201, 0)
+    assert PageView.objects.count() == 3
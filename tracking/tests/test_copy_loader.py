@@ -0,0 +1,79 @@
+import pytest
+
+from tracking.models import Event, PageView, Session
+from tracking.services import ingestion_service
+from tracking.services.copy_loader import CopyLoader, CopyStream
+from tracking.services.ingestion_service import IngestionService
+from tracking.services.tracking_service import build_hit
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+def test_copy_stream_escapes_text_format():
+    stream = CopyStream(iter([("a\tb", None, "line\nbreak", {"k": "v"})]))
+
+    assert stream.read(4) == b"a\\tb"
+    assert stream.read() == b'\t\\N\tline\\nbreak\t{"k": "v"}\n'
+    assert stream.read() == b""
+
+
+@pytest.mark.django_db
+def test_copy_loader_merges_sessions_pageviews_and_events():
+    website = WebsiteFactory()
+    existing = SessionFactory(website=website, session_id="s-1")
+    hits = (
+        build_hit("pageview", website.domain, f"s-{i % 2}", {"page_url": f"/p/{i}"})
+        for i in range(4)
+    )
+    hits = list(hits) + [
+        build_hit(
+            "event",
+            website.domain,
+            "s-1",
+            {"event_name": "signup", "event_data": {"plan": "pro\tplus"}},
+        ),
+        build_hit("pageview", "unknown.com", "s-9", {"page_url": "/"}),
+    ]
+
+    stats = CopyLoader().load(iter(hits))
+
+    assert stats["pageviews"] == 4
+    assert stats["events"] == 1
+    assert stats["skipped"] == 1
+    assert "rows_per_sec" in stats
+    assert Session.objects.filter(website=website).count() == 2
+    assert PageView.objects.filter(session=existing).count() == 2
+    assert Event.objects.get().event_data == {"plan": "pro\tplus"}
+
+
+@pytest.mark.django_db
+def test_drain_uses_copy_loader(settings, monkeypatch):
+    settings.TRACKING_INGESTION_MODE = "buffered"
+    settings.TRACKING_BUFFER_BACKEND = "local"
+    settings.TRACKING_BULK_LOADER = "copy"
+    monkeypatch.setattr(ingestion_service, "_buffer", None)
+    website = WebsiteFactory()
+    IngestionService.submit("pageview", website.domain, "s-1", {"page_url": "/"})
+    IngestionService.submit("pageview", "unknown.com", "s-2", {"page_url": "/"})
+
+    result = IngestionService.drain()
+
+    assert result == {"stored": 1, "failed": 1}
+    assert PageView.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_copy_loader_keeps_empty_strings():
+    website = WebsiteFactory()
+    hits = [
+        build_hit("pageview", website.domain, "s-1", {"page_url": "", "referrer": ""}),
+        build_hit(
+            "event", website.domain, "s-1", {"event_name": "e", "event_data": ""}
+        ),
+    ]
+
+    stats = CopyLoader().load(hits)
+
+    assert (stats["pageviews"], stats["events"]) == (1, 1)
+    pageview = PageView.objects.get()
+    assert (pageview.page_url, pageview.referrer, pageview.page_title) == ("", "", None)
+    assert Event.objects.get().event_data == ""
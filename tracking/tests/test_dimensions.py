@@ -0,0 +1,92 @@
+import pytest
+
+from tracking.dimensions import dimension_cache, dimension_id, resolve
+from tracking.models import PageTitle, PageUrl, PageView, UserAgent
+from tracking.services.copy_loader import CopyLoader
+from tracking.services.tracking_service import TrackingService, build_hit
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+def pageview_hits(domain, count):
+    return [
+        build_hit(
+            "pageview",
+            domain,
+            f"s-{i % 3}",
+            {"page_url": f"/p/{i % 2}", "page_title": "Home", "user_agent": "UA"},
+        )
+        for i in range(count)
+    ]
+
+
+def test_dimension_id_is_a_stable_signed_64_bit_hash():
+    assert dimension_id("/home") == dimension_id("/home")
+    assert dimension_id("/home") != dimension_id("/about")
+    assert -(2**63) <= dimension_id("/home") < 2**63
+    assert dimension_id(None) is None
+    assert dimension_id("") is not None
+
+
+@pytest.mark.django_db
+def test_pageview_stores_interned_ids():
+    session = SessionFactory()
+    for _ in range(2):
+        PageView.objects.create(
+            website=session.website,
+            session=session,
+            page_url="/home",
+            page_title="Home",
+            referrer="",
+        )
+
+    assert PageUrl.objects.get().value == "/home"
+    assert PageTitle.objects.count() == 1
+    pageview = PageView.objects.first()
+    assert pageview.page_url_ref_id == dimension_id("/home")
+    assert (pageview.page_url, pageview.page_title) == ("/home", "Home")
+    assert pageview.referrer == ""
+
+
+@pytest.mark.django_db
+def test_bulk_record_skips_values_interned_by_committed_batches(
+    django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    website = WebsiteFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        TrackingService.bulk_record(pageview_hits(website.domain, 10))
+
+    assert PageUrl.objects.count() == 2
+    assert UserAgent.objects.count() == 1
+    # Savepoint, session upsert, page views; no lookup-table upsert
+    with django_assert_num_queries(4):
+        TrackingService.bulk_record(pageview_hits(website.domain, 10))
+    assert PageView.objects.count() == 20
+
+
+@pytest.mark.django_db
+def test_copy_loader_interns_pageview_text(django_capture_on_commit_callbacks):
+    website = WebsiteFactory()
+    with django_capture_on_commit_callbacks(execute=True):
+        CopyLoader().load(pageview_hits(website.domain, 6))
+    # Known values are not staged again, the ids still resolve
+    CopyLoader().load(pageview_hits(website.domain, 6))
+
+    assert PageView.objects.count() == 12
+    assert set(PageView.objects.values_list("page_url_ref", flat=True)) == {
+        dimension_id("/p/0"),
+        dimension_id("/p/1"),
+    }
+    assert {pageview.page_title for pageview in PageView.objects.all()} == {"Home"}
+
+
+@pytest.mark.django_db
+def test_resolve_reads_missing_ids_once(django_assert_num_queries):
+    PageUrl.objects.create(id=dimension_id("/a"), value="/a")
+    dimension_cache.clear()
+
+    with django_assert_num_queries(1):
+        assert resolve(PageUrl, [dimension_id("/a"), None]) == {
+            dimension_id("/a"): "/a"
+        }
+    with django_assert_num_queries(0):
+        resolve(PageUrl, [dimension_id("/a")])
@@ -0,0 +1,152 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from reporting.services.analytics_service import AnalyticsService
+from tracking.models import Event, EventProperty, EventSchema
+from tracking.services.copy_loader import CopyLoader
+from tracking.services.ingestion_service import IngestionService
+from tracking.services.tracking_service import build_hit
+from tracking.tests.factories.factories import WebsiteFactory
+
+CHECKOUT_PROPERTIES = {
+    "plan": {"type": "string", "required": True, "promoted": True},
+    "amount": {"type": "number", "required": False, "promoted": True},
+    "coupon": {"type": "string", "required": False, "promoted": False},
+}
+
+
+def checkout(website, **event_data):
+    return {
+        "type": "event",
+        "domain": website.domain,
+        "session_id": "s-1",
+        "event_name": "checkout",
+        "event_data": event_data,
+    }
+
+
+@pytest.mark.django_db
+def test_events_failing_their_schema_are_rejected():
+    website = WebsiteFactory()
+    EventSchema.objects.create(
+        website=website,
+        event_name="checkout",
+        properties=CHECKOUT_PROPERTIES,
+        strict=True,
+    )
+
+    result = IngestionService.submit(
+        "event",
+        website.domain,
+        "s-1",
+        {"event_name": "checkout", "event_data": {"amount": "12"}},
+    )
+
+    assert result == {
+        "error": {"event_data": ["plan is required", "amount must be a number"]}
+    }
+    assert not Event.objects.exists()
+
+    items = [
+        checkout(website, plan="pro", amount=12),
+        checkout(website, plan="pro", referrer="ad"),
+        {
+            "type": "event",
+            "domain": website.domain,
+            "session_id": "s-1",
+            "event_name": "signup",
+            "event_data": {"anything": 1},
+        },
+    ]
+    result = IngestionService.submit_batch(items)
+
+    assert result["successful_count"] == 2
+    assert result["errors"] == [
+        {"error": {"event_data": ["referrer is not declared"]}, "item": items[1]}
+    ]
+
+
+@pytest.mark.django_db
+def test_promoted_properties_are_written_with_the_events():
+    website = WebsiteFactory()
+    EventSchema.objects.create(
+        website=website, event_name="checkout", properties=CHECKOUT_PROPERTIES
+    )
+
+    IngestionService.submit_batch(
+        [
+            checkout(website, plan="pro", amount=12.5, coupon="X"),
+            checkout(website, plan="team", amount=40),
+        ]
+    )
+    CopyLoader().load(
+        [
+            build_hit(
+                "event",
+                website.domain,
+                "s-2",
+                {"event_name": "checkout", "event_data": {"plan": "pro"}},
+            )
+        ]
+    )
+
+    rows = EventProperty.objects.order_by("event_id", "name").values_list(
+        "name", "string_value", "number_value"
+    )
+    assert list(rows) == [
+        ("amount", None, 12.5),
+        ("plan", "pro", None),
+        ("amount", None, 40.0),
+        ("plan", "team", None),
+        ("plan", "pro", None),
+    ]
+
+    breakdown = AnalyticsService.get_event_property_breakdown(
+        website.organization, website.id, "checkout", "plan"
+    )
+    assert breakdown == [
+        {"value": "pro", "count": 2, "sampled": False},
+        {"value": "team", "count": 1, "sampled": False},
+    ]
+
+
+@pytest.mark.django_db
+def test_schemas_are_managed_per_website(django_user_model, settings):
+    settings.EVENT_SCHEMA_MAX_PROMOTED = 1
+    website = WebsiteFactory()
+    user = django_user_model.objects.create_user(
+        username="owner",
+        email="owner@test.com",
+        password="pass",
+        organization=website.organization,
+    )
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse("event-schema-list-create", args=[website.id])
+
+    response = client.post(
+        url,
+        {
+            "event_name": "signup",
+            "properties": {"plan": "string", "seats": "number"},
+        },
+        format="json",
+    )
+
+    assert response.status_code == 201
+    assert response.data["properties"] == {
+        "plan": {"type": "string", "required": False, "promoted": True},
+        "seats": {"type": "number", "required": False, "promoted": False},
+    }
+
+    response = client.post(
+        url,
+        {"event_name": "invite", "properties": {"role": {"type": "date"}}},
+        format="json",
+    )
+    assert response.status_code == 400
+
+    other = WebsiteFactory()
+    response = client.get(reverse("event-schema-list-create", args=[other.id]))
+    assert response.status_code == 404
@@ -0,0 +1,107 @@
+import io
+import json
+
+import pytest
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from silk.models import Request as SilkRequest
+
+from analytics_core.handlers import (
+    TrackingWSGIHandler,
+    WSGIDispatcher,
+    get_wsgi_application,
+)
+from tracking.models import PageView, Session
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.fixture
+def application():
+    # Like Django's test client, keep the test transaction's connection open
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    yield get_wsgi_application()
+    request_started.connect(close_old_connections)
+    request_finished.connect(close_old_connections)
+
+
+def call(application, path, payload):
+    body = json.dumps(payload).encode()
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": path,
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "REMOTE_ADDR": "1.2.3.4",
+        "HTTP_USER_AGENT": "Mozilla/5.0 (iPhone)",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.url_scheme": "http",
+    }
+    status = []
+    chunks = application(environ, lambda s, headers: status.append(s))
+    return int(status[0].split()[0]), json.loads(b"".join(chunks) or b"null")
+
+
+@pytest.mark.django_db
+def test_tracking_requests_use_the_lean_handler(application):
+    assert isinstance(application, WSGIDispatcher)
+    website = WebsiteFactory()
+
+    status, data = call(
+        application,
+        "/api/tracking/v1/pageview/",
+        {"domain": website.domain, "session_id": "s-1", "page_url": "/home"},
+    )
+
+    assert status == 201
+    assert data == {"status": "ok"}
+    pageview = PageView.objects.get()
+    assert pageview.ip_address == "1.2.3.4"
+    assert pageview.user_agent == "Mozilla/5.0 (iPhone)"
+    assert not SilkRequest.objects.exists()
+
+
+@pytest.mark.django_db
+def test_lean_handler_keeps_the_error_contract(application):
+    status, data = call(application, "/api/tracking/v1/event/", {"domain": "a.com"})
+
+    assert status == 400
+    assert data == {
+        "session_id": ["This field is required."],
+        "event_name": ["This field is required."],
+    }
+
+
+@pytest.mark.django_db
+def test_other_tracking_routes_use_the_regular_handler(application):
+    website = WebsiteFactory()
+
+    status, data = call(
+        application,
+        "/api/tracking/v1/session/start/",
+        {"domain": website.domain, "session_id": "abc"},
+    )
+
+    assert status == 201
+    assert data["device_type"] == "mobile"
+    assert Session.objects.filter(session_id="abc").exists()
+    # Served with the full MIDDLEWARE chain, silk included
+    assert SilkRequest.objects.exists()
+
+
+def test_lean_handler_leaves_the_global_middleware_alone():
+    middleware = list(settings.MIDDLEWARE)
+
+    handler = TrackingWSGIHandler()
+
+    assert settings.MIDDLEWARE == middleware
+    names = []
+    chain = handler._middleware_chain
+    while hasattr(chain.__wrapped__, "get_response"):
+        middleware = type(chain.__wrapped__)
+        names.append(f"{middleware.__module__}.{middleware.__name__}")
+        chain = chain.__wrapped__.get_response
+    assert names == settings.TRACKING_MIDDLEWARE
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tracking.models import Session
+from tracking.tests.factories.factories import WebsiteFactory
+from tracking.utils import geoip
+
+# Tiny GeoLite2-Country style database: 81.2.69.0/24 -> GB,
+# 203.0.113.0/24 -> US, 2001:db8::/32 -> DE (registered country only)
+TEST_DATABASE = Path(__file__).parent / "data" / "geoip-test.mmdb"
+
+
+@pytest.fixture
+def geoip_database(settings):
+    settings.GEOIP_DATABASE_PATH = str(TEST_DATABASE)
+    geoip.reset()
+    yield
+    geoip.reset()
+
+
+def test_lookup_country_reads_the_local_database(geoip_database):
+    assert geoip.lookup_country("81.2.69.160") == "GB"
+    assert geoip.lookup_country(" 2001:db8::1 ") == "DE"
+    assert geoip.lookup_country("8.8.8.8") == ""
+    assert geoip.lookup_country("not-an-ip") == ""
+    assert geoip.lookup_country(None) == ""
+
+    geoip.lookup_country("81.2.69.160")
+    assert geoip._lookup.cache_info().hits == 1
+
+
+def test_lookup_is_disabled_without_a_database(settings):
+    settings.GEOIP_DATABASE_PATH = ""
+    geoip.reset()
+
+    assert geoip.get_reader() is None
+    assert geoip.lookup_country("81.2.69.160") == ""
+    geoip.reset()
+
+
+@pytest.mark.django_db
+def test_batch_tracking_fills_countries_from_item_ips(geoip_database):
+    website = WebsiteFactory()
+    payload = [
+        {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": "gb",
+            "page_url": "/",
+            "ip_address": "81.2.69.160",
+        },
+        {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": "us",
+            "page_url": "/",
+            "ip_address": "203.0.113.9",
+        },
+        {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": "fr",
+            "page_url": "/",
+            "ip_address": "81.2.69.161",
+            "country": "FR",
+        },
+    ]
+
+    response = APIClient().post(
+        reverse("tracking:api-v1:batch-tracking"), data=payload, format="json"
+    )
+
+    assert response.status_code == 201
+    assert dict(Session.objects.values_list("session_id", "country")) == {
+        "gb": "GB",
+        "us": "US",
+        "fr": "FR",
+    }
+
+
+@pytest.mark.django_db
+def test_page_views_skip_the_lookup(monkeypatch):
+    def lookup(ip_address):
+        raise AssertionError("Page views store no country")
+
+    monkeypatch.setattr("tracking.utils.common.lookup_country", lookup)
+    website = WebsiteFactory()
+    client = APIClient()
+
+    response = client.post(
+        reverse("tracking:api-v1:track-pageview"),
+        data={"domain": website.domain, "session_id": "s", "page_url": "/"},
+        format="json",
+    )
+    assert response.status_code == 201
+    response = client.get(
+        reverse("tracking:api-v1:track-pixel"), {"d": website.domain, "u": "/"}
+    )
+    assert response.status_code == 200
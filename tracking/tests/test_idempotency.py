@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tracking.models import PageView
+from tracking.tests.factories.factories import WebsiteFactory
+from tracking.utils.idempotency import claim_event_ids
+
+
+@pytest.mark.django_db
+def test_pageviews_without_event_id_are_all_stored():
+    website = WebsiteFactory()
+    client = APIClient()
+    url = reverse("tracking:api-v1:track-pageview")
+    for page in ("/a", "/b"):
+        payload = {"domain": website.domain, "session_id": "s-1", "page_url": page}
+        assert client.post(url, data=payload, format="json").status_code == 201
+
+    assert PageView.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_retried_pageview_is_dropped():
+    website = WebsiteFactory()
+    client = APIClient()
+    url = reverse("tracking:api-v1:track-pageview")
+    payload = {
+        "domain": website.domain,
+        "session_id": "s-1",
+        "page_url": "/a",
+        "event_id": str(uuid.uuid4()),
+    }
+
+    first = client.post(url, data=payload, format="json")
+    retry = client.post(url, data=payload, format="json")
+
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.data["status"] == "duplicate"
+    assert PageView.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_batch_drops_duplicates_within_and_across_requests():
+    website = WebsiteFactory()
+    event_id = str(uuid.uuid4())
+    payload = [
+        {
+            "domain": website.domain,
+            "session_id": "s-1",
+            "page_url": "/a",
+            "event_id": event_id,
+        },
+        {
+            "domain": website.domain,
+            "session_id": "s-1",
+            "page_url": "/a",
+            "event_id": event_id,
+        },
+        {"domain": website.domain, "session_id": "s-1", "page_url": "/b"},
+    ]
+    client = APIClient()
+    url = reverse("tracking:api-v1:batch-tracking")
+
+    response = client.post(url, data=payload, format="json")
+
+    assert response.status_code == 201
+    assert response.data["successful_count"] == 2
+    assert response.data["duplicate_count"] == 1
+    assert claim_event_ids([(website.domain, event_id)]) == [False]
@@ -0,0 +1,95 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tracking.models import Event, PageView, Session
+from tracking.services import ingestion_service
+from tracking.services.ingestion_service import IngestionService
+from tracking.services.tracking_service import build_hit
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.fixture
+def buffered(settings, monkeypatch):
+    settings.TRACKING_INGESTION_MODE = "buffered"
+    settings.TRACKING_BUFFER_BACKEND = "local"
+    monkeypatch.setattr(ingestion_service, "_buffer", None)
+
+
+@pytest.mark.django_db
+def test_buffered_pageview_is_queued_then_drained(buffered):
+    website = WebsiteFactory()
+    client = APIClient()
+    url = reverse("tracking:api-v1:track-pageview")
+    payload = {"domain": website.domain, "session_id": "s-1", "page_url": "/home"}
+
+    response = client.post(url, data=payload, format="json")
+
+    assert response.status_code == 202
+    assert response.data["status"] == "queued"
+    assert not PageView.objects.exists()
+
+    result = IngestionService.drain()
+
+    assert result == {"stored": 1, "failed": 0}
+    pageview = PageView.objects.get()
+    assert pageview.page_url == "/home"
+    assert pageview.session.session_id == "s-1"
+
+
+@pytest.mark.django_db
+def test_drain_bulk_writes_and_drops_unknown_domains(buffered):
+    website = WebsiteFactory()
+    for i in range(3):
+        IngestionService.submit(
+            "pageview", website.domain, "s-1", {"page_url": f"/page/{i}"}
+        )
+    IngestionService.submit("event", website.domain, "s-2", {"event_name": "click"})
+    IngestionService.submit("pageview", "unknown.com", "s-3", {"page_url": "/"})
+
+    result = IngestionService.drain(batch_size=100)
+
+    assert result == {"stored": 4, "failed": 1}
+    assert PageView.objects.count() == 3
+    assert Event.objects.count() == 1
+    assert Session.objects.filter(website=website).count() == 2
+    assert ingestion_service.get_ingestion_buffer().length() == 0
+
+
+@pytest.mark.django_db
+def test_drain_dead_letters_hits_the_database_rejects(buffered):
+    website = WebsiteFactory()
+    buffer = ingestion_service.get_ingestion_buffer()
+    buffer.push(
+        [
+            build_hit("pageview", website.domain, f"s-{i}", {"page_url": "/"}, session)
+            for i, session in enumerate(
+                [{}, {"ip_address": "not-an-ip"}, {"country": "USA"}, {}]
+            )
+        ]
+    )
+
+    result = IngestionService.drain(batch_size=100)
+
+    assert result["stored"] == 2
+    assert result["failed"] == 2
+    assert [hit["session_id"] for hit in buffer.dead] == ["s-1", "s-2"]
+    assert buffer.length() == 0
+    assert IngestionService.drain() == {"stored": 0, "failed": 0}
+    assert PageView.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_buffered_pageview_with_a_malformed_ip_is_rejected(buffered):
+    website = WebsiteFactory()
+    client = APIClient(HTTP_X_FORWARDED_FOR="unknown", REMOTE_ADDR="10.0.0.1")
+    url = reverse("tracking:api-v1:track-pageview")
+    payload = {"domain": website.domain, "session_id": "s-1", "page_url": "/"}
+
+    response = client.post(url, data={**payload, "ip_address": "not-an-ip"})
+    assert response.status_code == 400
+
+    response = client.post(url, data=payload, format="json")
+    assert response.status_code == 202
+    [(_, hit)] = ingestion_service.get_ingestion_buffer().read(10)
+    assert hit["data"]["ip_address"] == "10.0.0.1"
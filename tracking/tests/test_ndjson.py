@@ -0,0 +1,120 @@
+import gzip
+import io
+import json
+
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from tracking.api.v1 import fast_views
+from tracking.models import Event, PageView
+from tracking.tests.factories.factories import WebsiteFactory
+from tracking.utils.ndjson import iter_ndjson
+
+
+def ndjson(items):
+    return "".join(
+        item if isinstance(item, str) else json.dumps(item) + "\n" for item in items
+    ).encode()
+
+
+def test_iter_ndjson_reports_bad_and_oversized_lines():
+    body = b'{"a": 1}\n\nnot json\n' + b'{"b": "' + b"x" * 100 + b'"}\n{"c": 3}'
+
+    rows = list(iter_ndjson(io.BytesIO(body), max_line_bytes=50))
+
+    assert rows == [
+        (1, {"a": 1}, None),
+        (3, None, "Invalid JSON"),
+        (4, None, "Line too long"),
+        (5, {"c": 3}, None),
+    ]
+
+
+@pytest.mark.django_db
+def test_ndjson_batch_is_written_in_chunks(settings):
+    settings.TRACKING_NDJSON_CHUNK_SIZE = 2
+    website = WebsiteFactory()
+    body = ndjson(
+        [
+            {
+                "type": "pageview",
+                "domain": website.domain,
+                "session_id": "s-1",
+                "page_url": "/a",
+            },
+            {
+                "type": "pageview",
+                "domain": website.domain,
+                "session_id": "s-1",
+                "page_url": "/b",
+            },
+            "{broken\n",
+            {
+                "type": "event",
+                "domain": website.domain,
+                "session_id": "s-2",
+                "event_name": "x",
+            },
+            {
+                "type": "pageview",
+                "domain": "unknown.com",
+                "session_id": "s-3",
+                "page_url": "/",
+            },
+            {"type": "pageview", "domain": website.domain, "session_id": "s-1"},
+        ]
+    )
+
+    response = APIClient().post(
+        reverse("tracking:api-v1:batch-tracking"),
+        data=body,
+        content_type="application/x-ndjson",
+    )
+
+    assert response.status_code == 207
+    assert response.data["successful_count"] == 3
+    assert response.data["line_count"] == 6
+    assert sorted(error["line"] for error in response.data["errors"]) == [3, 5, 6]
+    assert PageView.objects.count() == 2
+    assert Event.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_gzip_ndjson_batch_on_fast_path():
+    website = WebsiteFactory()
+    body = gzip.compress(
+        ndjson(
+            {
+                "type": "pageview",
+                "domain": website.domain,
+                "session_id": "s",
+                "page_url": f"/{i}",
+            }
+            for i in range(50)
+        )
+    )
+    request = RequestFactory().post(
+        "/api/tracking/v1/batch/",
+        data=body,
+        content_type="application/x-ndjson",
+        HTTP_CONTENT_ENCODING="gzip",
+    )
+
+    response = fast_views.batch(request)
+
+    assert response.status_code == 201
+    assert json.loads(response.content)["successful_count"] == 50
+    assert PageView.objects.count() == 50
+
+
+def test_unsupported_content_encoding_is_rejected():
+    request = RequestFactory().post(
+        "/api/tracking/v1/batch/",
+        data=b"{}",
+        content_type="application/x-ndjson",
+        HTTP_CONTENT_ENCODING="br",
+    )
+
+    assert fast_views.batch(request).status_code == 415
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from tracking import partitions
+from tracking.models import Event, PageView
+from tracking.tests.factories.factories import SessionFactory
+from tracking.utils.common import day_bounds
+
+FAR_FUTURE = datetime(2090, 3, 14, 12, tzinfo=dt_timezone.utc)
+
+
+def partition_of(table, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT tableoid::regclass::text FROM {table} WHERE id = %s", [pk]
+        )
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_tables_are_partitioned_ahead_of_time():
+    names = {p.name for p in partitions.list_partitions("page_views")}
+    current = partitions.interval_start(datetime.now(dt_timezone.utc), "month")
+    upcoming = partitions.next_interval(current, "month")
+
+    assert partitions.partition_name("page_views", current, "month") in names
+    assert partitions.partition_name("page_views", upcoming, "month") in names
+    assert {p.name for p in partitions.list_partitions("events")} == {
+        name.replace("page_views", "events") for name in names
+    }
+
+    session = SessionFactory()
+    pageview = PageView.objects.create(
+        website=session.website, session=session, page_url="/"
+    )
+    assert partition_of("page_views", pageview.id) == partitions.partition_name(
+        "page_views", current, "month"
+    )
+
+
+@pytest.mark.django_db
+def test_new_partitions_take_over_rows_from_the_default_partition():
+    session = SessionFactory()
+    event = Event.objects.create(
+        website=session.website,
+        session=session,
+        event_name="late",
+        timestamp=FAR_FUTURE,
+    )
+    assert partition_of("events", event.id) == "events_default"
+
+    created = partitions.ensure_partitions(
+        "events", FAR_FUTURE, FAR_FUTURE + timedelta(hours=1), interval="day"
+    )
+
+    assert created == ["events_p20900314"]
+    assert partition_of("events", event.id) == "events_p20900314"
+    assert Event.objects.get(timestamp__gte=FAR_FUTURE).event_name == "late"
+    # Already covered ranges are skipped
+    assert (
+        partitions.ensure_partitions(
+            "events", FAR_FUTURE, FAR_FUTURE + timedelta(hours=1), interval="month"
+        )
+        == []
+    )
+
+
+@pytest.mark.django_db
+def test_maintenance_detaches_expired_partitions(settings):
+    settings.TRACKING_PARTITION_INTERVAL = "day"
+    past = datetime(2001, 5, 1, tzinfo=dt_timezone.utc)
+    partitions.ensure_partitions("page_views", past, past + timedelta(days=2))
+
+    call_command("maintain_partitions", premake=1, detach_after_days=30)
+
+    names = {p.name for p in partitions.list_partitions("page_views")}
+    assert "page_views_p20010501" not in names
+    tomorrow = partitions.next_interval(
+        partitions.interval_start(datetime.now(dt_timezone.utc), "day"), "day"
+    )
+    remaining = partitions.list_partitions("page_views")
+    assert any(p.start <= tomorrow < p.end for p in remaining)
+
+
+@pytest.mark.django_db
+def test_partitions_are_detached_only_once_archived(settings):
+    settings.TRACKING_ARCHIVE_AFTER_DAYS = 30
+    past = datetime(2001, 5, 1, tzinfo=dt_timezone.utc)
+    partitions.ensure_partitions("page_views", past, past + timedelta(days=2), "day")
+    session = SessionFactory()
+    PageView.objects.create(
+        website=session.website, session=session, page_url="/", timestamp=past
+    )
+
+    detached = partitions.detach_partitions("page_views", past + timedelta(days=2))
+
+    assert detached == ["page_views_p20010502"]
+    assert PageView.objects.filter(timestamp=past).exists()
+
+
+@pytest.mark.django_db
+def test_day_range_filters_prune_partitions():
+    start, end = day_bounds(datetime.now(dt_timezone.utc).date())
+    plan = PageView.objects.filter(timestamp__gte=start, timestamp__lt=end).explain()
+
+    current = partitions.interval_start(start, "month")
+    assert partitions.partition_name("page_views", current, "month") in plan
+    assert "page_views_default" not in plan
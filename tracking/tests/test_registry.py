@@ -0,0 +1,68 @@
+import pytest
+
+from analytics_core.handlers import get_wsgi_application
+from tracking.registry import WebsiteEntry, website_registry
+from tracking.tests.factories.factories import WebsiteFactory
+
+
+@pytest.fixture
+def fetch_calls(monkeypatch):
+    calls = []
+    fetch = website_registry._fetch
+
+    def recording_fetch(domains):
+        calls.append(list(domains))
+        return fetch(domains)
+
+    monkeypatch.setattr(website_registry, "_fetch", recording_fetch)
+    return calls
+
+
+@pytest.mark.django_db
+def test_registry_serves_lookups_from_memory(django_assert_num_queries):
+    website = WebsiteFactory()
+    website_registry.load()
+
+    with django_assert_num_queries(0):
+        entry = website_registry.get_active(website.domain)
+
+    assert entry == WebsiteEntry(website.id, website.organization_id, True)
+
+
+@pytest.mark.django_db
+def test_web_workers_start_with_a_warm_registry(django_assert_num_queries):
+    website = WebsiteFactory()
+
+    get_wsgi_application()
+
+    with django_assert_num_queries(0):
+        assert website_registry.get_active(website.domain).website_id == website.id
+
+
+@pytest.mark.django_db
+def test_registry_caches_unknown_domains(fetch_calls):
+    website_registry.load()
+
+    assert website_registry.get("missing.com") is None
+    assert website_registry.get("missing.com") is None
+    assert fetch_calls == [["missing.com"]]
+
+
+@pytest.mark.django_db
+def test_registry_is_invalidated_on_save_and_delete():
+    website = WebsiteFactory()
+    assert website_registry.get_active(website.domain) is not None
+
+    website.is_active = False
+    website.save()
+    assert website_registry.get_active(website.domain) is None
+
+    old_domain = website.domain
+    website.is_active = True
+    website.domain = "renamed.com"
+    website.save()
+    assert website_registry.get(old_domain) is None
+    assert website_registry.get_active("renamed.com").website_id == website.id
+
+    website.delete()
+    assert website_registry.get("renamed.com") is None
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+import pytest
+from django.utils import timezone
+
+from tracking import partitions
+from tracking.models import (
+    DailyWebsiteStats,
+    Event,
+    EventProperty,
+    PageView,
+    RetentionProgress,
+    Session,
+)
+from tracking.retention import apply_retention
+from tracking.tests.factories.factories import OrganizationFactory, WebsiteFactory
+
+
+@pytest.fixture(autouse=True)
+def retention_settings(settings):
+    settings.TRACKING_RAW_RETENTION_DAYS = 90
+    settings.TRACKING_AGGREGATE_RETENTION_DAYS = 0
+    settings.TRACKING_RETENTION_PAUSE = 0
+
+
+def visit(website, session_id, when):
+    session = Session.objects.create(website=website, session_id=session_id)
+    # started_at is auto_now_add
+    Session.objects.filter(pk=session.pk).update(started_at=when, last_seen_at=when)
+    PageView.objects.create(
+        website=website, session=session, page_url="/", timestamp=when
+    )
+    event = Event.objects.create(
+        website=website, session=session, event_name="signup", timestamp=when
+    )
+    EventProperty.objects.create(
+        event=event,
+        website=website,
+        event_name="signup",
+        name="plan",
+        string_value="pro",
+        timestamp=when,
+    )
+    return session
+
+
+@pytest.mark.django_db
+def test_raw_and_aggregate_windows_apply_per_organization():
+    now = timezone.now()
+    short = WebsiteFactory(
+        organization=OrganizationFactory(
+            raw_retention_days=30, aggregate_retention_days=365
+        )
+    )
+    default = WebsiteFactory()
+    for website in (short, default):
+        visit(website, "old", now - timedelta(days=60))
+        visit(website, "new", now - timedelta(days=1))
+        DailyWebsiteStats.objects.create(
+            website=website, date=(now - timedelta(days=400)).date()
+        )
+
+    stats = apply_retention()
+
+    assert stats["complete"]
+    assert stats["deleted"]["page_views"] == 1
+    remaining = Session.objects.filter(website=short)
+    assert list(remaining.values_list("session_id", flat=True)) == ["new"]
+    assert Session.objects.filter(website=default).count() == 2
+    assert Event.objects.filter(website=short).count() == 1
+    assert EventProperty.objects.filter(website=short).count() == 1
+    assert not DailyWebsiteStats.objects.filter(website=short).exists()
+    assert DailyWebsiteStats.objects.filter(website=default).exists()
+    progress = RetentionProgress.objects.get(website=short, table="page_views")
+    assert progress.last_key is None and progress.completed_at is not None
+
+
+@pytest.mark.django_db
+def test_interrupted_passes_resume_from_their_keyset_position(settings):
+    settings.TRACKING_RETENTION_BATCH_SIZE = 1
+    website = WebsiteFactory(organization=OrganizationFactory(raw_retention_days=7))
+    old = timezone.now() - timedelta(days=30)
+    for i in range(3):
+        visit(website, f"s-{i}", old + timedelta(minutes=i))
+
+    stats = apply_retention(max_seconds=0)
+
+    assert not stats["complete"]
+    assert PageView.objects.count() == 2
+    progress = RetentionProgress.objects.get(table="page_views")
+    assert progress.last_key == old and progress.deleted == 1
+
+    stats = apply_retention()
+
+    assert stats["complete"]
+    assert not PageView.objects.exists()
+    assert not Session.objects.exists()
+
+
+@pytest.mark.django_db
+def test_partitions_past_every_window_are_dropped():
+    WebsiteFactory(organization=OrganizationFactory(raw_retention_days=30))
+    past = datetime(2001, 5, 1, tzinfo=dt_timezone.utc)
+    partitions.ensure_partitions("events", past, past + timedelta(days=1), "month")
+    website = WebsiteFactory()
+    visit(website, "ancient", past + timedelta(hours=1))
+
+    stats = apply_retention()
+
+    assert "events_p200105" in stats["dropped_partitions"]
+    assert "events_p200105" not in {
+        p.name for p in partitions.list_partitions("events")
+    }
+    assert not Event.objects.exists()
+    assert not EventProperty.objects.exists()
+    assert not Session.objects.exists()
+
+
+@pytest.mark.django_db
+def test_detached_partitions_past_every_window_are_dropped():
+    past = datetime(2001, 5, 1, tzinfo=dt_timezone.utc)
+    partitions.ensure_partitions("page_views", past, past + timedelta(days=2), "day")
+    WebsiteFactory()
+    assert partitions.detach_partitions("page_views", past + timedelta(days=1)) == [
+        "page_views_p20010501"
+    ]
+    assert partitions.list_detached("page_views") == [
+        partitions.Partition("page_views_p20010501", past, past + timedelta(days=1))
+    ]
+
+    stats = apply_retention()
+
+    assert "page_views_p20010501" in stats["dropped_partitions"]
+    assert "page_views_p20010502" in stats["dropped_partitions"]
+    assert partitions.list_detached("page_views") == []
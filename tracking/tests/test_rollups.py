@@ -0,0 +1,202 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connections
+from django.utils import timezone
+
+from reporting.services.analytics_service import AnalyticsService
+from tracking import rollups
+from tracking.dimensions import intern_instances
+from tracking.models import (
+    DailyWebsiteStats,
+    Event,
+    HourlyWebsiteStats,
+    PageView,
+    RollupWatermark,
+    Session,
+)
+from tracking.tasks import aggregate_daily_stats
+from tracking.tests.factories.factories import WebsiteFactory
+from tracking.utils import hll
+
+
+def visit(website, session_id, when, pageviews=1):
+    session = Session.objects.create(website=website, session_id=session_id)
+    # started_at is auto_now_add
+    Session.objects.filter(pk=session.pk).update(started_at=when, last_seen_at=when)
+    for _ in range(pageviews):
+        PageView.objects.create(
+            website=website, session=session, page_url="/", timestamp=when
+        )
+    return session
+
+
+def roll_up():
+    """Run the rollup twice: the first run only records the bound"""
+    rollups.rollup_hourly_stats()
+    rollups.rollup_hourly_stats()
+
+
+@pytest.mark.django_db
+def test_rollup_folds_new_rows_into_their_hour():
+    website = WebsiteFactory()
+    hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(
+        hours=3
+    )
+    first = visit(website, "a", hour + timedelta(minutes=5), pageviews=2)
+    visit(website, "b", hour + timedelta(minutes=50))
+    Event.objects.create(
+        website=website, session=first, event_name="signup", timestamp=hour
+    )
+
+    rollups.rollup_hourly_stats()
+    # Ids drawn by inserts that have no xid yet are covered by waiting a run
+    assert not HourlyWebsiteStats.objects.exists()
+    rollups.rollup_hourly_stats()
+    row = HourlyWebsiteStats.objects.get()
+    assert (row.hour, row.pageviews, row.sessions, row.events) == (hour, 3, 2, 1)
+    assert round(hll.estimate(row.visitors_sketch)) == 2
+
+    # A late hit for the same hour is added on the next run, once
+    visit(website, "c", hour + timedelta(minutes=30))
+    roll_up()
+    roll_up()
+
+    row.refresh_from_db()
+    assert (row.pageviews, row.sessions) == (4, 3)
+    assert round(hll.estimate(row.visitors_sketch)) == 3
+    assert RollupWatermark.objects.get(table="page_views").last_id == (
+        PageView.objects.order_by("-id").values_list("id", flat=True).first()
+    )
+
+
+@pytest.mark.django_db
+def test_rollup_waits_for_transactions_running_when_it_read_the_sequence():
+    website = WebsiteFactory()
+    now = timezone.now()
+    visit(website, "a", now)
+    other = connections.create_connection("default")
+    try:
+        # A concurrent writer that may still commit rows with lower ids
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute("SELECT pg_current_xact_id()")
+
+        rollups.rollup_hourly_stats()
+        mark = RollupWatermark.objects.get(table="page_views")
+        assert mark.last_id == 0
+        assert mark.pending_id == PageView.objects.get().id
+        assert not HourlyWebsiteStats.objects.exists()
+        assert not rollups.caught_up(now)
+    finally:
+        other.rollback()
+        other.close()
+
+    visit(website, "b", now)
+    rollups.rollup_hourly_stats()
+    # The writer has finished: fold up to the id recorded while it ran
+    assert HourlyWebsiteStats.objects.get().pageviews == 1
+    rollups.rollup_hourly_stats()
+
+    assert HourlyWebsiteStats.objects.get().pageviews == 2
+    assert rollups.caught_up(now)
+
+
+@pytest.mark.django_db
+def test_real_time_stats_add_the_raw_tail_to_hourly_rows():
+    website = WebsiteFactory()
+    now = timezone.now()
+    visit(website, "a", now, pageviews=2)
+    roll_up()
+    # Only the hourly row is read for rows behind the watermark
+    HourlyWebsiteStats.objects.update(pageviews=10)
+    visit(website, "b", now)
+
+    data = AnalyticsService.get_real_time_stats(website.organization, website.id)
+
+    assert data["pageviews_today"] == 11
+    assert data["sessions_today"] == 2
+    series = AnalyticsService.get_intraday_series(website.organization, website.id)
+    assert len(series) == now.hour + 1
+    assert series[-1]["pageviews"] == 11
+
+
+@pytest.mark.django_db
+def test_daily_stats_are_derived_from_hourly_rows():
+    website = WebsiteFactory()
+    yesterday = timezone.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timedelta(days=1)
+    session = visit(website, "a", yesterday + timedelta(hours=1))
+    PageView.objects.create(
+        website=website,
+        session=session,
+        page_url="/",
+        timestamp=yesterday + timedelta(hours=5),
+    )
+    visit(website, "b", yesterday + timedelta(hours=5))
+    roll_up()
+    assert rollups.caught_up(yesterday + timedelta(days=1))
+    # Raw rows are no longer read for the day
+    HourlyWebsiteStats.objects.filter(hour=yesterday + timedelta(hours=5)).update(
+        pageviews=7
+    )
+
+    aggregate_daily_stats()
+
+    stats = DailyWebsiteStats.objects.get(website=website)
+    assert (stats.pageviews, stats.unique_visitors, stats.sessions) == (8, 2, 2)
+
+
+@pytest.mark.django_db
+def test_daily_events_match_with_and_without_the_rollup():
+    website = WebsiteFactory()
+    yesterday = timezone.now().replace(
+        hour=0, minute=0, second=0, microsecond=0
+    ) - timedelta(days=1)
+    session = visit(website, "a", yesterday + timedelta(hours=2))
+    for name in ("signup", "click"):
+        Event.objects.create(
+            website=website,
+            session=session,
+            event_name=name,
+            timestamp=yesterday + timedelta(hours=3),
+        )
+    Event.objects.create(
+        website=website,
+        session=session,
+        event_name="sampled",
+        timestamp=yesterday + timedelta(hours=4),
+        sample_rate=0.5,
+    )
+
+    # Raw scan: the rollup has not run yet
+    assert not rollups.caught_up(yesterday + timedelta(days=1))
+    aggregate_daily_stats()
+    stats = DailyWebsiteStats.objects.get(website=website)
+    assert (stats.pageviews, stats.events) == (1, 4)
+
+    roll_up()
+    aggregate_daily_stats()
+    stats.refresh_from_db()
+    assert (stats.pageviews, stats.events) == (1, 4)
+
+
+@pytest.mark.django_db
+def test_visitor_sketch_estimates_large_counts():
+    website = WebsiteFactory()
+    now = timezone.now()
+    sessions = Session.objects.bulk_create(
+        Session(website=website, session_id=f"s-{n}") for n in range(3000)
+    )
+    pageviews = [
+        PageView(website=website, session=session, page_url="/", timestamp=now)
+        for session in sessions
+    ]
+    intern_instances(pageviews)
+    PageView.objects.bulk_create(pageviews)
+
+    roll_up()
+
+    visitors = rollups.hourly_totals([website.id], now - timedelta(hours=1))["visitors"]
+    assert 2700 < visitors < 3300
@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from tracking.models import DailyWebsiteStats, PageStats, PageView, Session
+from tracking.services.copy_loader import CopyLoader
+from tracking.services.ingestion_service import IngestionService
+from tracking.services.tracking_service import build_hit
+from tracking.tasks import aggregate_daily_stats
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+from tracking.utils.sampling import keep_session, session_bucket
+
+
+def session_ids(sample_rate, kept, count):
+    """Return session ids that fall inside (or outside) the sample"""
+    ids = (f"session-{i}" for i in range(10000))
+    return [
+        session_id
+        for session_id in ids
+        if keep_session(session_id, sample_rate) == kept
+    ][:count]
+
+
+def test_keep_session_is_deterministic_and_close_to_rate():
+    ids = [f"session-{i}" for i in range(10000)]
+
+    kept = [session_id for session_id in ids if keep_session(session_id, 0.1)]
+
+    assert 800 < len(kept) < 1200
+    assert kept == [session_id for session_id in ids if keep_session(session_id, 0.1)]
+    assert all(keep_session(session_id, 1.0) for session_id in ids[:100])
+    assert all(0 <= session_bucket(session_id) < 1 for session_id in ids[:100])
+
+
+@pytest.mark.django_db
+def test_submit_drops_whole_sessions_outside_the_sample():
+    website = WebsiteFactory(sample_rate=0.5)
+    inside = session_ids(0.5, True, 1)[0]
+    outside = session_ids(0.5, False, 1)[0]
+
+    for session_id in (inside, outside):
+        for page in ("/a", "/b"):
+            result = IngestionService.submit(
+                "pageview", website.domain, session_id, {"page_url": page}
+            )
+            expected = "ok" if session_id == inside else "sampled"
+            assert result["status"] == expected
+
+    assert set(PageView.objects.values_list("sample_rate", flat=True)) == {0.5}
+    assert PageView.objects.filter(session__session_id=inside).count() == 2
+    assert Session.objects.get().sample_rate == 0.5
+
+
+@pytest.mark.django_db
+def test_submit_batch_counts_sampled_items():
+    website = WebsiteFactory(sample_rate=0.5)
+    items = [
+        {
+            "type": "pageview",
+            "domain": website.domain,
+            "session_id": session_id,
+            "page_url": "/",
+        }
+        for session_id in session_ids(0.5, True, 3) + session_ids(0.5, False, 2)
+    ]
+
+    result = IngestionService.submit_batch(items)
+
+    assert result["successful_count"] == 3
+    assert result["sampled_count"] == 2
+    assert PageView.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_copy_loader_stores_website_sample_rate():
+    website = WebsiteFactory(sample_rate=0.25)
+
+    CopyLoader().load([build_hit("pageview", website.domain, "s-1", {"page_url": "/"})])
+
+    assert PageView.objects.get().sample_rate == 0.25
+    assert Session.objects.get().sample_rate == 0.25
+
+
+@pytest.mark.django_db
+def test_daily_aggregation_scales_sampled_rows():
+    website = WebsiteFactory(sample_rate=0.25)
+    yesterday = timezone.now() - timedelta(days=1)
+    for i in range(2):
+        session = SessionFactory(website=website, sample_rate=0.25)
+        Session.objects.filter(pk=session.pk).update(started_at=yesterday)
+        for _ in range(i + 1):
+            PageView.objects.create(
+                website=website,
+                session=session,
+                page_url="/home",
+                timestamp=yesterday,
+                sample_rate=0.25,
+            )
+
+    aggregate_daily_stats()
+
+    stats = DailyWebsiteStats.objects.get(website=website)
+    assert stats.pageviews == 12
+    assert stats.unique_visitors == 8
+    assert stats.sessions == 8
+    assert stats.bounce_rate == 50
+    assert stats.sampled
+    assert PageStats.objects.get(website=website).views == 12
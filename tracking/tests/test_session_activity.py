@@ -0,0 +1,131 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from tracking.models import Session
+from tracking.services.session_activity import (
+    FLUSHING_SUFFIX,
+    LAST_SEEN_KEY,
+    LIVE_KEY,
+    PAGEVIEWS_KEY,
+    Activity,
+    session_activity,
+)
+from tracking.services.tracking_service import TrackingService, build_hit
+from tracking.tasks import close_idle_sessions
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+@pytest.fixture
+def activity():
+    session_activity.__init__()
+    client = session_activity._redis()
+    client.delete(
+        LAST_SEEN_KEY,
+        PAGEVIEWS_KEY,
+        LAST_SEEN_KEY + FLUSHING_SUFFIX,
+        PAGEVIEWS_KEY + FLUSHING_SUFFIX,
+    )
+    # Website ids are reused once the test database is recreated
+    for key in client.scan_iter(LIVE_KEY.format(website_id="*")):
+        client.delete(key)
+    yield session_activity
+    session_activity.__init__()
+
+
+def idle_session(website, minutes):
+    session = SessionFactory(website=website)
+    last_seen = timezone.now() - timedelta(minutes=minutes)
+    Session.objects.filter(pk=session.pk).update(last_seen_at=last_seen)
+    return session
+
+
+@pytest.mark.django_db
+def test_hits_are_written_behind_and_flushed_in_bulk(
+    activity, django_capture_on_commit_callbacks
+):
+    website = WebsiteFactory()
+    hits = [
+        build_hit("pageview", website.domain, "s-1", {"page_url": "/a"}),
+        build_hit("event", website.domain, "s-1", {"event_name": "click"}),
+    ]
+    with django_capture_on_commit_callbacks(execute=True):
+        TrackingService.bulk_record(hits)
+    session = Session.objects.get()
+    Session.objects.filter(pk=session.pk).update(
+        last_seen_at=timezone.now() - timedelta(hours=1)
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        TrackingService.bulk_record(hits)
+    # The hits did not touch the session row
+    assert Session.objects.get().pageview_count == 0
+
+    assert activity.flush() == 1
+    session.refresh_from_db()
+    assert session.pageview_count == 2
+    assert session.last_seen_at > timezone.now() - timedelta(minutes=1)
+    assert activity.flush() == 0
+
+
+@pytest.mark.django_db
+def test_flush_works_in_batches_and_keeps_last_seen_monotonic(activity):
+    website = WebsiteFactory()
+    sessions = [SessionFactory(website=website) for _ in range(5)]
+    latest = timezone.now()
+    activity._push(
+        [Activity(website.id, session.pk, latest, 3) for session in sessions]
+    )
+
+    assert activity.flush(batch_size=2) == 5
+    activity._push(
+        [Activity(website.id, sessions[0].pk, latest - timedelta(hours=1), 1)]
+    )
+    activity.flush()
+
+    first = Session.objects.get(pk=sessions[0].pk)
+    assert (first.last_seen_at, first.pageview_count) == (latest, 4)
+    assert {session.pageview_count for session in Session.objects.all()} == {3, 4}
+    assert not activity._redis().exists(LAST_SEEN_KEY + FLUSHING_SUFFIX)
+
+
+@pytest.mark.django_db
+def test_activity_is_written_through_without_redis(activity, settings):
+    settings.TRACKING_ACTIVITY_REDIS_URL = "redis://localhost:1/0"
+    activity.__init__()
+    session = SessionFactory()
+    now = timezone.now()
+
+    activity._push([Activity(session.website_id, session.pk, now, 2)])
+
+    session.refresh_from_db()
+    assert (session.last_seen_at, session.pageview_count) == (now, 2)
+    assert activity.active_counts([session.website_id]) is None
+
+
+@pytest.mark.django_db
+def test_sweeper_and_realtime_read_buffered_activity(activity):
+    website = WebsiteFactory()
+    recent = idle_session(website, 45)
+    idle = idle_session(website, 45)
+    gone = idle_session(website, 45)
+    now = timezone.now()
+    activity._push(
+        [
+            Activity(website.id, recent.pk, now, 1),
+            Activity(website.id, gone.pk, now - timedelta(minutes=40), 1),
+        ]
+    )
+
+    assert activity.active_counts([website.id]) == {website.id: 1}
+    close_idle_sessions()
+
+    recent.refresh_from_db()
+    idle.refresh_from_db()
+    assert recent.ended_at is None
+    assert idle.ended_at == idle.last_seen_at
+
+
+def test_active_counts_tolerates_unknown_websites(activity):
+    assert activity.active_counts([-1]) == {-1: 0}
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from tracking.models import Session
+from tracking.services.session_service import SessionService
+from tracking.tasks import close_idle_sessions
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+def idle_session(website, minutes):
+    session = SessionFactory(website=website)
+    last_seen = timezone.now() - timedelta(minutes=minutes)
+    Session.objects.filter(pk=session.pk).update(
+        started_at=last_seen - timedelta(minutes=5), last_seen_at=last_seen
+    )
+    return Session.objects.get(pk=session.pk)
+
+
+@pytest.mark.django_db
+def test_sweeper_ends_idle_sessions_at_last_activity():
+    website = WebsiteFactory()
+    idle = idle_session(website, 45)
+    active = idle_session(website, 5)
+
+    assert close_idle_sessions() == "Closed 1 idle sessions"
+
+    idle.refresh_from_db()
+    active.refresh_from_db()
+    assert idle.ended_at == idle.last_seen_at
+    assert active.ended_at is None
+
+
+@pytest.mark.django_db
+def test_sweeper_works_in_batches():
+    website = WebsiteFactory()
+    for _ in range(5):
+        idle_session(website, 60)
+
+    assert SessionService.close_idle_sessions(batch_size=2, max_batches=2) == 4
+    assert SessionService.close_idle_sessions(batch_size=2) == 1
+    assert not Session.objects.filter(ended_at__isnull=True).exists()
+
+
+@pytest.mark.django_db
+def test_activity_after_the_sweep_reopens_the_session():
+    website = WebsiteFactory()
+    resumed = idle_session(website, 45)
+    late = idle_session(website, 45)
+    SessionService.close_idle_sessions()
+    late.refresh_from_db()
+
+    now = timezone.now()
+    SessionService.record_activity(
+        [(resumed.pk, now, 1), (late.pk, late.ended_at - timedelta(minutes=1), 1)]
+    )
+
+    resumed.refresh_from_db()
+    assert (resumed.ended_at, resumed.last_seen_at) == (None, now)
+    assert Session.objects.get(pk=late.pk).ended_at == late.ended_at
+
+    Session.objects.filter(pk=resumed.pk).update(
+        last_seen_at=now - timedelta(minutes=45)
+    )
+    SessionService.close_idle_sessions()
+    resumed.refresh_from_db()
+    assert resumed.ended_at == now - timedelta(minutes=45)
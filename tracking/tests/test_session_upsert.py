@@ -0,0 +1,41 @@
+import pytest
+
+from tracking.models import Session
+from tracking.services.session_service import SessionService
+from tracking.tests.factories.factories import SessionFactory, WebsiteFactory
+
+
+@pytest.mark.django_db
+def test_upsert_sessions_creates_missing_and_returns_existing():
+    website = WebsiteFactory()
+    other = WebsiteFactory()
+    existing = SessionFactory(website=website, session_id="known")
+
+    pks = SessionService.upsert_sessions(
+        {
+            (website.id, "known"): {"user_agent": "ignored"},
+            (website.id, "new"): {"user_agent": "Mozilla/5.0", "country": "DE"},
+            (other.id, "known"): None,
+        }
+    )
+
+    assert pks[(website.id, "known")] == existing.pk
+    created = Session.objects.get(pk=pks[(website.id, "new")])
+    assert created.user_agent == "Mozilla/5.0"
+    assert created.country == "DE"
+    assert created.started_at is not None
+    assert Session.objects.get(pk=pks[(other.id, "known")]).website == other
+    assert Session.objects.get(pk=existing.pk).user_agent == existing.user_agent
+
+
+@pytest.mark.django_db
+def test_upsert_session_is_a_single_statement(django_assert_num_queries):
+    website = WebsiteFactory()
+
+    with django_assert_num_queries(1):
+        first = SessionService.upsert_session(website.id, "s-1")
+    with django_assert_num_queries(1):
+        second = SessionService.upsert_session(website.id, "s-1")
+
+    assert first == second
+    assert Session.objects.filter(website=website).count() == 1
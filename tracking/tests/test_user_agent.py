@@ -0,0 +1,81 @@
+import pytest
+
+from tracking.utils.common import detect_browser, detect_device_type
+from tracking.utils.user_agent import UserAgentInfo, classify, classify_many
+
+CHROME_WINDOWS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+USER_AGENTS = [
+    (CHROME_WINDOWS, UserAgentInfo("chrome", "120", "windows", "desktop", False)),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36 Edg/120.0.2210.91",
+        UserAgentInfo("edge", "120", "windows", "desktop", False),
+    ),
+    (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 "
+        "(KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+        UserAgentInfo("safari", "17", "macos", "desktop", False),
+    ),
+    (
+        "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:121.0) Gecko/20100101 "
+        "Firefox/121.0",
+        UserAgentInfo("firefox", "121", "linux", "desktop", False),
+    ),
+    (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 "
+        "(KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1",
+        UserAgentInfo("safari", "17", "ios", "mobile", False),
+    ),
+    (
+        "Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) AppleWebKit/605.1.15 "
+        "(KHTML, like Gecko) CriOS/120.0.6099.119 Mobile/15E148 Safari/604.1",
+        UserAgentInfo("chrome", "120", "ios", "tablet", False),
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 13; SM-S918B) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) SamsungBrowser/23.0 Chrome/115.0.0.0 Mobile Safari/537.36",
+        UserAgentInfo("samsung", "23", "android", "mobile", False),
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 13; SM-X200) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        UserAgentInfo("chrome", "120", "android", "tablet", False),
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 12; Pixel 6 Build/SD1A; wv) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Version/4.0 Chrome/119.0.0.0 Mobile Safari/537.36",
+        UserAgentInfo("webview", "119", "android", "mobile", False),
+    ),
+    (
+        "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+        UserAgentInfo("other", "", "other", "desktop", True),
+    ),
+    ("curl/8.4.0", UserAgentInfo("other", "", "other", "desktop", True)),
+    ("", UserAgentInfo("other", "", "other", "desktop", False)),
+]
+
+
+@pytest.mark.parametrize("user_agent,expected", USER_AGENTS)
+def test_classify(user_agent, expected):
+    assert classify(user_agent) == expected
+
+
+def test_classify_many_preserves_order():
+    agents = ["curl/8.4.0", CHROME_WINDOWS, "curl/8.4.0"]
+
+    result = classify_many(agents)
+
+    assert [info.browser for info in result] == ["other", "chrome", "other"]
+    assert result[0] is result[2]
+
+
+def test_detect_wrappers_use_classifier():
+    assert detect_browser(CHROME_WINDOWS) == "chrome"
+    assert (
+        detect_device_type("Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) Mobile")
+        == "tablet"
+    )
@@ -0,0 +1,58 @@
+import pytest
+
+from tracking.api.v1.fast_views import EVENT_VALIDATOR, PAGEVIEW_VALIDATOR
+from tracking.api.v1.serializers import EventSerializer, PageViewSerializer
+
+PAGEVIEW_PAYLOADS = [
+    {},
+    {"domain": "a.com", "session_id": "s", "page_url": "/home"},
+    {"domain": " a.com ", "session_id": 42, "page_url": "/x", "load_time": "1.5"},
+    {"domain": "", "session_id": "x" * 101, "page_url": "  ", "load_time": "abc"},
+    {"domain": "a.com", "session_id": "s", "page_url": "/", "page_title": None},
+    {"domain": ["a.com"], "session_id": {"k": 1}, "page_url": None},
+    {"domain": "a.com", "session_id": "s", "page_url": "/", "user_agent": ""},
+    {"domain": "a.com", "session_id": "s", "page_url": "/", "event_id": "e" * 65},
+    ["not", "a", "dict"],
+] + [
+    {"domain": "a.com", "session_id": "s", "page_url": "/", "ip_address": ip}
+    for ip in (" 1.2.3.4 ", "::ffff:1.2.3.4", "not-an-ip", "1::x", "", 1234)
+]
+
+EVENT_PAYLOADS = [
+    {"domain": "a.com", "session_id": "s", "event_name": "click"},
+    {"domain": "a.com", "session_id": "s", "event_name": "x" * 101},
+    {"domain": "a.com", "session_id": "s", "event_name": "e", "page_url": ""},
+    {"domain": "a.com", "session_id": "s", "event_name": "e", "event_data": {"a": [1]}},
+    {"domain": "a.com", "session_id": "s", "event_name": "e", "event_data": None},
+]
+
+
+def serializer_result(serializer_class, payload):
+    serializer = serializer_class(data=payload)
+    if serializer.is_valid():
+        return dict(serializer.validated_data), {}
+    errors = {
+        field: [str(message) for message in messages]
+        for field, messages in serializer.errors.items()
+    }
+    return {}, errors
+
+
+@pytest.mark.parametrize("payload", PAGEVIEW_PAYLOADS)
+def test_pageview_validator_matches_serializer(payload):
+    validated, errors = PAGEVIEW_VALIDATOR.validate(payload)
+    expected_validated, expected_errors = serializer_result(PageViewSerializer, payload)
+
+    assert errors == expected_errors
+    if not errors:
+        assert validated == expected_validated
+
+
+@pytest.mark.parametrize("payload", EVENT_PAYLOADS)
+def test_event_validator_matches_serializer(payload):
+    validated, errors = EVENT_VALIDATOR.validate(payload)
+    expected_validated, expected_errors = serializer_result(EventSerializer, payload)
+
+    assert errors == expected_errors
+    if not errors:
+        assert validated == expected_validated
@@ -0,0 +1,20 @@
+"""
+Shared ``redis.asyncio`` clients for the async ingest path
+"""
+import asyncio
+import weakref
+
+import redis.asyncio as aioredis
+
+# Connection pools are bound to the event loop that created them
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(url):
+    """
+    Return an asyncio Redis client for ``url`` bound to the running loop
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if url not in clients:
+        clients[url] = aioredis.Redis.from_url(url)
+    return clients[url]
@@ -0,0 +1,116 @@
+"""
+Static bot verdicts for tracking hits.
+
+A hit is a bot when its user agent matches the crawler patterns of
+``tracking.utils.user_agent`` or its IP falls in a known datacenter range.
+Ranges are read once per process from ``TRACKING_DATACENTER_RANGES_PATH``
+(one CIDR per line, ``#`` comments), merged into sorted intervals and
+searched with bisect. Verdicts are memoized per IP; user-agent verdicts
+share the user-agent LRU.
+"""
+import ipaddress
+import logging
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+
+from django.conf import settings
+
+from .user_agent import classify
+
+logger = logging.getLogger(__name__)
+
+REASON_USER_AGENT = "user_agent"
+REASON_DATACENTER = "datacenter"
+REASON_RATE = "rate"
+
+_ranges = None
+_ranges_lock = threading.Lock()
+
+
+def load_ranges(path):
+    """
+    Return ``{ip_version: (starts, ends)}`` of merged, sorted CIDR ranges
+    """
+    intervals = {4: [], 6: []}
+    with open(path) as ranges_file:
+        for line in ranges_file:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            try:
+                network = ipaddress.ip_network(line, strict=False)
+            except ValueError:
+                logger.warning(f"Skipping invalid datacenter range {line!r}")
+                continue
+            intervals[network.version].append(
+                (int(network.network_address), int(network.broadcast_address))
+            )
+
+    ranges = {}
+    for version, pairs in intervals.items():
+        merged = []
+        for start, end in sorted(pairs):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        ranges[version] = ([start for start, _ in merged], [end for _, end in merged])
+    return ranges
+
+
+def get_ranges():
+    """
+    Return the process-wide datacenter ranges, empty if none are configured
+    """
+    global _ranges
+    if _ranges is None:
+        with _ranges_lock:
+            if _ranges is None:
+                path = settings.TRACKING_DATACENTER_RANGES_PATH
+                ranges = {}
+                if path:
+                    try:
+                        ranges = load_ranges(path)
+                    except OSError as e:
+                        logger.warning(f"Datacenter ranges {path} unavailable: {e}")
+                _ranges = ranges
+    return _ranges
+
+
+def reset():
+    """
+    Reload the ranges file on next use and forget cached verdicts
+    """
+    global _ranges
+    with _ranges_lock:
+        _ranges = None
+    is_datacenter_ip.cache_clear()
+
+
+@lru_cache(maxsize=settings.TRACKING_BOT_CACHE_SIZE)
+def is_datacenter_ip(ip_address):
+    """
+    True if the IP address falls in a configured datacenter range
+    """
+    ranges = get_ranges()
+    if not ranges or not ip_address:
+        return False
+    try:
+        address = ipaddress.ip_address(ip_address.strip())
+    except ValueError:
+        return False
+    starts, ends = ranges[address.version]
+    position = bisect_right(starts, int(address)) - 1
+    return position >= 0 and int(address) <= ends[position]
+
+
+def static_verdict(user_agent, ip_address):
+    """
+    Return the reason a hit is a bot from its user agent or IP, or None
+    """
+    if user_agent and classify(user_agent).is_bot:
+        return REASON_USER_AGENT
+    if is_datacenter_ip(ip_address):
+        return REASON_DATACENTER
+    return None
@@ -1,3 +1,15 @@
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_ipv46_address
+from django.utils import timezone
+
+from .geoip import lookup_country
+from .user_agent import classify
+
+
 def validate_tracking_data(data, required_fields):
     """
     Validate tracking data and return validation result
@@ -11,15 +23,20 @@ def validate_tracking_data(data, required_fields):
     return len(errors) == 0, errors
 
 
-def get_client_info(request):
+def get_client_info(request, geoip=True):
     """
-    Extract client information from request
+    Extract client information from request. The country comes from the
+    Cloudflare header, else (unless ``geoip`` is False) from the local
+    GeoIP database.
     """
+    ip_address = get_client_ip(request)
+    country = request.META.get("HTTP_CF_IPCOUNTRY", "")
+    if not country and geoip:
+        country = lookup_country(ip_address)
     return {
         "user_agent": request.META.get("HTTP_USER_AGENT", ""),
-        "ip_address": get_client_ip(request),
-        # Cloudflare country
-        "country": request.META.get("HTTP_CF_IPCOUNTRY", ""),
+        "ip_address": ip_address,
+        "country": country,
     }
 
 
@@ -29,39 +46,54 @@ def get_client_ip(request):
     """
     x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
     if x_forwarded_for:
-        ip = x_forwarded_for.split(",")[0]
-    else:
-        ip = request.META.get("REMOTE_ADDR")
-    return ip
+        # Proxies may forward placeholders such as "unknown"
+        ip = x_forwarded_for.split(",")[0].strip()
+        try:
+            validate_ipv46_address(ip)
+            return ip
+        except ValidationError:
+            pass
+    return request.META.get("REMOTE_ADDR")
+
+
+def anonymous_session_id(domain, ip_address, user_agent):
+    """
+    Derive a cookieless session id for hits that do not send one (e.g.
+    zero-JS pixels): a keyed hash of the visitor's IP and user agent that
+    rotates daily, so it cannot be reversed or linked across days
+    """
+    day = timezone.now().date().isoformat()
+    digest = hashlib.blake2b(
+        f"{domain}|{ip_address}|{user_agent}|{day}".encode(),
+        digest_size=12,
+        key=settings.SECRET_KEY.encode()[:64],
+    )
+    return f"anon-{digest.hexdigest()}"
 
 
 def detect_device_type(user_agent):
     """
     Detect device type from user agent
     """
-    user_agent_lower = user_agent.lower()
-
-    if any(mobile in user_agent_lower for mobile in ["mobile", "android", "iphone"]):
-        return "mobile"
-    elif any(tablet in user_agent_lower for tablet in ["tablet", "ipad"]):
-        return "tablet"
-    else:
-        return "desktop"
+    return classify(user_agent).device_type
 
 
 def detect_browser(user_agent):
     """
     Detect browser from user agent
     """
-    user_agent_lower = user_agent.lower()
-
-    if "chrome" in user_agent_lower:
-        return "chrome"
-    elif "firefox" in user_agent_lower:
-        return "firefox"
-    elif "safari" in user_agent_lower:
-        return "safari"
-    elif "edge" in user_agent_lower:
-        return "edge"
-    else:
-        return "other"
+    return classify(user_agent).browser
+
+
+def day_bounds(start_date, end_date=None):
+    """
+    Return the half-open ``(start, end)`` datetimes spanning the days from
+    ``start_date`` to ``end_date`` (inclusive) in the current timezone.
+    Filtering ``timestamp >= start AND timestamp < end`` uses the timestamp
+    indexes and prunes partitions, unlike ``timestamp__date`` lookups.
+    """
+    end_date = end_date or start_date
+    return (
+        timezone.make_aware(datetime.combine(start_date, time.min)),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min)),
+    )
@@ -0,0 +1,104 @@
+"""
+Offline IP -> country lookup against a local MaxMind-format database.
+
+The ``.mmdb`` file at ``GEOIP_DATABASE_PATH`` is opened once per process
+with ``MODE_MMAP``, so every worker shares the same pages through the OS
+page cache and lookups never leave the process. Results are memoized per
+IP with an LRU cache. Without the ``maxminddb`` package or a database file
+lookups return "" and enrichment is a no-op.
+"""
+import ipaddress
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+
+try:
+    import maxminddb
+except ImportError:  # pragma: no cover - optional dependency
+    maxminddb = None
+
+logger = logging.getLogger(__name__)
+
+_reader = None
+_reader_lock = threading.Lock()
+_unavailable = False
+
+
+def get_reader():
+    """
+    Return the process-wide database reader, or None if GeoIP is disabled
+    """
+    global _reader, _unavailable
+    if _reader is None and not _unavailable:
+        with _reader_lock:
+            if _reader is None and not _unavailable:
+                path = settings.GEOIP_DATABASE_PATH
+                if maxminddb is None or not path:
+                    _unavailable = True
+                    return None
+                try:
+                    _reader = maxminddb.open_database(path, maxminddb.MODE_MMAP)
+                except (OSError, ValueError) as e:
+                    logger.warning(f"GeoIP database {path} unavailable: {e}")
+                    _unavailable = True
+    return _reader
+
+
+def reset():
+    """
+    Close the reader and forget cached lookups (e.g. after a database update)
+    """
+    global _reader, _unavailable
+    with _reader_lock:
+        if _reader is not None:
+            _reader.close()
+        _reader = None
+        _unavailable = False
+    _lookup.cache_clear()
+
+
+@lru_cache(maxsize=settings.GEOIP_CACHE_SIZE)
+def _lookup(ip_address):
+    reader = get_reader()
+    if reader is None:
+        return ""
+    try:
+        record = reader.get(ip_address)
+    except ValueError:
+        return ""
+    if not record:
+        return ""
+    country = record.get("country") or record.get("registered_country") or {}
+    return country.get("iso_code", "")
+
+
+def lookup_country(ip_address):
+    """
+    Return the ISO country code of an IP address, "" if unknown
+    """
+    if not ip_address:
+        return ""
+    try:
+        ip_address = str(ipaddress.ip_address(ip_address.strip()))
+    except ValueError:
+        return ""
+    return _lookup(ip_address)
+
+
+def enrich_countries(items):
+    """
+    Fill the empty ``country`` of batch items from their ``ip_address``,
+    looking each distinct address up once
+    """
+    missing = [item for item in items if not item.get("country")]
+    if not missing or get_reader() is None:
+        return items
+    countries = {
+        ip_address: lookup_country(ip_address)
+        for ip_address in {item.get("ip_address") for item in missing}
+    }
+    for item in missing:
+        item["country"] = countries[item.get("ip_address")] or item.get("country")
+    return items
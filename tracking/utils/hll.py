@@ -0,0 +1,66 @@
+"""
+HyperLogLog sketches of distinct sessions.
+
+A sketch is ``REGISTERS`` bytes, one register per hash bucket holding the
+longest run of leading zeros (plus one) seen in that bucket. Registers
+are computed in SQL by ``REGISTERS_SQL`` from the 64-bit
+``hashint8extended`` of the session id; sketches merge by taking the
+register-wise maximum, so hourly sketches combine into daily ones. The
+standard error is about 1.04 / sqrt(REGISTERS), ~3% here.
+"""
+import math
+
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+RANK_BITS = 64 - PRECISION
+
+# Rows of (register, rank) for the hash ``h`` of a session id
+REGISTERS_SQL = f"""
+h & {REGISTERS - 1} AS register,
+coalesce(
+    nullif(position('1' IN (h >> {PRECISION})::bit({RANK_BITS})::text), 0),
+    {RANK_BITS + 1}
+) AS rank
+"""
+
+ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def empty():
+    return bytes(REGISTERS)
+
+
+def from_registers(pairs, sketch=None):
+    """
+    Return ``sketch`` (or an empty one) updated with ``(register, rank)``
+    pairs
+    """
+    registers = bytearray(sketch or empty())
+    for register, rank in pairs:
+        if rank > registers[register]:
+            registers[register] = rank
+    return bytes(registers)
+
+
+def merge(*sketches):
+    sketches = [bytes(sketch) for sketch in sketches if sketch]
+    if not sketches:
+        return empty()
+    return bytes(map(max, *sketches)) if len(sketches) > 1 else sketches[0]
+
+
+def estimate(sketch):
+    """
+    Return the estimated number of distinct values added to ``sketch``
+    """
+    if not sketch:
+        return 0.0
+    registers = bytes(sketch)
+    zeros = registers.count(0)
+    if zeros == REGISTERS:
+        return 0.0
+    raw = ALPHA * REGISTERS**2 / sum(2.0**-rank for rank in registers)
+    if raw <= 2.5 * REGISTERS and zeros:
+        # Linear counting is more accurate for small cardinalities
+        return REGISTERS * math.log(REGISTERS / zeros)
+    return raw
@@ -0,0 +1,133 @@
+"""
+Idempotency-key deduplication for tracking hits.
+
+Clients may send an ``event_id`` with every hit. Keys are hashed to 8 bytes
+and stored in time-bucketed Redis sets (one per ``TRACKING_DEDUP_TTL``
+window), so memory stays bounded and a batch of keys is checked in a single
+pipelined round trip. A key counts as a duplicate if it is present in the
+current or the previous window.
+"""
+import hashlib
+import logging
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import redis
+from django.conf import settings
+
+from tracking.utils.async_redis import get_async_client
+
+logger = logging.getLogger(__name__)
+
+DEDUP_KEY_PREFIX = "tracking:dedup"
+
+_client = None
+
+
+def get_dedup_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.TRACKING_DEDUP_REDIS_URL)
+    return _client
+
+
+def _digest(domain: str, event_id: str) -> bytes:
+    return hashlib.blake2b(f"{domain}:{event_id}".encode(), digest_size=8).digest()
+
+
+def _bucket_keys(now: Optional[float] = None) -> Tuple[str, str]:
+    bucket = int((now or time.time()) // settings.TRACKING_DEDUP_TTL)
+    return f"{DEDUP_KEY_PREFIX}:{bucket}", f"{DEDUP_KEY_PREFIX}:{bucket - 1}"
+
+
+def claim_event_ids(keys: Sequence[Tuple[str, Optional[str]]]) -> List[bool]:
+    """
+    Claim ``(domain, event_id)`` pairs and return, for each pair, whether it
+    is new. Pairs without an event_id are always new. If Redis is
+    unavailable every pair is treated as new: a double count is preferred
+    over a lost hit.
+    """
+    positions = [i for i, (_, event_id) in enumerate(keys) if event_id]
+    is_new = [True] * len(keys)
+    if not positions:
+        return is_new
+
+    current, previous = _bucket_keys()
+    try:
+        pipe = get_dedup_client().pipeline(transaction=False)
+        _queue_claims(pipe, keys, positions, current, previous)
+        replies = pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Idempotency check skipped: {e}")
+        return is_new
+
+    return _claim_results(replies, positions, is_new)
+
+
+async def aclaim_event_ids(keys: Sequence[Tuple[str, Optional[str]]]) -> List[bool]:
+    """
+    Async variant of ``claim_event_ids`` using ``redis.asyncio``
+    """
+    positions = [i for i, (_, event_id) in enumerate(keys) if event_id]
+    is_new = [True] * len(keys)
+    if not positions:
+        return is_new
+
+    current, previous = _bucket_keys()
+    try:
+        pipe = get_async_client(settings.TRACKING_DEDUP_REDIS_URL).pipeline(
+            transaction=False
+        )
+        _queue_claims(pipe, keys, positions, current, previous)
+        replies = await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Idempotency check skipped: {e}")
+        return is_new
+
+    return _claim_results(replies, positions, is_new)
+
+
+def _queue_claims(pipe, keys, positions, current, previous):
+    for i in positions:
+        digest = _digest(*keys[i])
+        pipe.sismember(previous, digest)
+        pipe.sadd(current, digest)
+    pipe.expire(current, settings.TRACKING_DEDUP_TTL * 2)
+
+
+def _claim_results(replies, positions, is_new):
+    for n, i in enumerate(positions):
+        seen_before, added = replies[2 * n], replies[2 * n + 1]
+        is_new[i] = bool(added) and not seen_before
+    return is_new
+
+
+def release_event_ids(keys: Sequence[Tuple[str, Optional[str]]]) -> None:
+    """
+    Forget claimed keys whose hits could not be stored, so client retries
+    are accepted
+    """
+    digests = [_digest(domain, event_id) for domain, event_id in keys if event_id]
+    if not digests:
+        return
+    current, _ = _bucket_keys()
+    try:
+        get_dedup_client().srem(current, *digests)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to release idempotency keys: {e}")
+
+
+async def arelease_event_ids(keys: Sequence[Tuple[str, Optional[str]]]) -> None:
+    """
+    Async variant of ``release_event_ids``
+    """
+    digests = [_digest(domain, event_id) for domain, event_id in keys if event_id]
+    if not digests:
+        return
+    current, _ = _bucket_keys()
+    try:
+        await get_async_client(settings.TRACKING_DEDUP_REDIS_URL).srem(
+            current, *digests
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Failed to release idempotency keys: {e}")
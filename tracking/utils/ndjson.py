@@ -0,0 +1,56 @@
+"""
+Streaming NDJSON reader for batch ingestion.
+
+Bodies are read line by line straight from the request stream (optionally
+through a gzip decoder), so memory use is bounded by the longest accepted
+line rather than by the size of the upload.
+"""
+import gzip
+import json
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+class NDJSONError(Exception):
+    pass
+
+
+def open_stream(stream, content_encoding=None):
+    """
+    Wrap ``stream`` in a decoder for the given Content-Encoding
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return stream
+    if encoding == "gzip":
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    raise NDJSONError(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+def iter_ndjson(stream, max_line_bytes):
+    """
+    Yield ``(line_number, obj, error)`` for every non-blank line.
+    Lines that are not valid JSON or longer than ``max_line_bytes`` are
+    reported with an error instead of stopping the stream.
+    """
+    line_number = 0
+    while True:
+        raw = stream.readline(max_line_bytes + 1)
+        if not raw:
+            return
+        line_number += 1
+
+        if len(raw) > max_line_bytes and not raw.endswith(b"\n"):
+            # Discard the rest of the oversized line
+            while raw and not raw.endswith(b"\n"):
+                raw = stream.readline(max_line_bytes)
+            yield line_number, None, "Line too long"
+            continue
+
+        raw = raw.strip()
+        if not raw:
+            continue
+        try:
+            yield line_number, json.loads(raw), None
+        except ValueError:
+            yield line_number, None, "Invalid JSON"
@@ -0,0 +1,65 @@
+"""
+Deterministic per-session sampling for high-traffic websites.
+
+A hit is kept when the hash of its session id falls below the website's
+``sample_rate``, so every hit of a session is kept or dropped together, in
+every process. Stored rows carry the rate they were recorded at and reports
+scale their counts by ``1 / sample_rate``.
+"""
+from hashlib import blake2b
+
+from django.db.models import F, FloatField, Min, Sum
+
+HASH_SPACE = float(2**64)
+
+
+def session_bucket(session_id):
+    """
+    Map a session id to a stable position in [0, 1)
+    """
+    digest = blake2b((session_id or "").encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / HASH_SPACE
+
+
+def keep_session(session_id, sample_rate):
+    """
+    Return True if hits of this session are recorded at ``sample_rate``
+    """
+    if sample_rate >= 1:
+        return True
+    return session_bucket(session_id) < sample_rate
+
+
+def scale_rows(rows, group_by, fields):
+    """
+    Sum ``fields`` over rows grouped by ``group_by`` (plus ``sample_rate``),
+    dividing each row by its rate. Returns ``{group: totals}`` where totals
+    also carries a ``sampled`` flag; counts are floats, round when storing.
+    """
+    totals = {}
+    for row in rows:
+        rate = row["sample_rate"] or 1.0
+        key = tuple(row[name] for name in group_by)
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = {field: 0.0 for field in fields}
+            total["sampled"] = False
+        for field in fields:
+            total[field] += (row[field] or 0) / rate
+        total["sampled"] = total["sampled"] or rate < 1
+    return totals
+
+
+def weighted_count():
+    """
+    Aggregate counting each row as ``1 / sample_rate`` rows
+    """
+    return Sum(1.0 / F("sample_rate"), output_field=FloatField(), default=0.0)
+
+
+def scaled_count(queryset):
+    """
+    Return ``(count, sampled)`` for a queryset of sampled rows
+    """
+    result = queryset.aggregate(count=weighted_count(), min_rate=Min("sample_rate"))
+    return round(result["count"]), (result["min_rate"] or 1.0) < 1
@@ -0,0 +1,110 @@
+"""
+Deterministic, offline user-agent classification.
+
+Rules are compiled once at import and evaluated in order (first match
+wins). Results are memoized per raw UA string with an LRU cache: the UA
+distribution is extremely skewed, so nearly every lookup is a cache hit.
+"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+
+UserAgentInfo = namedtuple(
+    "UserAgentInfo", ["browser", "version", "os", "device_type", "is_bot"]
+)
+
+# Longer strings are truncated before lookup so they cannot bloat the cache
+MAX_USER_AGENT_LENGTH = 512
+
+BOT_PATTERN = re.compile(
+    r"(?<!cu)bot\b|bot/|crawl|spider|slurp|archiver|headlesschrome|phantomjs|"
+    r"facebookexternalhit|embedly|preview|lighthouse|pingdom|"
+    r"^curl/|^wget/|python-requests|python-urllib|go-http-client|okhttp|"
+    r"java/|libwww|httpclient|axios/|node-fetch",
+    re.IGNORECASE,
+)
+
+# Order matters: most browsers also claim to be Chrome and/or Safari
+BROWSER_PATTERNS = [
+    (name, re.compile(pattern))
+    for name, pattern in (
+        ("edge", r"\bEdg(?:e|A|iOS)?/(\d+)"),
+        ("opera", r"\b(?:OPR|OPiOS|Opera)/(\d+)"),
+        ("samsung", r"\bSamsungBrowser/(\d+)"),
+        ("yandex", r"\bYaBrowser/(\d+)"),
+        ("firefox", r"\b(?:Firefox|FxiOS)/(\d+)"),
+        ("webview", r"; wv\).*?\bChrome/(\d+)"),
+        ("chrome", r"\b(?:Chrome|CriOS|Chromium)/(\d+)"),
+        ("safari", r"\bVersion/(\d+)(?:\.\d+)*(?: Mobile(?:/\w+)?)? Safari/"),
+        ("ie", r"\bMSIE (\d+)|\bTrident/.*\brv:(\d+)"),
+    )
+]
+
+OS_PATTERNS = [
+    (name, re.compile(pattern))
+    for name, pattern in (
+        ("windows", r"\bWindows (?:NT|Phone)\b"),
+        ("ios", r"\b(?:iPhone|iPad|iPod)\b|\bCPU (?:iPhone )?OS \d+"),
+        ("android", r"\bAndroid\b"),
+        ("chromeos", r"\bCrOS\b"),
+        ("macos", r"\bMac OS X\b|\bMacintosh\b"),
+        ("linux", r"\bLinux\b|\bX11\b"),
+    )
+]
+
+TABLET_PATTERN = re.compile(r"\biPad\b|\bTablet\b|\bKindle\b|\bSilk/|\bPlayBook\b")
+ANDROID_PATTERN = re.compile(r"\bAndroid\b")
+MOBILE_PATTERN = re.compile(r"\bMobi|\biPhone\b|\biPod\b|\bWindows Phone\b")
+
+UNKNOWN = UserAgentInfo("other", "", "other", "desktop", False)
+
+
+def _match(patterns, user_agent):
+    for name, pattern in patterns:
+        match = pattern.search(user_agent)
+        if match:
+            return name, next((group for group in match.groups() if group), "")
+    return "other", ""
+
+
+def _device_type(user_agent):
+    # Tablets first: iPads and Android tablets may also contain "Mobile"
+    if TABLET_PATTERN.search(user_agent):
+        return "tablet"
+    if ANDROID_PATTERN.search(user_agent):
+        return "mobile" if MOBILE_PATTERN.search(user_agent) else "tablet"
+    if MOBILE_PATTERN.search(user_agent):
+        return "mobile"
+    return "desktop"
+
+
+@lru_cache(maxsize=settings.USER_AGENT_CACHE_SIZE)
+def _classify(user_agent):
+    browser, version = _match(BROWSER_PATTERNS, user_agent)
+    os_name, _ = _match(OS_PATTERNS, user_agent)
+    return UserAgentInfo(
+        browser=browser,
+        version=version,
+        os=os_name,
+        device_type=_device_type(user_agent),
+        is_bot=bool(BOT_PATTERN.search(user_agent)),
+    )
+
+
+def classify(user_agent):
+    """
+    Return a UserAgentInfo for a raw User-Agent header value
+    """
+    if not user_agent:
+        return UNKNOWN
+    return _classify(user_agent[:MAX_USER_AGENT_LENGTH])
+
+
+def classify_many(user_agents):
+    """
+    Classify a batch of user agents, computing each distinct value once
+    """
+    results = {user_agent: classify(user_agent) for user_agent in set(user_agents)}
+    return [results[user_agent] for user_agent in user_agents]